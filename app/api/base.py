@@ -0,0 +1,167 @@
+"""
+API 请求发送与响应关联
+
+所有 API 函数都通过 send_payload 发送请求，发送消息类的请求经过 api.outbound 中的发送队列限流。
+需要拿到响应结果时使用 call_api：框架为每个请求生成唯一的 echo，
+收到对应响应后直接唤醒等待方，该响应不再广播给各个模块。
+较大的响应（如群成员列表）在接收时只读取 echo，由等待它的 call_api 调用方完整解析。
+"""
+
+import asyncio
+import itertools
+from logger import logger
+from api.outbound import outbound_dispatcher, OUTBOUND_ACTIONS
+from utils import json_codec, metrics
+
+# 等待响应的默认超时时间（秒）
+DEFAULT_TIMEOUT = 10
+
+# 关联请求的 echo 前缀，用于和模块自定义的 echo 区分
+CALL_ECHO_PREFIX = "call_api-"
+
+# 超过该长度（字符数）的响应延迟解析，交给等待方解析
+LAZY_DECODE_THRESHOLD = 64 * 1024
+
+# 请求序号，保证同一进程内 echo 唯一
+_call_counter = itertools.count(1)
+
+# 等待响应的请求表，echo -> Future
+_pending_calls = {}
+
+# 运行指标
+API_CALLS = metrics.counter("bot_api_calls_total", "发送的API请求数", ["action"])
+metrics.gauge(
+    "bot_api_pending_calls",
+    "等待响应的 call_api 请求数",
+    collect=lambda: len(_pending_calls),
+)
+
+
+async def send_payload(websocket, payload):
+    """
+    发送API请求（不等待响应）
+    发送消息类的请求放入发送队列后立即返回，由发送队列按限流规则写入连接
+
+    Args:
+        websocket: WebSocket连接对象
+        payload (dict): 请求内容，包含 action、params、echo
+    """
+    action = payload.get("action")
+    API_CALLS.inc(action)
+    if action in OUTBOUND_ACTIONS:
+        await outbound_dispatcher.submit(websocket, payload)
+        return
+    await websocket.send(json_codec.dumps(payload))
+
+
+async def call_api(websocket, action, params=None, timeout=DEFAULT_TIMEOUT):
+    """
+    发送API请求并等待对应的响应
+
+    Args:
+        websocket: WebSocket连接对象
+        action (str): API名称，如 get_msg
+        params (dict, optional): 请求参数
+        timeout (float, optional): 等待响应的超时时间（秒）
+
+    Returns:
+        dict: 完整的响应内容（包含 status、retcode、data），超时或发送失败时返回None
+
+    Examples:
+        response = await call_api(websocket, "get_msg", {"message_id": message_id})
+        if response and response.get("status") == "ok":
+            raw_message = response["data"].get("raw_message", "")
+    """
+    echo = f"{CALL_ECHO_PREFIX}{action}-{next(_call_counter)}"
+    future = asyncio.get_running_loop().create_future()
+    _pending_calls[echo] = future
+    try:
+        await send_payload(
+            websocket, {"action": action, "params": params or {}, "echo": echo}
+        )
+        response = await asyncio.wait_for(future, timeout)
+        if isinstance(response, (str, bytes)):
+            # 延迟解析的大响应，在等待方的任务中解析
+            response = json_codec.loads(response)
+        return response
+    except asyncio.TimeoutError:
+        logger.warning(f"[API]等待 {action} 响应超时（{timeout}秒）")
+        return None
+    except ConnectionError as e:
+        logger.warning(f"[API]{action} 请求未完成: {e}")
+        return None
+    except Exception as e:
+        logger.error(f"[API]执行 {action} 失败: {e}")
+        return None
+    finally:
+        _pending_calls.pop(echo, None)
+
+
+def resolve_response(msg):
+    """
+    将响应交给等待它的 call_api 调用方
+
+    Args:
+        msg (dict): 已解析的websocket消息
+
+    Returns:
+        bool: True 表示该消息是关联请求的响应，已被消费，无需再分发给模块
+    """
+    echo = msg.get("echo")
+    if not isinstance(echo, str) or not echo.startswith(CALL_ECHO_PREFIX):
+        return False
+
+    future = _pending_calls.pop(echo, None)
+    if future is None:
+        # 调用方已超时放弃，丢弃迟到的响应
+        logger.debug(f"[API]收到已超时请求的响应: {echo}")
+    elif not future.done():
+        future.set_result(msg)
+    return True
+
+
+def resolve_raw_response(message):
+    """
+    不解析消息，直接将较大的响应交给等待它的 call_api 调用方
+    调用方已超时放弃的响应不会被解析
+
+    Args:
+        message (str): 原始websocket消息
+
+    Returns:
+        bool: True 表示该消息是关联请求的响应，已被消费；
+              False 表示需要按普通消息完整解析
+    """
+    if not isinstance(message, str) or len(message) < LAZY_DECODE_THRESHOLD:
+        return False
+    echo = json_codec.peek_echo(message)
+    if echo is None or not echo.startswith(CALL_ECHO_PREFIX):
+        return False
+
+    future = _pending_calls.pop(echo, None)
+    if future is None:
+        logger.debug(f"[API]收到已超时请求的响应: {echo}")
+    elif not future.done():
+        future.set_result(message)
+    return True
+
+
+def cancel_pending_calls():
+    """
+    取消所有等待中的请求，连接断开时调用，避免调用方一直等到超时
+
+    Returns:
+        int: 被取消的请求数量
+    """
+    count = 0
+    for future in list(_pending_calls.values()):
+        if not future.done():
+            future.set_exception(ConnectionError("连接已断开"))
+            count += 1
+    _pending_calls.clear()
+    return count
+
+
+def get_pending_call_count():
+    """获取等待响应中的请求数量"""
+    return len(_pending_calls)
@@ -1,5 +1,5 @@
-import json
 from logger import logger
+from api.base import send_payload
 
 
 async def set_group_todo(websocket, group_id, message_id):
@@ -12,7 +12,7 @@ async def set_group_todo(websocket, group_id, message_id):
             "params": {"group_id": group_id, "message_id": message_id},
             "echo": "set_group_todo",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行设置群待办")
         return True
     except Exception as e:
@@ -50,7 +50,7 @@ async def set_group_kick_members(
             },
             "echo": f"set_group_kick_members-{note}",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行批量踢出群成员")
         return True
     except Exception as e:
@@ -87,7 +87,7 @@ async def set_group_kick(
             },
             "echo": "set_group_kick",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行设置群踢人")
         return True
     except Exception as e:
@@ -105,7 +105,7 @@ async def set_group_ban(websocket, group_id, user_id, duration):
             "params": {"group_id": group_id, "user_id": user_id, "duration": duration},
             "echo": "set_group_ban",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行群禁言")
         return True
     except Exception as e:
@@ -168,7 +168,7 @@ async def get_group_system_msg(websocket, group_id):
             "params": {"group_id": group_id},
             "echo": "get_group_system_msg",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行获取群系统消息")
         return True
     except Exception as e:
@@ -186,7 +186,7 @@ async def get_essence_msg_list(websocket, group_id):
             "params": {"group_id": group_id},
             "echo": "get_essence_msg_list",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行获取精华消息")
         return True
     except Exception as e:
@@ -204,7 +204,7 @@ async def set_group_whole_ban(websocket, group_id, enable):
             "params": {"group_id": group_id, "enable": enable},
             "echo": "set_group_whole_ban",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行全体禁言")
         return True
     except Exception as e:
@@ -222,7 +222,7 @@ async def set_group_portrait(websocket, group_id, file_path):
             "params": {"group_id": group_id, "file_path": file_path},
             "echo": "set_group_portrait",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行设置群头像")
         return True
     except Exception as e:
@@ -240,7 +240,7 @@ async def set_group_admin(websocket, group_id, user_id, enable):
             "params": {"group_id": group_id, "user_id": user_id, "enable": enable},
             "echo": "set_group_admin",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行设置群管理")
         return True
     except Exception as e:
@@ -258,7 +258,7 @@ async def set_essence_msg(websocket, message_id):
             "params": {"message_id": message_id},
             "echo": "set_essence_msg",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行设置群精华消息")
         return True
     except Exception as e:
@@ -276,7 +276,7 @@ async def set_group_card(websocket, group_id, user_id, card):
             "params": {"group_id": group_id, "user_id": user_id, "card": card},
             "echo": "set_group_card",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行设置群成员名片")
         return True
     except Exception as e:
@@ -294,7 +294,7 @@ async def delete_group_essence_msg(websocket, group_id, message_id):
             "params": {"group_id": group_id, "message_id": message_id},
             "echo": "delete_group_essence_msg",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行删除群精华消息")
         return True
     except Exception as e:
@@ -312,7 +312,7 @@ async def set_group_name(websocket, group_id, group_name):
             "params": {"group_id": group_id, "group_name": group_name},
             "echo": "set_group_name",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行设置群名")
         return True
     except Exception as e:
@@ -330,7 +330,7 @@ async def set_group_leave(websocket, group_id):
             "params": {"group_id": group_id},
             "echo": "set_group_leave",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行退群")
         return True
     except Exception as e:
@@ -352,7 +352,7 @@ async def _send_group_notice(websocket, group_id, content, image_path):
             },
             "echo": "_send_group_notice",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行发送群公告")
         return True
     except Exception as e:
@@ -370,7 +370,7 @@ async def _get_group_notice(websocket, group_id):
             "params": {"group_id": group_id},
             "echo": "_get_group_notice",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行获取群公告")
         return True
     except Exception as e:
@@ -392,7 +392,7 @@ async def set_group_special_title(websocket, group_id, user_id, special_title):
             },
             "echo": "set_group_special_title",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行设置群头衔")
         return True
     except Exception as e:
@@ -415,7 +415,7 @@ async def upload_group_file(websocket, group_id, file, name, folder_id):
             },
             "echo": "upload_group_file",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行上传群文件")
         return True
     except Exception as e:
@@ -442,7 +442,7 @@ async def set_group_add_request(websocket, flag, approve, reason=""):
             "params": {"flag": flag, "approve": approve, "reason": reason},
             "echo": "set_group_add_request",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行处理加群请求")
         return True
     except Exception as e:
@@ -469,7 +469,7 @@ async def get_group_info(websocket, group_id):
             "echo": "get_group_info",
         }
         # 发送请求到上游WebSocket
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行获取群信息")
         return True
     except Exception as e:
@@ -488,7 +488,7 @@ async def get_group_info_ex(websocket, group_id):
             "params": {"group_id": group_id},
             "echo": "get_group_info_ex",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行获取群信息")
         return True
     except Exception as e:
@@ -506,7 +506,7 @@ async def create_group_file_folder(websocket, group_id, folder_name):
             "params": {"group_id": group_id, "folder_name": folder_name},
             "echo": "create_group_file_folder",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行创建群文件夹")
         return True
     except Exception as e:
@@ -524,7 +524,7 @@ async def delete_group_file(websocket, group_id, file_id):
             "params": {"group_id": group_id, "file_id": file_id},
             "echo": "delete_group_file",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行删除群文件")
         return True
     except Exception as e:
@@ -542,7 +542,7 @@ async def delete_group_folder(websocket, group_id, folder_id):
             "params": {"group_id": group_id, "folder_id": folder_id},
             "echo": "delete_group_folder",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行删除群文件夹")
         return True
     except Exception as e:
@@ -560,7 +560,7 @@ async def get_group_file_system_info(websocket, group_id):
             "params": {"group_id": group_id},
             "echo": "get_group_file_system_info",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行获取群文件系统信息")
         return True
     except Exception as e:
@@ -578,7 +578,7 @@ async def get_group_root_files(websocket, group_id):
             "params": {"group_id": group_id},
             "echo": "get_group_root_files",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行获取群根目录文件列表")
         return True
     except Exception as e:
@@ -600,7 +600,7 @@ async def get_group_files_by_folder(websocket, group_id, folder_id, file_count):
             },
             "echo": "get_group_files_by_folder",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行获取群子目录文件列表")
         return True
     except Exception as e:
@@ -618,7 +618,7 @@ async def get_group_file_url(websocket, group_id, file_id):
             "params": {"group_id": group_id, "file_id": file_id},
             "echo": "get_group_file_url",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行获取群文件资源链接")
         return True
     except Exception as e:
@@ -636,7 +636,7 @@ async def get_group_list(websocket, no_cache):
             "params": {"no_cache": no_cache},
             "echo": "get_group_list",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行获取群列表")
         return True
     except Exception as e:
@@ -654,7 +654,7 @@ async def get_group_member_info(websocket, group_id, user_id, no_cache):
             "params": {"group_id": group_id, "user_id": user_id, "no_cache": no_cache},
             "echo": "get_group_member_info",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行获取群成员信息")
         return True
     except Exception as e:
@@ -680,7 +680,7 @@ async def get_group_member_list(websocket, group_id, no_cache=False, note=""):
             "params": {"group_id": group_id, "no_cache": no_cache},
             "echo": f"get_group_member_list-group_id={group_id}-{note}",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行获取群 {group_id} 成员列表，note={note}")
         return True
     except Exception as e:
@@ -698,7 +698,7 @@ async def get_group_honor_info(websocket, group_id):
             "params": {"group_id": group_id},
             "echo": "get_group_honor_info",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行获取群荣誉信息")
         return True
     except Exception as e:
@@ -716,7 +716,7 @@ async def get_group_at_all_remain(websocket, group_id):
             "params": {"group_id": group_id},
             "echo": "get_group_at_all_remain",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行获取群at剩余次数")
         return True
     except Exception as e:
@@ -734,7 +734,7 @@ async def get_group_ignored_notifies(websocket, group_id):
             "params": {"group_id": group_id},
             "echo": "get_group_ignored_notifies",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行获取群过滤系统消息")
         return True
     except Exception as e:
@@ -752,7 +752,7 @@ async def set_group_sign(websocket, group_id):
             "params": {"group_id": group_id},
             "echo": "set_group_sign",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行设置群打卡")
         return True
     except Exception as e:
@@ -770,7 +770,7 @@ async def send_group_sign(websocket, group_id):
             "params": {"group_id": group_id},
             "echo": "send_group_sign",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行发送群打卡")
         return True
     except Exception as e:
@@ -788,7 +788,7 @@ async def get_ai_characters(websocket, group_id, chat_type):
             "params": {"group_id": group_id, "chat_type": chat_type},
             "echo": "get_ai_characters",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行获取ai语音人物")
         return True
     except Exception as e:
@@ -810,7 +810,7 @@ async def send_group_ai_record(websocket, group_id, character_id, text):
             },
             "echo": "send_group_ai_record",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行发送群ai语音")
         return True
     except Exception as e:
@@ -828,7 +828,7 @@ async def get_ai_record(websocket, group_id, character, text):
             "params": {"group_id": group_id, "character": character, "text": text},
             "echo": "get_ai_record",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行获取ai语音")
         return True
     except Exception as e:
@@ -1,5 +1,5 @@
-import json
 from logger import logger
+from api.base import send_payload
 
 
 async def nc_get_rkey(websocket):
@@ -8,7 +8,7 @@ async def nc_get_rkey(websocket):
     """
     try:
         payload = {"action": "nc_get_rkey", "params": {}, "echo": "nc_get_rkey"}
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行nc获取rkey")
         return True
     except Exception as e:
@@ -1,5 +1,5 @@
-import json
 from logger import logger
+from api.base import send_payload
 
 
 # 使用cq码发送群消息
@@ -21,7 +21,7 @@ async def send_group_msg_with_cq(websocket, group_id, content, note=""):
             "params": {"group_id": group_id, "message": content},
             "echo": f"send_group_msg-{note}",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行发送群消息到群 {group_id}")
     except Exception as e:
         logger.error(f"[API]执行发送群消息失败: {e}")
@@ -46,7 +46,7 @@ async def send_private_msg_with_cq(websocket, user_id, content, note=""):
             "params": {"user_id": user_id, "message": content},
             "echo": f"send_private_msg-{note}",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行发送消息到用户 {user_id}")
     except Exception as e:
         logger.error(f"[API]执行发送消息失败: {e}")
@@ -120,7 +120,7 @@ async def send_group_msg(websocket, group_id, message, note=""):
             },
             "echo": f"send_group_msg-{note}",
         }
-        await websocket.send(json.dumps(message_data))
+        await send_payload(websocket, message_data)
         logger.info(f"[API]已执行发送群聊消息到群 {group_id}")
     except Exception as e:
         logger.warning(f"[API]执行发送群聊消息失败: {e}")
@@ -170,7 +170,7 @@ async def send_private_msg(websocket, user_id, message, note=""):
             "params": {"user_id": user_id, "message": message},
             "echo": f"send_private_msg-{note}",
         }
-        await websocket.send(json.dumps(message_data))
+        await send_payload(websocket, message_data)
         logger.info(f"[API]已执行发送私聊消息到用户 {user_id}")
     except Exception as e:
         logger.warning(f"[API]执行发送私聊消息失败: {e}")
@@ -187,7 +187,7 @@ async def mark_group_msg_as_read(websocket, group_id):
             "params": {"group_id": group_id},
             "echo": "mark_group_msg_as_read",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行设置群聊消息已读")
     except Exception as e:
         logger.error(f"[API]执行设置群聊消息已读失败: {e}")
@@ -203,7 +203,7 @@ async def mark_private_msg_as_read(websocket, user_id):
             "params": {"user_id": user_id},
             "echo": "mark_private_msg_as_read",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行设置私聊消息已读")
     except Exception as e:
         logger.error(f"[API]执行设置私聊消息已读失败: {e}")
@@ -215,7 +215,7 @@ async def _mark_all_as_read(websocket):
     """
     try:
         payload = {"action": "_mark_all_as_read", "echo": "_mark_all_as_read"}
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行设置所有消息已读")
     except Exception as e:
         logger.error(f"[API]执行设置所有消息已读失败: {e}")
@@ -231,7 +231,7 @@ async def delete_msg(websocket, message_id):
             "params": {"message_id": message_id},
             "echo": "delete_msg",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行撤回消息：{message_id}")
     except Exception as e:
         logger.error(f"[API]执行撤回消息失败: {e}")
@@ -259,7 +259,7 @@ async def get_msg(websocket, message_id, note=""):
             "params": {"message_id": message_id},
             "echo": f"get_msg-{note}",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行获取消息详情")
     except Exception as e:
         logger.error(f"[API]执行获取消息详情失败: {e}")
@@ -275,7 +275,7 @@ async def get_image(websocket, file_id):
             "params": {"file_id": file_id},
             "echo": "get_image",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行获取图片消息详情")
     except Exception as e:
         logger.error(f"[API]执行获取图片消息详情失败: {e}")
@@ -291,7 +291,7 @@ async def get_record(websocket, file, out_format):
             "params": {"file": file, "out_format": out_format},
             "echo": "get_record",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行获取语音消息详情")
     except Exception as e:
         logger.error(f"[API]执行获取语音消息详情失败: {e}")
@@ -307,7 +307,7 @@ async def get_file(websocket, file_id):
             "params": {"file_id": file_id},
             "echo": "get_file",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行获取文件消息")
     except Exception as e:
         logger.error(f"[API]执行获取文件消息失败: {e}")
@@ -339,7 +339,7 @@ async def get_group_msg_history(websocket, group_id, count=20, message_seq=0, no
             },
             "echo": f"get_group_msg_history-{group_id}-{note}",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行获取群历史消息")
     except Exception as e:
         logger.error(f"[API]执行获取群历史消息失败: {e}")
@@ -355,7 +355,7 @@ async def set_msg_emoji_like(websocket, message_id, emoji_id, set):
             "params": {"message_id": message_id, "emoji_id": emoji_id, "set": set},
             "echo": "set_msg_emoji_like",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行设置消息表情点赞")
     except Exception as e:
         logger.error(f"[API]执行设置消息表情点赞失败: {e}")
@@ -378,7 +378,7 @@ async def get_friend_msg_history(
             },
             "echo": "get_friend_msg_history",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行获取好友历史消息")
     except Exception as e:
         logger.error(f"[API]执行获取好友历史消息失败: {e}")
@@ -394,7 +394,7 @@ async def get_recent_contact(websocket, count):
             "params": {"count": count},
             "echo": "get_recent_contact",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行获取最近消息列表")
     except Exception as e:
         logger.error(f"[API]执行获取最近消息列表失败: {e}")
@@ -417,7 +417,7 @@ async def fetch_emoji_like(websocket, message_id, emoji_id, emoji_type):
             },
             "echo": "fetch_emoji_like",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行获取消息表情点赞详情")
     except Exception as e:
         logger.error(f"[API]执行获取消息表情点赞详情失败: {e}")
@@ -433,7 +433,7 @@ async def get_forward_msg(websocket, message_id, note=""):
             "params": {"message_id": message_id},
             "echo": f"get_forward_msg-{note}",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行获取合并转发消息")
     except Exception as e:
         logger.error(f"[API]执行获取合并转发消息失败: {e}")
@@ -505,7 +505,7 @@ async def send_forward_msg(
         }
 
         # 发送请求
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行发送合并转发消息")
 
     except Exception as e:
@@ -572,7 +572,7 @@ async def send_private_forward_msg(websocket, user_id, messages, note=""):
         }
 
         # 发送请求
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行发送私聊合并转发消息到用户 {user_id}")
 
     except Exception as e:
@@ -670,7 +670,7 @@ async def send_group_forward_msg(
         }
 
         # 发送请求
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行发送群聊合并转发消息到群 {group_id}")
 
     except Exception as e:
@@ -698,7 +698,7 @@ async def group_poke(websocket, group_id, user_id):
             "params": {"group_id": group_id, "user_id": user_id},
             "echo": "group_poke",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行发送戳一戳")
     except Exception as e:
         logger.error(f"[API]执行发送戳一戳失败: {e}")
@@ -0,0 +1,296 @@
+"""
+消息发送队列
+
+所有发送消息类的请求（send_group_msg、send_private_msg、合并转发等）由 send_payload
+交给全局发送队列，再由一个后台任务按以下规则写入 websocket：
+
+- 每个群、每个私聊对象各有一个令牌桶，另有一个全局令牌桶，避免短时间内发送过多消息被风控
+- 三个优先级通道：发给机器人管理员的消息 > 普通回复 > 批量消息，
+  某个对象被限流时不会阻塞其他对象的消息
+- 同一对象的消息按提交顺序发送，同一通道内的不同对象轮流发送
+- 队列有容量上限，队列满时提交方等待（发给管理员的消息除外）
+
+批量群发时使用 send_priority 降低优先级：
+
+    from api.outbound import send_priority, PRIORITY_BULK
+
+    with send_priority(PRIORITY_BULK):
+        for group_id in group_ids:
+            await send_group_msg(websocket, group_id, "公告")
+"""
+
+import time
+import asyncio
+import contextvars
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from config import OWNER_ID
+from logger import logger
+from utils.rate_limit import TokenBucket
+from utils import json_codec, metrics
+
+# 优先级通道，数值越小越优先
+PRIORITY_OWNER = 0  # 发给机器人管理员的消息
+PRIORITY_REPLY = 1  # 普通回复，默认通道
+PRIORITY_BULK = 2  # 批量群发
+PRIORITY_NAMES = ("owner", "reply", "bulk")
+
+# 经过发送队列的 action
+OUTBOUND_ACTIONS = frozenset(
+    [
+        "send_msg",
+        "send_group_msg",
+        "send_private_msg",
+        "send_forward_msg",
+        "send_group_forward_msg",
+        "send_private_forward_msg",
+    ]
+)
+
+# 限流参数
+GLOBAL_RATE = 10  # 全局每秒最多发送的消息数
+GLOBAL_BURST = 20
+TARGET_RATE = 1  # 每个群/私聊对象每秒最多发送的消息数
+TARGET_BURST = 5
+MAX_QUEUE_SIZE = 1000  # 队列容量
+BUCKET_IDLE_TIMEOUT = 300  # 空闲令牌桶的清理间隔，单位：秒
+
+# 当前上下文的发送优先级，None 表示自动判断
+_send_priority = contextvars.ContextVar("send_priority", default=None)
+
+
+@contextmanager
+def send_priority(priority):
+    """
+    在 with 代码块内（包括其中创建的任务）使用指定的发送优先级
+
+    Args:
+        priority (int): PRIORITY_OWNER / PRIORITY_REPLY / PRIORITY_BULK
+    """
+    token = _send_priority.set(priority)
+    try:
+        yield
+    finally:
+        _send_priority.reset(token)
+
+
+def _get_target(payload):
+    """获取消息的发送对象，群消息为 ("group", 群号)，私聊消息为 ("user", QQ号)"""
+    params = payload.get("params") or {}
+    if params.get("group_id") is not None:
+        return ("group", str(params["group_id"]))
+    return ("user", str(params.get("user_id")))
+
+
+class OutboundDispatcher:
+    """消息发送队列"""
+
+    def __init__(self):
+        # 每个通道：发送对象 -> deque[(websocket, payload, 提交时间)]
+        self._lanes = [OrderedDict() for _ in PRIORITY_NAMES]
+        self._size = 0
+        # 发送对象 -> TokenBucket
+        self._buckets = {}
+        self._global_bucket = TokenBucket(GLOBAL_RATE, GLOBAL_BURST)
+        self._last_prune = time.monotonic()
+        self._wakeup = None
+        self._space = None
+        self._task = None
+        # 统计信息
+        self.enqueued = [0] * len(PRIORITY_NAMES)
+        self.sent = [0] * len(PRIORITY_NAMES)
+        self.failed = 0
+        self.backpressure_waits = 0
+        self._wait_total = [0.0] * len(PRIORITY_NAMES)
+        self._wait_max = [0.0] * len(PRIORITY_NAMES)
+
+    def _ensure_started(self):
+        """首次提交时创建事件并启动后台任务"""
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+            self._space = asyncio.Event()
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    @staticmethod
+    def get_priority(payload):
+        """确定消息的优先级：上下文指定的优先级，或发给管理员的私聊消息，或普通回复"""
+        priority = _send_priority.get()
+        if priority is not None:
+            return priority
+        params = payload.get("params") or {}
+        if params.get("group_id") is None and str(params.get("user_id")) == str(
+            OWNER_ID
+        ):
+            return PRIORITY_OWNER
+        return PRIORITY_REPLY
+
+    async def submit(self, websocket, payload):
+        """
+        提交一条消息，队列满时等待（发给管理员的消息不受容量限制）
+
+        Args:
+            websocket: WebSocket连接对象
+            payload (dict): 请求内容
+        """
+        self._ensure_started()
+        priority = self.get_priority(payload)
+
+        if priority != PRIORITY_OWNER and self._size >= MAX_QUEUE_SIZE:
+            self.backpressure_waits += 1
+            while self._size >= MAX_QUEUE_SIZE:
+                self._space.clear()
+                await self._space.wait()
+
+        target = _get_target(payload)
+        lane = self._lanes[priority]
+        if target not in lane:
+            lane[target] = deque()
+        lane[target].append((websocket, payload, time.monotonic()))
+        self._size += 1
+        self.enqueued[priority] += 1
+        self._wakeup.set()
+
+    def _get_bucket(self, target):
+        bucket = self._buckets.get(target)
+        if bucket is None:
+            bucket = self._buckets[target] = TokenBucket(TARGET_RATE, TARGET_BURST)
+        return bucket
+
+    def _prune_buckets(self, now):
+        """清理已经补满的令牌桶，避免发送对象过多时占用内存"""
+        if now - self._last_prune < BUCKET_IDLE_TIMEOUT:
+            return
+        self._last_prune = now
+        queued = set()
+        for lane in self._lanes:
+            queued.update(lane)
+        for target in [
+            target
+            for target, bucket in self._buckets.items()
+            if target not in queued and bucket.tokens >= bucket.capacity
+        ]:
+            del self._buckets[target]
+
+    def _next_ready(self):
+        """
+        取出下一条可以发送的消息
+
+        Returns:
+            tuple: (priority, item, wait)，没有可发送的消息时 item 为None，
+                   wait 为需要等待的秒数（None 表示队列为空）
+        """
+        if self._size == 0:
+            return None, None, None
+        global_wait = self._global_bucket.time_until_available()
+        if global_wait > 0:
+            return None, None, global_wait
+
+        min_wait = None
+        for priority, lane in enumerate(self._lanes):
+            for target, queue in lane.items():
+                bucket = self._get_bucket(target)
+                wait = bucket.time_until_available()
+                if wait > 0:
+                    min_wait = wait if min_wait is None else min(min_wait, wait)
+                    continue
+
+                bucket.try_acquire()
+                self._global_bucket.try_acquire()
+                item = queue.popleft()
+                if queue:
+                    # 同一通道内的对象轮流发送
+                    lane.move_to_end(target)
+                else:
+                    del lane[target]
+                self._size -= 1
+                self._space.set()
+                return priority, item, 0
+        return None, None, min_wait
+
+    async def _run(self):
+        """后台发送循环"""
+        while True:
+            try:
+                self._wakeup.clear()
+                priority, item, wait = self._next_ready()
+                if item is None:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), wait)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                websocket, payload, enqueued_at = item
+                waited = time.monotonic() - enqueued_at
+                self._wait_total[priority] += waited
+                self._wait_max[priority] = max(self._wait_max[priority], waited)
+                try:
+                    await websocket.send(json_codec.dumps(payload))
+                    self.sent[priority] += 1
+                except Exception as e:
+                    self.failed += 1
+                    logger.error(f"[API]发送 {payload.get('action')} 失败: {e}")
+
+                self._prune_buckets(time.monotonic())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[API]发送队列出错: {e}")
+
+    def get_stats(self):
+        """
+        获取发送队列统计信息
+
+        Returns:
+            dict: 队列长度、各通道的排队数量、提交/发送数量和平均/最大等待时间（秒），
+                  发送失败次数、提交方因队列满而等待的次数
+        """
+        lanes = {}
+        for priority, name in enumerate(PRIORITY_NAMES):
+            sent = self.sent[priority]
+            lanes[name] = {
+                "queued": sum(len(queue) for queue in self._lanes[priority].values()),
+                "enqueued": self.enqueued[priority],
+                "sent": sent,
+                "avg_wait": self._wait_total[priority] / sent if sent else 0.0,
+                "max_wait": self._wait_max[priority],
+            }
+        return {
+            "queued": self._size,
+            "capacity": MAX_QUEUE_SIZE,
+            "lanes": lanes,
+            "failed": self.failed,
+            "backpressure_waits": self.backpressure_waits,
+            "buckets": len(self._buckets),
+        }
+
+
+# 全局发送队列实例
+outbound_dispatcher = OutboundDispatcher()
+
+metrics.gauge(
+    "bot_outbound_queue_depth",
+    "发送队列中等待发送的消息数",
+    ["lane"],
+    collect=lambda: {
+        name: lane["queued"]
+        for name, lane in outbound_dispatcher.get_stats()["lanes"].items()
+    },
+)
+metrics.counter(
+    "bot_outbound_sent_total",
+    "发送队列已发送的消息数",
+    ["lane"],
+    collect=lambda: dict(zip(PRIORITY_NAMES, outbound_dispatcher.sent)),
+)
+
+
+__all__ = [
+    "outbound_dispatcher",
+    "send_priority",
+    "OUTBOUND_ACTIONS",
+    "PRIORITY_OWNER",
+    "PRIORITY_REPLY",
+    "PRIORITY_BULK",
+]
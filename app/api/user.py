@@ -1,5 +1,5 @@
-import json
 from logger import logger
+from api.base import send_payload
 
 
 async def set_qq_profile(websocket, nickname, personal_note, sex):
@@ -16,7 +16,7 @@ async def set_qq_profile(websocket, nickname, personal_note, sex):
             },
             "echo": "set_qq_profile",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行设置账号信息")
         return True
     except Exception as e:
@@ -38,7 +38,7 @@ async def ArkSharePeer(websocket, group_id, user_id, phoneNumber):
             },
             "echo": "ArkSharePeer",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行获取推荐好友/群聊卡片")
         return True
     except Exception as e:
@@ -56,7 +56,7 @@ async def ArkShareGroup(websocket, group_id):
             "params": {"group_id": group_id},
             "echo": "ArkShareGroup",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行获取推荐群聊卡片")
         return True
     except Exception as e:
@@ -78,7 +78,7 @@ async def set_online_status(websocket, status, ext_status, battery_status):
             },
             "echo": "set_online_status",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行设置在线状态")
         return True
     except Exception as e:
@@ -95,7 +95,7 @@ async def get_friends_with_category(websocket):
             "action": "get_friends_with_category",
             "echo": "get_friends_with_category",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行获取好友分组列表")
         return True
     except Exception as e:
@@ -113,7 +113,7 @@ async def set_qq_avatar(websocket, file):
             "params": {"file": file},
             "echo": "set_qq_avatar",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行设置头像")
         return True
     except Exception as e:
@@ -131,7 +131,7 @@ async def send_like(websocket, user_id, times=1):
             "params": {"user_id": user_id, "times": times},
             "echo": "send_like",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行点赞")
         return True
     except Exception as e:
@@ -149,7 +149,7 @@ async def create_collection(websocket, raw_data, brief):
             "params": {"rawData": raw_data, "brief": brief},
             "echo": "create_collection",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行创建收藏")
         return True
     except Exception as e:
@@ -171,7 +171,7 @@ async def set_friend_add_request(websocket, flag, approve, remark=""):
             "params": {"flag": flag, "approve": approve, "remark": remark},
             "echo": "set_friend_add_request",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行处理好友请求")
         return True
     except Exception as e:
@@ -193,7 +193,7 @@ async def set_group_add_request(websocket, flag, approve, reason=""):
             "params": {"flag": flag, "approve": approve, "reason": reason},
             "echo": "set_group_add_request",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行处理群请求")
         return True
     except Exception as e:
@@ -211,7 +211,7 @@ async def set_self_longnick(websocket, long_nick):
             "params": {"longNick": long_nick},
             "echo": "set_self_longnick",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行设置个性签名")
         return True
     except Exception as e:
@@ -229,7 +229,7 @@ async def get_stranger_info(websocket, user_id):
             "params": {"user_id": user_id},
             "echo": "get_stranger_info",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行获取账号信息")
         return True
     except Exception as e:
@@ -247,7 +247,7 @@ async def get_friend_list(websocket, no_cache=False):
             "params": {"no_cache": no_cache},
             "echo": "get_friend_list",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行获取好友列表")
         return True
     except Exception as e:
@@ -261,7 +261,7 @@ async def get_like_list(websocket):
     """
     try:
         payload = {"action": "get_like_list", "echo": "get_like_list"}
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行获取点赞列表")
         return True
     except Exception as e:
@@ -275,7 +275,7 @@ async def get_collection_list(websocket):
     """
     try:
         payload = {"action": "get_collection_list", "echo": "get_collection_list"}
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行获取收藏列表")
         return True
     except Exception as e:
@@ -289,7 +289,7 @@ async def get_collection_emoji(websocket):
     """
     try:
         payload = {"action": "get_collection_emoji", "echo": "get_collection_emoji"}
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行获取收藏表情")
         return True
     except Exception as e:
@@ -307,7 +307,7 @@ async def upload_private_file(websocket, user_id, file, name):
             "params": {"user_id": user_id, "file": file, "name": name},
             "echo": "upload_private_file",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行上传私聊文件")
         return True
     except Exception as e:
@@ -332,7 +332,7 @@ async def delete_friend(
             },
             "echo": "delete_friend",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行删除好友")
         return True
     except Exception as e:
@@ -350,7 +350,7 @@ async def get_user_status(websocket, user_id):
             "params": {"user_id": user_id},
             "echo": "get_user_status",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行获取用户状态")
         return True
     except Exception as e:
@@ -368,7 +368,7 @@ async def get_mini_app_card(websocket, app_id):
             "params": {"app_id": app_id},
             "echo": "get_mini_app_card",
         }
-        await websocket.send(json.dumps(payload))
+        await send_payload(websocket, payload)
         logger.info(f"[API]已执行获取小程序卡片")
         return True
     except Exception as e:
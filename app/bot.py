@@ -2,8 +2,151 @@ import websockets
 from config import WS_URL, TOKEN
 from logger import logger
 from handle_events import EventHandler
+from api.base import cancel_pending_calls
+from core.inbound_pipeline import InboundPipeline
+from core.get_group_member_list import member_list_refresher
+from utils import metrics
 import asyncio
 
+# 断线期间发送的请求等待重新连接的最长时间（秒），超时后按发送失败处理
+SEND_WAIT_TIMEOUT = 10
+
+
+class WebSocketProxy:
+    """
+    稳定的连接代理
+    事件处理器、各模块和后台任务保存的都是这个对象，重新连接时只替换其中的连接，
+    断线期间发送的请求最多等待 SEND_WAIT_TIMEOUT 秒，连接恢复后继续发送
+    """
+
+    def __init__(self):
+        self._websocket = None
+        # 连接恢复时唤醒等待发送的请求，首次使用时创建
+        self._connected = None
+
+    def _get_event(self):
+        if self._connected is None:
+            self._connected = asyncio.Event()
+        return self._connected
+
+    @property
+    def connected(self):
+        """当前是否有可用的连接"""
+        return self._websocket is not None
+
+    def attach(self, websocket):
+        """使用新的连接"""
+        self._websocket = websocket
+        self._get_event().set()
+
+    def detach(self, websocket):
+        """连接断开，只有断开的是当前连接时才清除"""
+        if self._websocket is websocket:
+            self._websocket = None
+            self._get_event().clear()
+
+    async def send(self, data):
+        """
+        通过当前连接发送数据
+
+        Raises:
+            ConnectionError: 断线后 SEND_WAIT_TIMEOUT 秒内没有重新连接
+        """
+        websocket = self._websocket
+        if websocket is None:
+            try:
+                await asyncio.wait_for(self._get_event().wait(), SEND_WAIT_TIMEOUT)
+            except asyncio.TimeoutError:
+                raise ConnectionError("连接已断开") from None
+            websocket = self._websocket
+            if websocket is None:
+                raise ConnectionError("连接已断开")
+        await websocket.send(data)
+
+    def __getattr__(self, name):
+        # 其他属性转发给当前连接
+        websocket = self.__dict__.get("_websocket")
+        if websocket is None:
+            raise AttributeError(name)
+        return getattr(websocket, name)
+
+
+class BotRuntime:
+    """
+    运行时上下文，整个进程只创建一次
+    持有事件处理器（已加载的模块和路由表）和事件处理流水线，断线重连时只替换连接：
+    不重新加载模块、不重复上报加载状况，撤回、rkey、群成员列表等后台任务和各类缓存继续使用
+    """
+
+    def __init__(self):
+        self.websocket = WebSocketProxy()
+        self.event_handler = None
+        self.pipeline = None
+        # 统计信息
+        self.connections = 0
+
+    def attach(self, websocket):
+        """使用新的连接，首次连接时加载模块并启动事件处理流水线"""
+        self.websocket.attach(websocket)
+        self.connections += 1
+        if self.event_handler is None:
+            # 将websocket实例化到logger
+            logger.websocket = self.websocket
+            self.event_handler = EventHandler(self.websocket)
+            # 消息放入有界队列，由固定数量的工作任务处理，不阻塞消息接收
+            self.pipeline = InboundPipeline(self.event_handler.dispatch)
+            self.pipeline.start()
+        else:
+            logger.info(
+                f"已重新连接（第 {self.connections} 次连接），"
+                f"继续使用已加载的 {len(self.event_handler.handlers)} 个事件处理器"
+            )
+
+    def submit(self, message):
+        """提交一条收到的消息"""
+        self.pipeline.submit(self.websocket, message)
+
+    def detach(self, websocket):
+        """连接断开，队列中的事件继续处理，发送的请求等待重新连接"""
+        self.websocket.detach(websocket)
+        if self.pipeline is not None:
+            logger.info(f"事件处理统计: {self.pipeline.get_stats()}")
+        # 唤醒所有等待响应的请求，这些请求的响应不会再从新连接收到
+        cancelled_count = cancel_pending_calls()
+        if cancelled_count:
+            logger.warning(f"连接断开，已取消 {cancelled_count} 个等待响应的请求")
+
+    async def close(self):
+        """停止事件处理流水线和群成员列表刷新任务"""
+        if self.pipeline is not None:
+            await self.pipeline.stop()
+            self.pipeline = None
+        member_list_refresher.close()
+        self.event_handler = None
+
+    def get_stats(self):
+        """
+        获取运行时统计信息
+
+        Returns:
+            dict: 是否已连接、累计连接次数、已注册的事件处理器数量
+        """
+        return {
+            "connected": self.websocket.connected,
+            "connections": self.connections,
+            "handlers": len(self.event_handler.handlers) if self.event_handler else 0,
+        }
+
+
+# 全局运行时上下文实例
+runtime = BotRuntime()
+
+metrics.gauge(
+    "bot_connected",
+    "是否已连接到机器人",
+    collect=lambda: int(runtime.websocket.connected),
+)
+
 
 async def connect_to_bot():
     """连接到机器人并开始接收消息"""
@@ -23,21 +166,19 @@ async def connect_to_bot():
         # 连接到 WebSocket
         async with websockets.connect(connection_url) as websocket:
             try:
-                # 将websocket实例化到logger
-                logger.websocket = websocket
-
-                handler = EventHandler(websocket)  # 为每个连接创建一个独立实例
+                # 模块、缓存和后台任务跨连接保留，只替换连接
+                runtime.attach(websocket)
                 async for message in websocket:
                     try:
-                        # 异步处理消息，不阻塞当前循环
-                        # 使用create_task确保即使处理消息耗时，也不会阻塞后续消息接收
-                        asyncio.create_task(handler.handle_message(websocket, message))
+                        runtime.submit(message)
                     except Exception as e:
                         logger.error(f"处理消息时出错: {e}")
                         logger.error(f"消息内容: {message}")
             except Exception as e:
                 logger.error(f"WebSocket连接出错: {e}")
                 raise
+            finally:
+                runtime.detach(websocket)
     except Exception as e:
         logger.error(f"WebSocket连接失败: {e}")
         return None
@@ -21,4 +21,54 @@ FEISHU_BOT_URL = os.getenv("FEISHU_BOT_URL")
 # 飞书机器人Secret，选填，掉线时使用
 FEISHU_BOT_SECRET = os.getenv("FEISHU_BOT_SECRET")
 
+# 处理事件的并发数，选填，默认16
+INBOUND_WORKERS = int(os.getenv("INBOUND_WORKERS") or 16)
+
+# 等待处理的事件队列容量，选填，默认2000，队列满时丢弃消息最多的会话中最早的事件
+INBOUND_QUEUE_SIZE = int(os.getenv("INBOUND_QUEUE_SIZE") or 2000)
+
+# websocket消息的JSON实现，选填，默认auto（安装了orjson时使用orjson），可选orjson、json
+JSON_CODEC = os.getenv("JSON_CODEC") or "auto"
+
+# 指标服务端口，选填，设置后在该端口提供 Prometheus 格式的 /metrics 接口，默认不启动
+METRICS_PORT = int(os.getenv("METRICS_PORT") or 0)
+
+# 指标服务监听地址，选填，默认只允许本机访问
+METRICS_HOST = os.getenv("METRICS_HOST") or "127.0.0.1"
+
+# 处理器性能分析，选填，默认关闭，开启后记录每个处理器的耗时并定期汇报给管理员
+PROFILE_HANDLERS = (os.getenv("PROFILE_HANDLERS") or "").lower() in ("1", "true", "yes")
+
+# 处理器单次阻塞事件循环超过多少秒时记录调用栈，选填，默认0.5
+SLOW_HANDLER_THRESHOLD = float(os.getenv("SLOW_HANDLER_THRESHOLD") or 0.5)
+
+# 处理器耗时汇总的发送间隔（秒），选填，默认3600
+PROFILE_REPORT_INTERVAL = int(os.getenv("PROFILE_REPORT_INTERVAL") or 3600)
+
+# 处理器耗时汇总的条目数，选填，默认10
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N") or 10)
+
+# 事件循环延迟超过多少秒时记录阻塞位置，选填，默认0.2
+LOOP_LAG_THRESHOLD = float(os.getenv("LOOP_LAG_THRESHOLD") or 0.2)
+
+# 是否开启asyncio调试模式，报告执行时间过长的回调，选填，默认关闭
+LOOP_DEBUG = (os.getenv("LOOP_DEBUG") or "").lower() in ("1", "true", "yes")
+
+# 模块热重载的检查间隔（秒），选填，默认0不开启
+MODULE_RELOAD_INTERVAL = float(os.getenv("MODULE_RELOAD_INTERVAL") or 0)
+
+# 是否延迟导入模块，收到第一个订阅的事件时才导入，选填，默认关闭
+LAZY_MODULE_IMPORT = (os.getenv("LAZY_MODULE_IMPORT") or "").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+# 群聊菜单是否只显示本群已开启的模块，选填，默认关闭
+MENU_ENABLED_ONLY = (os.getenv("MENU_ENABLED_ONLY") or "").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
 # ==================== 配置项结束 ====================
@@ -0,0 +1,233 @@
+"""
+命令路由表
+收集各模块的命令，exact / prefix 命令编译为一棵前缀树，
+每条消息只扫描一次就能找到匹配的命令，不再逐个模块、逐条命令比较；
+regex 命令在注册时单独编译，按注册顺序逐条尝试
+
+命令分三类：
+- exact: 整条消息等于命令（不区分大小写），如开关名称 tp、菜单命令 tpmenu
+- prefix: 消息以命令开头（不区分大小写），如 复制开关 、/base
+- regex: 正则表达式，从消息开头匹配
+
+同一条消息匹配多条命令时，优先级为 exact > 最长的 prefix > 最先注册的 regex
+
+命令的所属方有两种：
+- 处理器：通过 SUBSCRIPTIONS 的 command 订阅，匹配后事件只额外分发给该处理器
+- 模块名称：模块声明的 SWITCH_NAME / COMMANDS，只用于填写 msg.command，
+  不缩小分发范围，订阅了 message 的模块仍然收到全部消息
+同一条命令只属于一方：处理器订阅的命令优先于模块声明的命令，同类之间先注册的优先，
+冲突的注册被忽略并记录警告，模块无法抢占 menu、开关等核心命令
+"""
+
+import re
+import time
+from collections import namedtuple
+from logger import logger
+
+# 匹配结果
+# owner: 命令所属的处理器或模块名称
+# command: 注册的命令或正则表达式
+# kind: exact / prefix / regex
+# match: regex 命令的 re.Match 对象，其他命令为None
+CommandMatch = namedtuple("CommandMatch", ["owner", "command", "kind", "match"])
+
+COMMAND_KINDS = ("exact", "prefix", "regex")
+
+# 前缀树节点中保存命令的键，不会与单个字符冲突
+_EXACT = "__exact__"
+_PREFIX = "__prefix__"
+
+
+class CommandRouter:
+    """命令路由表"""
+
+    def __init__(self):
+        # (kind, command) -> owner，注册顺序即 regex 的匹配顺序
+        self._commands = {}
+        self._trie = None
+        # regex 命令 -> 编译后的正则，注册时编译，写法有误的正则在注册时就报错
+        self._patterns = {}
+        self._regex_items = []
+        # 统计信息
+        self.matches = 0
+        self.hits = 0
+        self._cost_total = 0
+        self._cost_max = 0
+
+    def __len__(self):
+        return len(self._commands)
+
+    def add(self, owner, command, kind="exact"):
+        """
+        注册命令，与已注册的命令冲突时处理器优先、先注册的优先
+
+        Args:
+            owner: 命令所属的处理器或模块名称
+            command (str): 命令文本或正则表达式
+            kind (str): exact / prefix / regex
+
+        Raises:
+            ValueError: 命令类型不支持
+            re.error: 正则表达式有误
+        """
+        if kind not in COMMAND_KINDS:
+            raise ValueError(f"不支持的命令类型: {kind}")
+        if not command:
+            return
+        if kind != "regex":
+            command = command.lower()
+        else:
+            compiled = self._patterns.get(command) or re.compile(command)
+        key = (kind, command)
+        existing = self._commands.get(key)
+        if existing is None and isinstance(owner, str) and kind != "regex":
+            # exact 优先于 prefix，模块声明的同名命令也不能遮住处理器订阅的命令
+            other = self._commands.get(
+                ("prefix" if kind == "exact" else "exact", command)
+            )
+            if other is not None and not isinstance(other, str):
+                existing = other
+        if existing is not None and existing != owner:
+            if isinstance(owner, str) or not isinstance(existing, str):
+                logger.warning(
+                    f"命令 {command} 已被 {existing} 注册，忽略 {owner} 的注册"
+                )
+                return
+            logger.warning(
+                f"命令 {command} 已被模块 {existing} 声明，改由 {owner} 处理"
+            )
+        if not isinstance(owner, str) and kind == "prefix":
+            shadowing = self._commands.get(("exact", command))
+            if isinstance(shadowing, str):
+                logger.warning(
+                    f"命令 {command} 已被模块 {shadowing} 声明，改由 {owner} 处理"
+                )
+                del self._commands[("exact", command)]
+        self._commands[key] = owner
+        if kind == "regex":
+            self._patterns[command] = compiled
+        self._trie = None
+
+    def add_module(self, owner, module, menu_command=None):
+        """
+        注册模块声明的命令：SWITCH_NAME（及 SWITCH_NAME+菜单命令）为 exact，
+        COMMANDS 中的命令为 prefix
+        这些命令只用于填写 msg.command，模块仍按 SUBSCRIPTIONS 接收事件
+
+        Args:
+            owner: 模块名称
+            module: 模块对象（模块的 __init__.py）
+            menu_command (str, optional): 菜单命令后缀
+        """
+        switch_name = getattr(module, "SWITCH_NAME", "")
+        if switch_name:
+            self.add(owner, switch_name, "exact")
+            if menu_command:
+                self.add(owner, f"{switch_name}{menu_command}", "exact")
+        for command in getattr(module, "COMMANDS", None) or {}:
+            self.add(owner, command, "prefix")
+
+    def remove(self, owner):
+        """
+        移除某个处理器或模块的全部命令
+
+        Returns:
+            int: 移除的命令数量
+        """
+        keys = [key for key, value in self._commands.items() if value == owner]
+        for key in keys:
+            del self._commands[key]
+            if key[0] == "regex":
+                self._patterns.pop(key[1], None)
+        if keys:
+            self._trie = None
+        return len(keys)
+
+    def _compile(self):
+        """把已注册的 exact / prefix 命令编译为前缀树，整理 regex 命令的匹配顺序"""
+        trie = {}
+        regex_items = []
+        for (kind, command), owner in self._commands.items():
+            if kind == "regex":
+                regex_items.append((self._patterns[command], command, owner))
+                continue
+            node = trie
+            for char in command:
+                node = node.setdefault(char, {})
+            node[_EXACT if kind == "exact" else _PREFIX] = (owner, command)
+
+        # 各正则的分组名和分组编号互相独立，不合并为一个正则
+        self._regex_items = regex_items
+        self._trie = trie
+
+    def _match(self, text):
+        node = self._trie
+        best_prefix = None
+        lowered = text.lower()
+        for char in lowered:
+            prefix = node.get(_PREFIX)
+            if prefix is not None:
+                best_prefix = prefix
+            node = node.get(char)
+            if node is None:
+                break
+        else:
+            exact = node.get(_EXACT)
+            if exact is not None:
+                return CommandMatch(exact[0], exact[1], "exact", None)
+            prefix = node.get(_PREFIX)
+            if prefix is not None:
+                best_prefix = prefix
+        if best_prefix is not None:
+            return CommandMatch(best_prefix[0], best_prefix[1], "prefix", None)
+
+        for compiled, pattern, owner in self._regex_items:
+            matched = compiled.match(text)
+            if matched is not None:
+                return CommandMatch(owner, pattern, "regex", matched)
+        return None
+
+    def match(self, text):
+        """
+        查找消息匹配的命令
+
+        Args:
+            text (str): 消息原文 raw_message
+
+        Returns:
+            CommandMatch|None: 匹配结果，没有匹配的命令时返回None
+        """
+        if not text or not self._commands:
+            return None
+        if self._trie is None:
+            self._compile()
+        start = time.perf_counter_ns()
+        result = self._match(text)
+        cost = time.perf_counter_ns() - start
+        self.matches += 1
+        self._cost_total += cost
+        if cost > self._cost_max:
+            self._cost_max = cost
+        if result is not None:
+            self.hits += 1
+        return result
+
+    def get_stats(self):
+        """
+        获取命令匹配统计信息
+
+        Returns:
+            dict: 命令数量、匹配次数、命中次数、平均/最大匹配耗时（微秒）
+        """
+        return {
+            "commands": len(self._commands),
+            "matches": self.matches,
+            "hits": self.hits,
+            "avg_cost_us": (
+                self._cost_total / self.matches / 1000 if self.matches else 0.0
+            ),
+            "max_cost_us": self._cost_max / 1000,
+        }
+
+
+__all__ = ["CommandRouter", "CommandMatch", "COMMAND_KINDS"]
@@ -1,118 +1,282 @@
 """
 自动撤回自己发送的消息
+
+所有待撤回消息由一个调度器统一管理：
+- 内存中按撤回时间维护一个最小堆，只有一个后台任务等待最早到期的消息
+- 到期的消息一次性批量撤回
+- 撤回时间超过 PERSIST_THRESHOLD 秒的消息写入 SQLite，重启后只需一次查询即可恢复
 """
 
 from logger import logger
 import re
+import heapq
+import sqlite3
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from api.message import delete_msg
 import os
 import json
 import time
 
-DEL_MSG_DB_PATH = os.path.join("data", "Core", "del_msg.json")
+DEL_MSG_DB_PATH = os.path.join("data", "Core", "del_msg.db")
 
+# 旧版本使用的 JSON 存储，首次启动时迁移到数据库
+LEGACY_DEL_MSG_PATH = os.path.join("data", "Core", "del_msg.json")
 
-def load_del_msg_data():
-    """
-    加载待撤回消息数据
-    """
-    try:
-        if os.path.exists(DEL_MSG_DB_PATH):
-            with open(DEL_MSG_DB_PATH, "r", encoding="utf-8") as f:
-                return json.load(f)
-        return {}
-    except Exception as e:
-        logger.error(f"加载撤回消息数据失败: {e}")
-        return {}
+# 只持久化撤回时间超过该值的消息（秒），短时间撤回的消息丢失影响不大
+PERSIST_THRESHOLD = 120
 
+# 事件订阅：首次连接时恢复任务，发送消息类API的响应中提取del_msg
+SUBSCRIPTIONS = {"post_type": ["meta_event"], "echo": ["send_"]}
 
-def save_del_msg_data(data):
-    """
-    保存待撤回消息数据
-    """
-    try:
-        os.makedirs(os.path.dirname(DEL_MSG_DB_PATH), exist_ok=True)
-        with open(DEL_MSG_DB_PATH, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        logger.error(f"保存撤回消息数据失败: {e}")
 
+class DelMsgStore:
+    """待撤回消息的持久化队列，所有数据库操作在同一个后台线程中顺序执行"""
 
-def add_del_msg_task(msg_id, del_time):
-    """
-    添加待撤回消息任务到本地存储
-    """
-    try:
-        data = load_del_msg_data()
+    def __init__(self, db_path=DEL_MSG_DB_PATH):
+        self.db_path = db_path
+        self._conn = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="del-msg-db"
+        )
+
+    def _get_conn(self):
+        """获取数据库连接，首次调用时建表并迁移旧数据（仅在后台线程中调用）"""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(self.db_path)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS del_msg_tasks (
+                    message_id INTEGER PRIMARY KEY,
+                    delete_timestamp REAL NOT NULL,
+                    del_time INTEGER NOT NULL
+                )
+            """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_delete_timestamp ON del_msg_tasks(delete_timestamp)"
+            )
+            conn.commit()
+            self._conn = conn
+            self._migrate_legacy()
+        return self._conn
+
+    def _migrate_legacy(self):
+        """把旧版 JSON 文件中的任务导入数据库，导入成功后删除该文件"""
+        if not os.path.exists(LEGACY_DEL_MSG_PATH):
+            return
+        try:
+            with open(LEGACY_DEL_MSG_PATH, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            rows = [
+                (
+                    int(msg_id),
+                    task_info.get("delete_timestamp", 0),
+                    task_info.get("del_time", 0),
+                )
+                for msg_id, task_info in data.items()
+            ]
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO del_msg_tasks VALUES (?, ?, ?)", rows
+                )
+            os.remove(LEGACY_DEL_MSG_PATH)
+            logger.info(f"已迁移 {len(rows)} 条撤回任务到数据库")
+        except Exception as e:
+            logger.error(f"迁移撤回消息数据失败: {e}")
+
+    def _add(self, message_id, delete_timestamp, del_time):
+        with self._get_conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO del_msg_tasks VALUES (?, ?, ?)",
+                (message_id, delete_timestamp, del_time),
+            )
+
+    def _remove(self, message_ids):
+        with self._get_conn() as conn:
+            conn.executemany(
+                "DELETE FROM del_msg_tasks WHERE message_id = ?",
+                [(message_id,) for message_id in message_ids],
+            )
+
+    def _load(self):
+        cursor = self._get_conn().execute(
+            "SELECT message_id, delete_timestamp FROM del_msg_tasks ORDER BY delete_timestamp"
+        )
+        return cursor.fetchall()
+
+    async def _run(self, func, *args):
+        """在后台线程中执行数据库操作"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def add(self, message_id, delete_timestamp, del_time):
+        """写入一条待撤回消息"""
+        await self._run(self._add, message_id, delete_timestamp, del_time)
+
+    async def remove(self, message_ids):
+        """批量移除已撤回的消息"""
+        await self._run(self._remove, list(message_ids))
+
+    async def load(self):
+        """
+        读取所有待撤回消息
+
+        Returns:
+            list: [(message_id, delete_timestamp)]，按撤回时间排序
+        """
+        return await self._run(self._load)
+
+
+class RecallScheduler:
+    """撤回调度器 - 最小堆 + 单个后台任务"""
+
+    def __init__(self, store):
+        self.store = store
+        self.websocket = None
+        # [(delete_timestamp, message_id)]
+        self._heap = []
+        # message_id -> delete_timestamp，用于去重和识别堆中过期的条目
+        self._scheduled = {}
+        # 已持久化的消息，撤回后需要从数据库中移除
+        self._persisted = set()
+        self._wakeup = None
+        self._task = None
+        self._restored = False
+
+    def bind(self, websocket):
+        """绑定当前连接，后台任务未运行时启动"""
+        self.websocket = websocket
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def _push(self, message_id, delete_timestamp):
+        """加入堆，如果比当前最早的任务还早则唤醒后台任务"""
+        self._scheduled[message_id] = delete_timestamp
+        heapq.heappush(self._heap, (delete_timestamp, message_id))
+        if self._heap[0][1] == message_id and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def schedule(self, websocket, message_id, del_time):
+        """
+        添加撤回任务
+
+        Args:
+            websocket: WebSocket连接对象
+            message_id (int): 消息ID
+            del_time (int): 多少秒后撤回
+        """
+        self.bind(websocket)
         delete_timestamp = time.time() + del_time
-        data[str(msg_id)] = {
-            "message_id": msg_id,
-            "delete_timestamp": delete_timestamp,
-            "del_time": del_time,
-        }
-        save_del_msg_data(data)
-        logger.info(f"已添加消息 {msg_id} 到撤回任务列表，将在 {del_time} 秒后撤回")
-    except Exception as e:
-        logger.error(f"添加撤回消息任务失败: {e}")
+        self._push(message_id, delete_timestamp)
+        logger.info(f"自动撤回消息: {message_id} 将在 {del_time} 秒后撤回")
 
+        if del_time > PERSIST_THRESHOLD:
+            self._persisted.add(message_id)
+            try:
+                await self.store.add(message_id, delete_timestamp, del_time)
+                logger.info(f"[Core]待撤回消息已存储到本地: 消息 {message_id}")
+            except Exception as e:
+                logger.error(f"添加撤回消息任务失败: {e}")
 
-def remove_del_msg_task(msg_id):
-    """
-    从本地存储中移除已撤回的消息任务
-    """
-    try:
-        data = load_del_msg_data()
-        if str(msg_id) in data:
-            del data[str(msg_id)]
-            save_del_msg_data(data)
-            logger.info(f"已从撤回任务列表中移除消息 {msg_id}")
-    except Exception as e:
-        logger.error(f"移除撤回消息任务失败: {e}")
+    async def restore(self, websocket):
+        """
+        恢复重启前的撤回任务，每个进程只从数据库加载一次，
+        断线重连时内存中的任务继续有效，只需绑定新连接
+        """
+        self.bind(websocket)
+        if self._restored:
+            return
+        self._restored = True
 
+        try:
+            rows = await self.store.load()
+        except Exception as e:
+            logger.error(f"恢复撤回消息任务失败: {e}")
+            return
 
-async def restore_del_msg_tasks(websocket):
-    """
-    恢复重启前的撤回消息任务
-    """
-    try:
-        data = load_del_msg_data()
         current_time = time.time()
+        restored = 0
+        for message_id, delete_timestamp in rows:
+            if message_id in self._scheduled:
+                continue
+            self._persisted.add(message_id)
+            self._push(message_id, delete_timestamp)
+            restored += 1
+        if restored:
+            overdue = sum(1 for _, ts in rows if ts <= current_time)
+            logger.info(
+                f"恢复撤回任务 {restored} 条，其中 {overdue} 条已过期将立即撤回"
+            )
 
-        for msg_id, task_info in list(data.items()):
-            delete_timestamp = task_info.get("delete_timestamp", 0)
-            remaining_time = delete_timestamp - current_time
+    def _pop_due(self, now):
+        """取出所有已到期的消息"""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            delete_timestamp, message_id = heapq.heappop(self._heap)
+            # 同一消息重复添加时，只处理最新的一条
+            if self._scheduled.get(message_id) != delete_timestamp:
+                continue
+            del self._scheduled[message_id]
+            due.append(message_id)
+        return due
 
-            if remaining_time > 0:
-                # 如果还没到撤回时间，重新创建任务
-                logger.info(
-                    f"恢复撤回任务: 消息 {msg_id} 将在 {remaining_time:.1f} 秒后撤回"
-                )
-                asyncio.create_task(
-                    del_self_msg(websocket, int(msg_id), remaining_time)
-                )
-            else:
-                # 如果已经超过撤回时间，立即撤回
-                logger.info(f"立即撤回过期消息: {msg_id}")
-                asyncio.create_task(del_self_msg(websocket, int(msg_id), 0))
-    except Exception as e:
-        logger.error(f"恢复撤回消息任务失败: {e}")
+    async def _run(self):
+        """后台任务：等待最早到期的消息，到期后批量撤回"""
+        while True:
+            try:
+                self._wakeup.clear()
+                if self._heap:
+                    timeout = max(0.0, self._heap[0][0] - time.time())
+                else:
+                    timeout = None
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                    # 有更早的任务加入，重新计算等待时间
+                    continue
+                except asyncio.TimeoutError:
+                    pass
 
+                due = self._pop_due(time.time())
+                if due:
+                    await self._recall(due)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"撤回调度出错: {e}")
+
+    async def _recall(self, message_ids):
+        """批量撤回消息，并从数据库中移除"""
+        for message_id in message_ids:
+            # 撤回失败也要移除任务，避免重复尝试
+            try:
+                await delete_msg(self.websocket, message_id)
+            except Exception as e:
+                logger.error(f"撤回消息 {message_id} 失败: {e}")
+
+        persisted = [
+            message_id for message_id in message_ids if message_id in self._persisted
+        ]
+        if persisted:
+            self._persisted.difference_update(persisted)
+            try:
+                await self.store.remove(persisted)
+                logger.info(f"已从撤回任务列表中移除 {len(persisted)} 条消息")
+            except Exception as e:
+                logger.error(f"移除撤回消息任务失败: {e}")
+
+    def get_pending_count(self):
+        """获取待撤回消息数量"""
+        return len(self._scheduled)
 
-async def del_self_msg(websocket, msg_id, del_time):
-    """
-    定时撤回消息
-    """
-    logger.info(f"自动撤回消息: {msg_id} 将在 {del_time} 秒后撤回")
-    await asyncio.sleep(del_time)
-    try:
-        await delete_msg(websocket, msg_id)
-        # 撤回成功后从本地存储中移除
-        remove_del_msg_task(msg_id)
-    except Exception as e:
-        logger.error(f"撤回消息 {msg_id} 失败: {e}")
-        # 撤回失败也要移除任务，避免重复尝试
-        remove_del_msg_task(msg_id)
+
+# 全局撤回调度器实例
+recall_scheduler = RecallScheduler(DelMsgStore())
 
 
 async def handle_events(websocket, msg):
@@ -120,29 +284,24 @@ async def handle_events(websocket, msg):
     处理回应事件
     """
     try:
-        # 处理首次连接事件，扫描本地存储中的待撤回消息
+        # 处理首次连接事件，恢复本地存储中的待撤回消息
         if (
             msg.get("post_type") == "meta_event"
             and msg.get("meta_event_type") == "lifecycle"
             and msg.get("sub_type") == "connect"
         ):
-            await restore_del_msg_tasks(websocket)
+            await recall_scheduler.restore(websocket)
             return
 
         # 处理回应事件
         if msg.get("status") == "ok":
             echo = msg.get("echo", {})
             # 格式：del_msg=秒数
+            # 发送接口不等待响应，撤回时间随 note 写在 echo 中，只能从响应的 echo 中读取
             res = re.search(r"del_msg=(\d+)", echo)
             if res:
                 del_time = int(res.group(1))
                 message_id = msg.get("data", {}).get("message_id")
-
-                if del_time > 120:  # 只对超过120秒的进行存储
-                    add_del_msg_task(message_id, del_time)
-                    logger.info(f"[Core]待撤回消息已存储到本地: 消息 {message_id}")
-
-                # 无论是否存储，都创建撤回任务
-                asyncio.create_task(del_self_msg(websocket, message_id, del_time))
+                await recall_scheduler.schedule(websocket, message_id, del_time)
     except Exception as e:
         logger.error(f"自动撤回发送的消息失败: {e}")
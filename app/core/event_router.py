@@ -0,0 +1,228 @@
+"""
+事件路由表
+根据各模块声明的 SUBSCRIPTIONS 建立索引，只把事件分发给关心它的处理器
+
+SUBSCRIPTIONS 格式示例：
+    SUBSCRIPTIONS = {
+        "post_type": ["message", "meta_event"],  # 接收这些 post_type 的全部事件
+        "notice_type": ["group_increase"],       # 只接收这些类型的通知事件
+        "echo": ["get_group_list"],              # 接收 echo 以这些前缀开头的 API 响应
+        "command": ["menu"],                     # 只接收以这些命令开头的消息
+    }
+未声明 SUBSCRIPTIONS（或为 None）的处理器接收全部事件，保持原有行为
+命令由 core.command_router 统一匹配，每条消息最多分发给一个命令订阅者
+"""
+
+from core.command_router import CommandRouter
+
+# 支持的订阅字段
+SUBSCRIPTION_KEYS = ("post_type", "notice_type", "echo", "command")
+
+
+class EventRouter:
+    """事件路由表 - 按 post_type / notice_type / echo 前缀 / 命令索引处理器"""
+
+    def __init__(self):
+        # 处理器注册顺序，用于保证分发顺序与加载顺序一致
+        self._order = {}
+        self._next_order = 0
+        # 订阅全部事件的处理器
+        self._wildcard = []
+        # post_type -> [handler]
+        self._post_type_index = {}
+        # notice_type -> [handler]
+        self._notice_type_index = {}
+        # [(echo前缀, handler)]
+        self._echo_prefixes = []
+        # (post_type, notice_type) -> [handler]，事件类型组合有限，缓存路由结果
+        self._route_cache = {}
+        # 命令路由表，包括处理器订阅的命令和各模块声明的命令
+        self.commands = CommandRouter()
+
+    def __len__(self):
+        return len(self._order)
+
+    @staticmethod
+    def normalize_subscriptions(subscriptions):
+        """
+        校验并规范化订阅声明
+
+        Returns:
+            dict|None: 规范化后的订阅，None 表示订阅全部事件
+        """
+        if subscriptions is None:
+            return None
+        if not isinstance(subscriptions, dict):
+            raise ValueError(f"SUBSCRIPTIONS 必须是字典，当前为 {type(subscriptions)}")
+
+        normalized = {}
+        for key, values in subscriptions.items():
+            if key not in SUBSCRIPTION_KEYS:
+                raise ValueError(f"不支持的订阅字段: {key}")
+            if isinstance(values, str):
+                values = [values]
+            normalized[key] = tuple(str(value) for value in values)
+        return normalized
+
+    def add(self, handler, subscriptions=None, order=None):
+        """
+        注册处理器
+
+        Args:
+            handler: 异步处理函数 handler(websocket, msg)
+            subscriptions: 订阅声明，None 表示接收全部事件
+            order (int, optional): 分发顺序，默认排在已注册的处理器之后
+        """
+        subscriptions = self.normalize_subscriptions(subscriptions)
+        if order is None:
+            order = self._next_order
+            self._next_order += 1
+        self._order[handler] = order
+
+        if subscriptions is None:
+            self._wildcard.append(handler)
+        else:
+            for post_type in subscriptions.get("post_type", ()):
+                self._post_type_index.setdefault(post_type, []).append(handler)
+            for notice_type in subscriptions.get("notice_type", ()):
+                self._notice_type_index.setdefault(notice_type, []).append(handler)
+            for prefix in subscriptions.get("echo", ()):
+                self._echo_prefixes.append((prefix, handler))
+            for command in subscriptions.get("command", ()):
+                self.commands.add(handler, command, "prefix")
+
+        self._route_cache.clear()
+
+    def remove(self, handler):
+        """
+        移除处理器及其订阅的命令
+
+        Returns:
+            bool: 处理器是否已注册
+        """
+        if self._order.pop(handler, None) is None:
+            return False
+        # 替换为新列表，不修改已经交给分发方的列表
+        self._wildcard = [item for item in self._wildcard if item is not handler]
+        for index in (self._post_type_index, self._notice_type_index):
+            for key in list(index):
+                handlers = [item for item in index[key] if item is not handler]
+                if handlers:
+                    index[key] = handlers
+                else:
+                    del index[key]
+        self._echo_prefixes = [
+            item for item in self._echo_prefixes if item[1] is not handler
+        ]
+        self.commands.remove(handler)
+        self._route_cache.clear()
+        return True
+
+    def replace(self, old_handler, new_handler, subscriptions=None):
+        """
+        用新处理器替换旧处理器，分发顺序不变
+        替换过程中没有 await，正在分发的事件要么全部使用旧处理器，要么全部使用新处理器
+
+        Args:
+            old_handler: 已注册的处理器，未注册时新处理器排在最后
+            new_handler: 新的处理器
+            subscriptions: 新处理器的订阅声明
+        """
+        # 先校验订阅，声明有误时保留旧处理器
+        self.normalize_subscriptions(subscriptions)
+        order = self._order.get(old_handler)
+        self.remove(old_handler)
+        self.add(new_handler, subscriptions, order)
+
+    def match_command(self, msg):
+        """
+        查找消息事件匹配的命令
+
+        Args:
+            msg: 已解析的事件字典
+
+        Returns:
+            CommandMatch|None: 匹配结果，非消息事件或没有匹配的命令时返回None
+        """
+        if msg.get("post_type") != "message":
+            return None
+        return self.commands.match(msg.get("raw_message"))
+
+    def route(self, msg, command=None):
+        """
+        获取应处理该事件的处理器列表
+
+        Args:
+            msg: 已解析的事件字典
+            command (CommandMatch, optional): match_command 的结果，
+                命令属于某个处理器时把该处理器加入列表
+
+        Returns:
+            list: 按注册顺序排列的处理器列表
+        """
+        post_type = msg.get("post_type")
+
+        # API 响应没有 post_type，按 echo 前缀匹配
+        if post_type is None:
+            echo = msg.get("echo")
+            if not isinstance(echo, str) or not self._echo_prefixes:
+                return self._wildcard
+            matched = [
+                handler
+                for prefix, handler in self._echo_prefixes
+                if echo.startswith(prefix)
+            ]
+            if not matched:
+                return self._wildcard
+            return self._merge(self._wildcard, matched)
+
+        notice_type = msg.get("notice_type") if post_type == "notice" else None
+        cache_key = (post_type, notice_type)
+        handlers = self._route_cache.get(cache_key)
+        if handlers is None:
+            handlers = self._merge(
+                self._wildcard,
+                self._post_type_index.get(post_type, []),
+                self._notice_type_index.get(notice_type, []) if notice_type else [],
+            )
+            self._route_cache[cache_key] = handlers
+        if command is not None and command.owner in self._order:
+            if command.owner not in handlers:
+                return self._merge(handlers, [command.owner])
+        return handlers
+
+    def _merge(self, *handler_lists):
+        """合并多个处理器列表，去重并按注册顺序排序"""
+        merged = set()
+        for handlers in handler_lists:
+            merged.update(handlers)
+        return sorted(merged, key=self._order.__getitem__)
+
+    def describe(self):
+        """返回路由表概况，用于日志"""
+        return (
+            f"全量订阅 {len(self._wildcard)} 个, "
+            f"post_type {sorted(self._post_type_index)}, "
+            f"notice_type {sorted(self._notice_type_index)}, "
+            f"echo前缀 {len(self._echo_prefixes)} 个, "
+            f"命令 {len(self.commands)} 个"
+        )
+
+
+def get_subscriptions(*sources):
+    """
+    从模块对象中读取 SUBSCRIPTIONS 声明，按顺序取第一个存在的声明
+
+    Args:
+        *sources: 模块对象，例如模块的 main 和包本身
+
+    Returns:
+        dict|None: 订阅声明
+    """
+    for source in sources:
+        if source is not None and hasattr(source, "SUBSCRIPTIONS"):
+            return getattr(source, "SUBSCRIPTIONS")
+    return None
+
+
+__all__ = ["EventRouter", "get_subscriptions", "SUBSCRIPTION_KEYS"]
@@ -0,0 +1,250 @@
+"""
+事件对象
+每条websocket消息只解析一次，生成一个只读的事件对象，所有模块共用
+
+- 常用字段在创建时提取，QQ号、群号、消息ID统一转为字符串，缺失时为空字符串
+- formatted_time 等派生字段在第一次访问时计算并缓存
+- 事件对象同时是只读的 Mapping，msg.get("group_id")、msg["post_type"] 等旧写法照常可用，
+  原始字典可通过 msg.raw 获取
+
+示例：
+    async def handle_events(websocket, msg):
+        if isinstance(msg, GroupMessageEvent):
+            logger.info(f"[{msg.formatted_time}]{msg.group_id} {msg.raw_message}")
+"""
+
+from collections.abc import Mapping
+from datetime import datetime
+
+# 尚未计算的派生字段
+_UNSET = object()
+
+
+def _str_id(value):
+    """QQ号、群号等转为字符串，缺失时为空字符串"""
+    return "" if value is None else str(value)
+
+
+class Event(Mapping):
+    """
+    事件基类，未识别类型的事件也使用该类
+
+    Attributes:
+        raw (dict): 原始消息
+        time (int|None): 事件时间戳
+        self_id (str): 机器人QQ号
+        post_type (str): 事件类型
+    """
+
+    __slots__ = ("raw", "time", "self_id", "post_type", "_formatted_time")
+
+    def __init__(self, raw):
+        _set = object.__setattr__
+        _set(self, "raw", raw)
+        _set(self, "time", raw.get("time"))
+        _set(self, "self_id", _str_id(raw.get("self_id")))
+        _set(self, "post_type", raw.get("post_type", ""))
+        _set(self, "_formatted_time", _UNSET)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"事件对象是只读的，不能修改 {name}")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"事件对象是只读的，不能删除 {name}")
+
+    # 兼容原来的字典写法
+    def __getitem__(self, key):
+        return self.raw[key]
+
+    def __iter__(self):
+        return iter(self.raw)
+
+    def __len__(self):
+        return len(self.raw)
+
+    def __contains__(self, key):
+        return key in self.raw
+
+    def get(self, key, default=None):
+        return self.raw.get(key, default)
+
+    def __repr__(self):
+        return repr(self.raw)
+
+    @property
+    def formatted_time(self):
+        """格式化的事件时间，如 2025-01-01 12:00:00，没有时间戳时为空字符串"""
+        value = self._formatted_time
+        if value is _UNSET:
+            value = (
+                datetime.fromtimestamp(self.time).strftime("%Y-%m-%d %H:%M:%S")
+                if self.time
+                else ""
+            )
+            object.__setattr__(self, "_formatted_time", value)
+        return value
+
+
+class MessageEvent(Event):
+    """消息事件基类"""
+
+    __slots__ = (
+        "message_type",
+        "sub_type",
+        "message_id",
+        "user_id",
+        "message",
+        "raw_message",
+        "sender",
+        "nickname",
+        "command",
+    )
+
+    def __init__(self, raw, command=None):
+        super().__init__(raw)
+        _set = object.__setattr__
+        sender = raw.get("sender") or {}
+        _set(self, "message_type", raw.get("message_type", ""))
+        _set(self, "sub_type", raw.get("sub_type", ""))
+        _set(self, "message_id", _str_id(raw.get("message_id")))
+        _set(self, "user_id", _str_id(raw.get("user_id")))
+        _set(self, "message", raw.get("message", []))  # 消息段数组
+        _set(self, "raw_message", raw.get("raw_message", ""))  # 原始消息
+        _set(self, "sender", sender)  # 发送者信息
+        _set(self, "nickname", sender.get("nickname", ""))  # 昵称
+        # 匹配到的命令（core.command_router.CommandMatch），没有匹配时为None
+        _set(self, "command", command)
+
+
+class GroupMessageEvent(MessageEvent):
+    """群消息事件"""
+
+    __slots__ = ("group_id", "card", "role")
+
+    def __init__(self, raw, command=None):
+        super().__init__(raw, command)
+        _set = object.__setattr__
+        _set(self, "group_id", _str_id(raw.get("group_id")))
+        _set(self, "card", self.sender.get("card", ""))  # 群名片
+        _set(self, "role", self.sender.get("role", ""))  # 群身份
+
+
+class PrivateMessageEvent(MessageEvent):
+    """私聊消息事件，sub_type 为 friend（好友）或 group（群临时会话）"""
+
+    __slots__ = ("group_id",)
+
+    def __init__(self, raw, command=None):
+        super().__init__(raw, command)
+        _set = object.__setattr__
+        # 群临时会话时为来源群号
+        _set(self, "group_id", _str_id(raw.get("group_id")))
+
+
+class NoticeEvent(Event):
+    """通知事件"""
+
+    __slots__ = ("notice_type", "sub_type", "user_id", "group_id", "operator_id")
+
+    def __init__(self, raw):
+        super().__init__(raw)
+        _set = object.__setattr__
+        _set(self, "notice_type", raw.get("notice_type", ""))
+        _set(self, "sub_type", raw.get("sub_type", ""))
+        _set(self, "user_id", _str_id(raw.get("user_id")))
+        _set(self, "group_id", _str_id(raw.get("group_id")))
+        _set(self, "operator_id", _str_id(raw.get("operator_id")))
+
+
+class RequestEvent(Event):
+    """请求事件（加好友、加群）"""
+
+    __slots__ = ("request_type", "sub_type", "user_id", "group_id", "comment", "flag")
+
+    def __init__(self, raw):
+        super().__init__(raw)
+        _set = object.__setattr__
+        _set(self, "request_type", raw.get("request_type", ""))
+        _set(self, "sub_type", raw.get("sub_type", ""))
+        _set(self, "user_id", _str_id(raw.get("user_id")))
+        _set(self, "group_id", _str_id(raw.get("group_id")))
+        _set(self, "comment", raw.get("comment", ""))  # 验证信息
+        _set(self, "flag", raw.get("flag", ""))  # 处理请求时使用
+
+
+class MetaEvent(Event):
+    """元事件（心跳、生命周期）"""
+
+    __slots__ = ("meta_event_type", "sub_type")
+
+    def __init__(self, raw):
+        super().__init__(raw)
+        _set = object.__setattr__
+        _set(self, "meta_event_type", raw.get("meta_event_type", ""))
+        _set(self, "sub_type", raw.get("sub_type", ""))
+
+
+class ApiResponse(Event):
+    """API 响应"""
+
+    __slots__ = ("status", "retcode", "data", "message", "wording", "echo")
+
+    def __init__(self, raw):
+        super().__init__(raw)
+        _set = object.__setattr__
+        _set(self, "status", raw.get("status", ""))
+        _set(self, "retcode", raw.get("retcode"))
+        _set(self, "data", raw.get("data"))
+        _set(self, "message", raw.get("message", ""))
+        _set(self, "wording", raw.get("wording", ""))
+        _set(self, "echo", raw.get("echo", ""))
+
+
+# post_type -> 事件类，消息事件按 message_type 区分
+EVENT_TYPES = {
+    "notice": NoticeEvent,
+    "request": RequestEvent,
+    "meta_event": MetaEvent,
+}
+
+# 消息事件类，message_sent 为机器人自己发送的消息
+MESSAGE_TYPES = {"group": GroupMessageEvent, "private": PrivateMessageEvent}
+
+
+def parse_event(msg, command=None):
+    """
+    将解析后的消息转换为事件对象，已经是事件对象时原样返回
+
+    Args:
+        msg (dict): 已解析的websocket消息
+        command (CommandMatch, optional): 消息匹配到的命令
+
+    Returns:
+        Event: 对应类型的事件对象
+    """
+    if isinstance(msg, Event):
+        return msg
+    post_type = msg.get("post_type")
+    if post_type in ("message", "message_sent"):
+        cls = MESSAGE_TYPES.get(msg.get("message_type"), MessageEvent)
+        return cls(msg, command)
+    if post_type is not None:
+        cls = EVENT_TYPES.get(post_type, Event)
+    elif "echo" in msg or "status" in msg:
+        cls = ApiResponse
+    else:
+        cls = Event
+    return cls(msg)
+
+
+__all__ = [
+    "Event",
+    "MessageEvent",
+    "GroupMessageEvent",
+    "PrivateMessageEvent",
+    "NoticeEvent",
+    "RequestEvent",
+    "MetaEvent",
+    "ApiResponse",
+    "parse_event",
+]
@@ -5,7 +5,10 @@ from api.message import send_private_msg
 import os
 import json
 import time
+from collections import namedtuple
+from utils.storage import storage
 from . import switchs
+from .group_roster import roster_store
 
 DATA_DIR = os.path.join("data", "Core", "get_group_list.json")
 MEMBER_DATA_DIR = os.path.join("data", "Core", "group_member_list")
@@ -14,16 +17,86 @@ MEMBER_DATA_DIR = os.path.join("data", "Core", "group_member_list")
 last_request_time = 0
 REQUEST_INTERVAL = 300  # 5分钟，单位：秒
 
+# 事件订阅：借助心跳定时刷新，群名变更（notify）和进退群时立即刷新
+SUBSCRIPTIONS = {
+    "post_type": ["meta_event"],
+    "notice_type": ["notify", "group_increase", "group_decrease"],
+    "echo": ["get_group_list"],
+}
+
+
+# 群信息记录
+GroupInfo = namedtuple("GroupInfo", ["group_name", "member_count", "max_member_count"])
+
+
+class GroupListIndex:
+    """群列表内存索引 - 群号 -> GroupInfo"""
+
+    def __init__(self):
+        self._loaded = False
+        # (群号 -> GroupInfo, 按群列表顺序排列的群号)，整体替换，查询时不会看到一半的数据
+        self._snapshot = ({}, ())
+
+    def _ensure_loaded(self):
+        """首次查询时从文件加载群列表"""
+        if self._loaded:
+            return
+        self._loaded = True
+
+        if not os.path.exists(DATA_DIR):
+            logger.warning(f"[Core]群列表文件不存在: {DATA_DIR}")
+            return
+
+        try:
+            with open(DATA_DIR, "r", encoding="utf-8") as f:
+                self.rebuild(json.load(f))
+        except Exception as e:
+            logger.error(f"[Core]读取群列表文件失败: {e}")
+
+    def rebuild(self, group_list):
+        """
+        根据完整的群列表重建索引
+
+        Args:
+            group_list (list): get_group_list 响应中的 data
+        """
+        groups = {}
+        for group in group_list:
+            if not group.get("group_id"):
+                continue
+            groups[str(group.get("group_id"))] = GroupInfo(
+                group.get("group_name"),
+                group.get("member_count", 0),
+                group.get("max_member_count", 0),
+            )
+        self._snapshot = (groups, tuple(groups))
+        self._loaded = True
+
+    def get(self, group_id):
+        """
+        获取群信息
+
+        Returns:
+            GroupInfo|None: 群信息，找不到时返回None
+        """
+        self._ensure_loaded()
+        return self._snapshot[0].get(str(group_id))
+
+    def get_group_ids(self):
+        """获取所有群号，按群列表顺序排列"""
+        self._ensure_loaded()
+        return self._snapshot[1]
+
+
+# 全局群列表索引实例
+group_index = GroupListIndex()
+
 
 def save_group_list_to_file(item):
     """
-    保存群列表信息到文件，确保文件夹存在
+    保存群列表信息到文件，在存储线程池中异步写入
     """
-    dir_path = os.path.dirname(DATA_DIR)
-    if not os.path.exists(dir_path):
-        os.makedirs(dir_path, exist_ok=True)
-    with open(DATA_DIR, "w", encoding="utf-8") as f:
-        json.dump(item, f, ensure_ascii=False, indent=2)
+    storage.write_json(DATA_DIR, item)
 
 
 def get_group_name_by_id(group_id):
@@ -37,25 +110,11 @@ def get_group_name_by_id(group_id):
         str: 群名称，如果找不到则返回None
     """
     try:
-        # 确保群号是字符串格式
-        group_id = str(group_id)
-
-        # 检查文件是否存在
-        if not os.path.exists(DATA_DIR):
-            logger.warning(f"[Core]群列表文件不存在: {DATA_DIR}")
+        group = group_index.get(group_id)
+        if group is None:
+            logger.warning(f"[Core]未找到群号 {group_id} 对应的群名")
             return None
-
-        # 读取群列表文件
-        with open(DATA_DIR, "r", encoding="utf-8") as f:
-            group_list = json.load(f)
-
-        # 查找匹配的群号
-        for group in group_list:
-            if str(group.get("group_id")) == group_id:
-                return group.get("group_name")
-
-        logger.warning(f"[Core]未找到群号 {group_id} 对应的群名")
-        return None
+        return group.group_name
 
     except Exception as e:
         logger.error(f"[Core]获取群名失败: {e}")
@@ -70,21 +129,8 @@ def get_all_group_ids():
         list: 群号列表，如果获取失败则返回空列表
     """
     try:
-        # 检查文件是否存在
-        if not os.path.exists(DATA_DIR):
-            logger.warning(f"[Core]群列表文件不存在: {DATA_DIR}")
-            return []
-
-        # 读取群列表文件
-        with open(DATA_DIR, "r", encoding="utf-8") as f:
-            group_list = json.load(f)
-
-        # 提取所有群号
-        group_ids = [
-            str(group.get("group_id")) for group in group_list if group.get("group_id")
-        ]
-
-        logger.info(f"[Core]获取到 {len(group_ids)} 个群号, 群号列表: {group_ids}")
+        group_ids = list(group_index.get_group_ids())
+        logger.debug(f"[Core]获取到 {len(group_ids)} 个群号")
         return group_ids
 
     except Exception as e:
@@ -109,45 +155,44 @@ def get_group_member_info_by_id(group_id):
               如果找不到则返回None
     """
     try:
-        # 确保群号是字符串格式
-        group_id = str(group_id)
-
-        # 检查文件是否存在
-        if not os.path.exists(DATA_DIR):
-            logger.warning(f"[Core]群列表文件不存在: {DATA_DIR}")
+        group = group_index.get(group_id)
+        if group is None:
+            logger.warning(f"[Core]未找到群号 {group_id} 对应的成员信息")
             return None
 
-        # 读取群列表文件
-        with open(DATA_DIR, "r", encoding="utf-8") as f:
-            group_list = json.load(f)
-
-        # 查找匹配的群号
-        for group in group_list:
-            if str(group.get("group_id")) == group_id:
-                member_info = {
-                    "member_count": group.get("member_count", 0),
-                    "max_member_count": group.get("max_member_count", 0),
-                    "group_name": group.get("group_name", ""),
-                }
-                logger.info(
-                    f"[Core]获取群 {group_id} 成员信息: 当前人数 {member_info['member_count']}, 最大人数 {member_info['max_member_count']}, 群名 {member_info['group_name']}"
-                )
-                return member_info
-
-        logger.warning(f"[Core]未找到群号 {group_id} 对应的成员信息")
-        return None
+        return {
+            "member_count": group.member_count,
+            "max_member_count": group.max_member_count,
+            "group_name": group.group_name or "",
+        }
 
     except Exception as e:
         logger.error(f"[Core]获取群成员信息失败: {e}")
         return None
 
 
-def clean_old_group_member_data():
+def _list_member_data_files():
+    """列出群成员数据文件（在存储线程池中执行），目录不存在时返回None"""
+    if not os.path.exists(MEMBER_DATA_DIR):
+        return None
+    return [f for f in os.listdir(MEMBER_DATA_DIR) if f.endswith(".json")]
+
+
+def _remove_file(file_path):
+    """删除文件（在存储线程池中执行），文件不存在时返回False"""
+    if not os.path.exists(file_path):
+        return False
+    os.remove(file_path)
+    return True
+
+
+async def clean_old_group_member_data():
     """
     清理不在当前群列表中的群成员数据文件
 
     检查 group_member_list 目录中的所有文件，如果对应的群号不在当前群列表中，
     则删除该群的成员数据文件（说明机器人已经不在该群了）
+    读取目录和删除文件在存储线程池中执行，不阻塞事件循环
 
     Returns:
         tuple: (cleaned_count, error_count) 清理的文件数量和出错的文件数量
@@ -159,21 +204,18 @@ def clean_old_group_member_data():
             logger.warning("[Core]当前群列表为空，跳过清理群成员数据")
             return 0, 0
 
-        # 检查群成员数据目录是否存在
-        if not os.path.exists(MEMBER_DATA_DIR):
-            logger.info("[Core]群成员数据目录不存在，无需清理")
-            return 0, 0
-
         # 获取所有群成员数据文件
-        member_data_files = []
         try:
-            member_data_files = [
-                f for f in os.listdir(MEMBER_DATA_DIR) if f.endswith(".json")
-            ]
+            member_data_files = await storage.run(_list_member_data_files)
         except Exception as e:
             logger.error(f"[Core]读取群成员数据目录失败: {e}")
             return 0, 1
 
+        # 检查群成员数据目录是否存在
+        if member_data_files is None:
+            logger.info("[Core]群成员数据目录不存在，无需清理")
+            return 0, 0
+
         if not member_data_files:
             logger.info("[Core]群成员数据目录为空，无需清理")
             return 0, 0
@@ -182,9 +224,10 @@ def clean_old_group_member_data():
         stored_group_ids = [f.replace(".json", "") for f in member_data_files]
 
         # 找出不在当前群列表中的群号
+        current_group_id_set = set(current_group_ids)
         groups_to_clean = []
         for stored_group_id in stored_group_ids:
-            if stored_group_id not in current_group_ids:
+            if stored_group_id not in current_group_id_set:
                 groups_to_clean.append(stored_group_id)
 
         if not groups_to_clean:
@@ -198,8 +241,10 @@ def clean_old_group_member_data():
         for group_id in groups_to_clean:
             try:
                 file_path = os.path.join(MEMBER_DATA_DIR, f"{group_id}.json")
-                if os.path.exists(file_path):
-                    os.remove(file_path)
+                # 取消尚未写入的成员列表，避免删除后又被写回
+                storage.discard(file_path)
+                if await storage.run(_remove_file, file_path):
+                    roster_store.remove_group(group_id)
                     cleaned_count += 1
                     logger.info(f"[Core]已清理群 {group_id} 的成员数据文件")
                 else:
@@ -273,7 +318,8 @@ async def handle_events(websocket, msg):
         if msg.get("status") == "ok":
             echo = msg.get("echo", "")
             if echo == "get_group_list":
-                # 保存data
+                # 重建内存索引并保存data
+                group_index.rebuild(msg.get("data", []))
                 save_group_list_to_file(msg.get("data", []))
                 logger.info(f"[Core]已保存群列表")
                 # 群列表更新后，清理不在群列表中的群成员数据和开关数据
@@ -283,12 +329,14 @@ async def handle_events(websocket, msg):
 
                     # 清理群成员数据
                     member_cleaned_count, member_error_count = (
-                        clean_old_group_member_data()
+                        await clean_old_group_member_data()
                     )
 
                     # 清理群开关数据
                     switch_cleaned_count, switch_error_count, switch_cleaned_groups = (
-                        switchs.clean_invalid_group_switches(current_group_ids)
+                        await switchs.clean_invalid_group_switches_async(
+                            current_group_ids
+                        )
                     )
 
                     # 统计总的清理结果
@@ -2,31 +2,29 @@ import asyncio
 import re
 from logger import logger
 from config import OWNER_ID
-from api.group import get_group_member_list
+from api.base import call_api
 from api.message import send_private_msg
-import os
-import json
 import time
-from .get_group_list import get_all_group_ids
-
-DATA_DIR = os.path.join("data", "Core", "group_member_list")
-
-# 全局变量，记录上次请求时间
-last_request_time = 0
-REQUEST_INTERVAL = 300  # 5分钟，单位：秒
-
-
-def save_group_member_list_to_file(group_id, data):
-    """
-    保存群成员列表信息到文件，确保文件夹存在
-    """
-    # 文件路径
-    file_path = os.path.join(DATA_DIR, f"{group_id}.json")
-    # 确保文件夹存在
-    os.makedirs(DATA_DIR, exist_ok=True)
-    # 保存数据
-    with open(file_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+from utils.rate_limit import TokenBucket
+from .get_group_list import group_index
+from .group_roster import DATA_DIR, roster_store, save_group_member_list_to_file
+
+# 刷新调度参数
+REQUEST_INTERVAL = 300  # 每个群的常规刷新间隔，5分钟，单位：秒
+FORCE_REFRESH_INTERVAL = 3600  # 成员数没有变化时最多跳过的时间，单位：秒
+DIRTY_REFRESH_DELAY = 2  # 进退群后延迟刷新，合并短时间内的多条通知，单位：秒
+REFRESH_RATE = 2  # 每秒最多发出的请求数
+REFRESH_BURST = 5  # 允许的突发请求数
+MAX_CONCURRENT_REFRESH = 4  # 同时等待响应的请求数上限
+SCHEDULER_TICK = 1  # 调度间隔，单位：秒
+
+# 事件订阅：连接建立时绑定后台刷新任务，进退群时优先刷新对应群，
+# 管理员和群名片变动时增量更新名单，接收模块主动请求的成员列表响应
+SUBSCRIPTIONS = {
+    "post_type": ["meta_event"],
+    "notice_type": ["group_increase", "group_decrease", "group_admin", "group_card"],
+    "echo": ["get_group_member_list"],
+}
 
 
 def get_group_member_user_ids(group_id):
@@ -40,29 +38,8 @@ def get_group_member_user_ids(group_id):
         list: QQ号列表，如果找不到则返回空列表，QQ号是str类型
     """
     try:
-        # 确保群号是字符串格式
-        group_id = str(group_id)
-
-        # 构建文件路径
-        file_path = os.path.join(DATA_DIR, f"{group_id}.json")
-
-        # 检查文件是否存在
-        if not os.path.exists(file_path):
-            logger.warning(f"[Core]群成员列表文件不存在: {file_path}")
-            return []
-
-        # 读取群成员列表文件
-        with open(file_path, "r", encoding="utf-8") as f:
-            member_list = json.load(f)
-
-        # 提取所有成员的QQ号
-        user_ids = []
-        for member in member_list:
-            user_id = member.get("user_id")
-            if user_id:
-                user_ids.append(str(user_id))
-
-        logger.info(
+        user_ids = roster_store.get_user_ids(group_id)
+        logger.debug(
             f"[Core]成功获取群 {group_id} 的成员QQ号列表，共 {len(user_ids)} 个成员"
         )
         return user_ids
@@ -86,27 +63,12 @@ def get_group_name_by_id(group_id):
         # 确保群号是字符串格式
         group_id = str(group_id)
 
-        # 构建文件路径
-        file_path = os.path.join(DATA_DIR, f"{group_id}.json")
-
-        # 检查文件是否存在
-        if not os.path.exists(file_path):
-            logger.warning(f"[Core]群成员列表文件不存在: {file_path}")
-            return None
-
-        # 读取群成员列表文件
-        with open(file_path, "r", encoding="utf-8") as f:
-            member_list = json.load(f)
+        # 有该群的成员数据，说明机器人在群内
+        if roster_store.has_group(group_id):
+            # 成员列表中没有群名信息，需要调用群列表相关函数
+            from .get_group_list import get_group_name_by_id as get_name_from_list
 
-        # 从第一个成员中获取群号，验证是否匹配
-        if member_list and len(member_list) > 0:
-            stored_group_id = str(member_list[0].get("group_id", ""))
-            if stored_group_id == group_id:
-                # 这里需要从群列表中获取群名，而不是从成员列表
-                # 成员列表中没有群名信息，需要调用群列表相关函数
-                from .get_group_list import get_group_name_by_id as get_name_from_list
-
-                return get_name_from_list(group_id)
+            return get_name_from_list(group_id)
 
         logger.warning(f"[Core]未找到群号 {group_id} 对应的群成员信息")
         return None
@@ -116,6 +78,190 @@ def get_group_name_by_id(group_id):
         return None
 
 
+def update_group_member_list(group_id, member_list):
+    """
+    用完整的成员列表更新群成员名单
+
+    Args:
+        group_id (str): 群号
+        member_list (list): get_group_member_list 响应中的 data
+
+    Returns:
+        bool: 是否成功更新（成员列表为空时返回False）
+    """
+    if not member_list:
+        logger.warning(
+            f"[Core]群 {group_id} 的成员列表为空，跳过保存，可能是机器人非管理员"
+        )
+        return False
+
+    # 更新内存名单，文件在后台异步写入
+    if roster_store.replace_group(group_id, member_list):
+        logger.info(f"[Core]已更新群 {group_id} 的成员列表")
+    else:
+        logger.debug(f"[Core]群 {group_id} 的成员列表没有变化")
+    return True
+
+
+class MemberListRefresher:
+    """
+    群成员列表后台刷新调度器
+
+    - 独立的后台任务按固定间隔调度，不依赖收到的事件
+    - 令牌桶限制请求速率，同时等待响应的请求数有上限
+    - 有进退群通知的群优先刷新，其余按上次刷新时间从早到晚排列
+    - 群人数与本地名单一致的群跳过刷新，但不超过 FORCE_REFRESH_INTERVAL
+    """
+
+    def __init__(self):
+        self.websocket = None
+        self._task = None
+        # 正在执行的刷新任务，事件循环只保留任务的弱引用，需要在这里持有
+        self._tasks = set()
+        self._bucket = TokenBucket(REFRESH_RATE, REFRESH_BURST)
+        # group_id -> 上次刷新完成的时间
+        self._last_refreshed = {}
+        # group_id -> 标记需要刷新的时间
+        self._dirty = {}
+        # 正在等待响应的群
+        self._in_flight = set()
+        # 统计信息
+        self.requests = 0
+        self.failures = 0
+        self.skipped = 0
+
+    def bind(self, websocket):
+        """绑定当前连接，后台任务未运行时启动"""
+        self.websocket = websocket
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def mark_dirty(self, group_id):
+        """标记某群需要优先刷新"""
+        self._dirty.setdefault(str(group_id), time.monotonic())
+
+    def forget(self, group_id):
+        """移除某群的调度记录（机器人已不在该群）"""
+        group_id = str(group_id)
+        self._dirty.pop(group_id, None)
+        self._last_refreshed.pop(group_id, None)
+
+    def _is_unchanged(self, group_id):
+        """群列表中的人数与本地名单人数一致，认为名单没有变化"""
+        group = group_index.get(group_id)
+        members = roster_store.get_group(group_id)
+        return (
+            group is not None
+            and members is not None
+            and group.member_count == len(members)
+        )
+
+    def _next_groups(self, now):
+        """
+        获取需要刷新的群号，按优先级排列
+
+        Returns:
+            list: 进退群的群在前，其余按上次刷新时间从早到晚排列
+        """
+        dirty = sorted(
+            (marked_at, group_id)
+            for group_id, marked_at in self._dirty.items()
+            if now - marked_at >= DIRTY_REFRESH_DELAY
+            and group_id not in self._in_flight
+        )
+        due = []
+        for group_id in group_index.get_group_ids():
+            if group_id in self._in_flight or group_id in self._dirty:
+                continue
+            last_refreshed = self._last_refreshed.get(group_id)
+            if last_refreshed is not None and now - last_refreshed < REQUEST_INTERVAL:
+                continue
+            if (
+                last_refreshed is not None
+                and now - last_refreshed < FORCE_REFRESH_INTERVAL
+                and self._is_unchanged(group_id)
+            ):
+                # 视为已刷新，到下个常规间隔再检查
+                self._last_refreshed[group_id] = now
+                self.skipped += 1
+                continue
+            due.append((last_refreshed or 0, group_id))
+        due.sort()
+        return [group_id for _, group_id in dirty] + [group_id for _, group_id in due]
+
+    async def _run(self):
+        """后台调度循环"""
+        while True:
+            try:
+                await asyncio.sleep(SCHEDULER_TICK)
+                if self.websocket is None:
+                    continue
+                for group_id in self._next_groups(time.monotonic()):
+                    if len(self._in_flight) >= MAX_CONCURRENT_REFRESH:
+                        break
+                    if not self._bucket.try_acquire():
+                        break
+                    self._in_flight.add(group_id)
+                    task = asyncio.create_task(self._refresh(self.websocket, group_id))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[Core]群成员列表刷新调度出错: {e}")
+
+    async def _refresh(self, websocket, group_id):
+        """请求并更新单个群的成员列表"""
+        started_at = time.monotonic()
+        try:
+            self.requests += 1
+            response = await call_api(
+                websocket, "get_group_member_list", {"group_id": group_id}
+            )
+            if response and response.get("status") == "ok":
+                update_group_member_list(group_id, response.get("data") or [])
+            else:
+                self.failures += 1
+                logger.warning(f"[Core]刷新群 {group_id} 的成员列表失败")
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"[Core]刷新群 {group_id} 的成员列表失败: {e}")
+        finally:
+            # 失败时同样等到下个常规间隔再重试，避免反复请求
+            self._last_refreshed[group_id] = time.monotonic()
+            # 请求期间又收到的进退群通知保留，下一轮继续刷新
+            if self._dirty.get(group_id, started_at) <= started_at:
+                self._dirty.pop(group_id, None)
+            self._in_flight.discard(group_id)
+
+    def close(self):
+        """停止后台调度任务和正在执行的刷新任务"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for task in list(self._tasks):
+            task.cancel()
+
+    def get_stats(self):
+        """
+        获取刷新统计信息
+
+        Returns:
+            dict: 请求次数、失败次数、跳过次数、待优先刷新和等待响应的群数量
+        """
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "dirty": len(self._dirty),
+            "in_flight": len(self._in_flight),
+        }
+
+
+# 全局刷新调度器实例
+member_list_refresher = MemberListRefresher()
+
+
 async def handle_events(websocket, msg):
     """
     处理群成员列表回应事件
@@ -150,45 +296,53 @@ async def handle_events(websocket, msg):
         "echo": null                  # 回显字段，用于请求和响应的匹配
     }
     """
-    global last_request_time
     try:
-        current_time = int(time.time())
-        # 检查距离上次请求是否已超过指定时间
-        if current_time - last_request_time >= REQUEST_INTERVAL:
-            last_request_time = current_time
-            # 延迟2秒让群列表更新
-            await asyncio.sleep(2)
-            group_ids = get_all_group_ids()
-            for group_id in group_ids:
-                await get_group_member_list(websocket, group_id)
+        # 绑定当前连接，后台任务按自己的节奏刷新所有群
+        member_list_refresher.bind(websocket)
 
         # 群通知事件
-        # 如果有进群退群的通知（系统触发，不受请求间隔限制）
+        # 如果有进群退群的通知，标记该群优先刷新
         if (
             msg.get("notice_type") == "group_increase"
             or msg.get("notice_type") == "group_decrease"
         ):
             group_id = str(msg.get("group_id"))
-            # 发送获取该群的群成员列表的请求
-            await get_group_member_list(websocket, group_id)
+            user_id = msg.get("user_id")
+            # 先增量更新名单，完整列表返回后再整体替换
+            if msg.get("notice_type") == "group_increase":
+                roster_store.add_member(group_id, user_id)
+            elif str(user_id) == str(msg.get("self_id")):
+                # 机器人自己退群或被踢，不再保留该群名单
+                roster_store.remove_group(group_id)
+                member_list_refresher.forget(group_id)
+                return
+            else:
+                roster_store.remove_member(group_id, user_id)
+            member_list_refresher.mark_dirty(group_id)
+
+        # 管理员变动通知
+        if msg.get("notice_type") == "group_admin":
+            role = "admin" if msg.get("sub_type") == "set" else "member"
+            roster_store.update_member(
+                msg.get("group_id"), msg.get("user_id"), role=role
+            )
+
+        # 群名片变更通知
+        if msg.get("notice_type") == "group_card":
+            roster_store.update_member(
+                msg.get("group_id"), msg.get("user_id"), card=msg.get("card_new") or ""
+            )
 
         # 回应消息事件
         if msg.get("status") == "ok":
             echo = msg.get("echo", "")
+            # 后台刷新通过 call_api 等待响应，这里只处理模块调用
+            # api.group.get_group_member_list 主动请求的响应，群号只能从 echo 中读取
             if echo.startswith("get_group_member_list"):
                 # 正则提取group_id
                 group_id = re.search(r"group_id=(\d+)", echo)
                 if group_id:
-                    if msg.get("data", []):
-                        # 保存data
-                        save_group_member_list_to_file(
-                            group_id.group(1), msg.get("data", [])
-                        )
-                        logger.info(f"[Core]已保存群 {group_id.group(1)} 的成员列表")
-                    else:
-                        logger.warning(
-                            f"[Core]群 {group_id.group(1)} 的成员列表为空，跳过保存，可能是机器人非管理员"
-                        )
+                    update_group_member_list(group_id.group(1), msg.get("data", []))
                 else:
                     logger.error(f"[Core]无法提取群号: {echo}")
     except Exception as e:
@@ -216,24 +370,17 @@ def get_user_role_in_group(group_id, user_id):
         group_id = str(group_id)
         user_id = str(user_id)
 
-        # 构建文件路径
-        file_path = os.path.join(DATA_DIR, f"{group_id}.json")
-
-        # 检查文件是否存在
-        if not os.path.exists(file_path):
-            logger.warning(f"[Core]群成员列表文件不存在: {file_path}")
+        # 没有该群的成员数据
+        if not roster_store.has_group(group_id):
             return None
 
-        # 读取群成员列表文件
-        with open(file_path, "r", encoding="utf-8") as f:
-            member_list = json.load(f)
-
         # 查找指定用户
-        for member in member_list:
-            if str(member.get("user_id")) == user_id:
-                role = member.get("role", "member")
-                logger.info(f"[Core]用户 {user_id} 在群 {group_id} 中的身份为: {role}")
-                return role
+        member = roster_store.get_member(group_id, user_id)
+        if member is not None:
+            logger.debug(
+                f"[Core]用户 {user_id} 在群 {group_id} 中的身份为: {member.role}"
+            )
+            return member.role
 
         # 用户不在群内
         logger.warning(f"[Core]用户 {user_id} 不在群 {group_id} 中")
@@ -272,3 +419,20 @@ def is_user_owner(group_id, user_id):
     """
     role = get_user_role_in_group(group_id, user_id)
     return role == "owner"
+
+
+# DATA_DIR 和 save_group_member_list_to_file 已移到 group_roster，这里继续导出，兼容旧的导入方式
+__all__ = [
+    "DATA_DIR",
+    "REQUEST_INTERVAL",
+    "save_group_member_list_to_file",
+    "get_group_member_user_ids",
+    "get_group_name_by_id",
+    "update_group_member_list",
+    "MemberListRefresher",
+    "member_list_refresher",
+    "handle_events",
+    "get_user_role_in_group",
+    "is_user_admin_or_owner",
+    "is_user_owner",
+]
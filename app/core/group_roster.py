@@ -0,0 +1,194 @@
+"""
+群成员名单内存存储
+每个群的成员按 QQ号 建立索引，只保留身份、群名片、昵称三个字段，
+权限判断等查询直接读内存，不再每次打开并解析整个群成员列表文件
+
+数据来源：
+- 首次查询某群时从 data/Core/group_member_list/<群号>.json 加载
+- 收到 get_group_member_list 响应时整体替换，名单有变化时由存储线程池异步写回文件
+- 收到进群、退群、管理员变动、群名片变更通知时增量更新内存，下一次完整刷新时一定写回文件
+"""
+
+import os
+import sys
+import json
+from collections import namedtuple
+from logger import logger
+from utils.storage import storage
+
+DATA_DIR = os.path.join("data", "Core", "group_member_list")
+
+# 成员记录：role 为 owner/admin/member
+RosterMember = namedtuple("RosterMember", ["role", "card", "nickname"])
+
+
+def save_group_member_list_to_file(group_id, data):
+    """
+    保存群成员列表信息到文件，在存储线程池中异步写入，
+    同一个群在写入完成前收到的新列表只写最后一份
+    """
+    storage.write_json(os.path.join(DATA_DIR, f"{group_id}.json"), data)
+
+
+def _build_member(member):
+    """把接口返回的成员信息压缩为成员记录"""
+    return RosterMember(
+        sys.intern(member.get("role") or "member"),
+        member.get("card") or "",
+        member.get("nickname") or "",
+    )
+
+
+class GroupRosterStore:
+    """群成员名单存储 - 群号 -> {QQ号: RosterMember}"""
+
+    def __init__(self):
+        # group_id -> {user_id: RosterMember}，None 表示本地没有该群的成员数据
+        self._groups = {}
+        # 内存中增量更新过、与文件内容不一致的群
+        self._dirty = set()
+
+    def _load(self, group_id):
+        """从文件加载某群的成员名单"""
+        file_path = os.path.join(DATA_DIR, f"{group_id}.json")
+        if not os.path.exists(file_path):
+            logger.warning(f"[Core]群成员列表文件不存在: {file_path}")
+            return None
+
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                member_list = json.load(f)
+        except Exception as e:
+            logger.error(f"[Core]读取群成员列表文件失败: {e}")
+            return None
+
+        return {
+            str(member.get("user_id")): _build_member(member)
+            for member in member_list
+            if member.get("user_id")
+        }
+
+    def get_group(self, group_id):
+        """
+        获取某群的成员名单，首次访问时从文件加载
+
+        Args:
+            group_id (str或int): 群号
+
+        Returns:
+            dict|None: {QQ号: RosterMember}，没有该群数据时返回None
+        """
+        group_id = str(group_id)
+        if group_id not in self._groups:
+            self._groups[group_id] = self._load(group_id)
+        return self._groups[group_id]
+
+    def has_group(self, group_id):
+        """判断是否有某群的成员数据"""
+        return self.get_group(group_id) is not None
+
+    def get_member(self, group_id, user_id):
+        """
+        获取群成员记录
+
+        Returns:
+            RosterMember|None: 成员记录，不在群内或没有该群数据时返回None
+        """
+        members = self.get_group(group_id)
+        if members is None:
+            return None
+        return members.get(str(user_id))
+
+    def get_user_ids(self, group_id):
+        """获取某群所有成员的QQ号列表，QQ号为str类型"""
+        members = self.get_group(group_id)
+        if members is None:
+            return []
+        return list(members)
+
+    def replace_group(self, group_id, member_list):
+        """
+        用完整的成员列表替换某群的名单，名单有变化时异步写回文件
+
+        Args:
+            group_id (str或int): 群号
+            member_list (list): get_group_member_list 响应中的 data
+
+        Returns:
+            bool: 名单是否有变化
+        """
+        group_id = str(group_id)
+        members = {
+            str(member.get("user_id")): _build_member(member)
+            for member in member_list
+            if member.get("user_id")
+        }
+        # 只比较名单中保留的字段，发言时间等其他字段的变化不触发写文件；
+        # 增量更新过的群内存与文件不一致，即使名单相同也要写回
+        if group_id not in self._dirty and members == self._groups.get(group_id):
+            return False
+        self._groups[group_id] = members
+        self._dirty.discard(group_id)
+        save_group_member_list_to_file(group_id, member_list)
+        return True
+
+    def add_member(self, group_id, user_id, role="member", card="", nickname=""):
+        """
+        增量添加成员（进群通知），该群数据未加载时跳过，等待完整列表刷新
+        """
+        members = self.get_group(group_id)
+        if members is not None:
+            members[str(user_id)] = RosterMember(sys.intern(role), card, nickname)
+            self._dirty.add(str(group_id))
+
+    def remove_member(self, group_id, user_id):
+        """增量移除成员（退群通知）"""
+        members = self.get_group(group_id)
+        if members is not None and members.pop(str(user_id), None) is not None:
+            self._dirty.add(str(group_id))
+
+    def update_member(self, group_id, user_id, **fields):
+        """
+        增量更新成员字段（管理员变动、群名片变更通知）
+
+        Args:
+            group_id (str或int): 群号
+            user_id (str或int): 用户QQ号
+            **fields: 要更新的字段，role/card/nickname
+        """
+        members = self.get_group(group_id)
+        if members is None:
+            return
+        user_id = str(user_id)
+        member = members.get(user_id)
+        if member is not None:
+            if "role" in fields:
+                fields["role"] = sys.intern(fields["role"])
+            members[user_id] = member._replace(**fields)
+            self._dirty.add(str(group_id))
+
+    def remove_group(self, group_id):
+        """移除某群的成员名单（机器人已不在该群）"""
+        self._groups.pop(str(group_id), None)
+        self._dirty.discard(str(group_id))
+
+    async def flush(self):
+        """等待所有写文件任务完成"""
+        await storage.flush()
+
+    def get_stats(self):
+        """
+        获取存储统计信息
+
+        Returns:
+            dict: 已加载的群数量、成员总数
+        """
+        loaded = [members for members in self._groups.values() if members is not None]
+        return {
+            "groups": len(loaded),
+            "members": sum(len(members) for members in loaded),
+        }
+
+
+# 全局群成员名单实例
+roster_store = GroupRosterStore()
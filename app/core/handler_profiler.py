@@ -0,0 +1,307 @@
+"""
+处理器性能分析
+按处理器和事件类型记录两种耗时：
+
+- 总耗时：从开始处理到处理完毕，包括等待 API 响应、asyncio.sleep 等
+- 阻塞耗时：处理器自身代码占用事件循环的时间（同步的文件读写、SQLite 查询、计算等），
+  这段时间内其他事件都无法处理
+
+单次阻塞超过 SLOW_HANDLER_THRESHOLD 时，后台线程采样事件循环线程的调用栈，
+记录处理器正卡在哪一行；定期把阻塞耗时最高的处理器汇总发给机器人管理员
+
+默认关闭，在 .env 中设置 PROFILE_HANDLERS=true 开启
+"""
+
+import sys
+import time
+import asyncio
+import threading
+import traceback
+from collections import deque
+from logger import logger
+from config import (
+    OWNER_ID,
+    PROFILE_HANDLERS,
+    SLOW_HANDLER_THRESHOLD,
+    PROFILE_REPORT_INTERVAL,
+    PROFILE_TOP_N,
+)
+from api.message import send_private_msg
+from utils import metrics
+from utils.generate import generate_text_message
+
+# 每个处理器保留的调用栈样本数量
+MAX_STACK_SAMPLES = 3
+
+# 调用栈样本保留的帧数
+STACK_DEPTH = 8
+
+# 总耗时超过阈值的多少倍时记录日志，总耗时包含等待API响应的时间，因此阈值放宽
+SLOW_WALL_FACTOR = 10
+
+SLOW_HANDLERS = metrics.counter(
+    "bot_slow_handlers_total", "处理器超过耗时阈值的次数", ["handler", "kind"]
+)
+
+
+def get_event_type(msg):
+    """
+    事件类型，用于分类统计
+
+    Returns:
+        str: 如 message/group、notice/group_increase、meta_event/heartbeat、response
+    """
+    post_type = msg.get("post_type")
+    if post_type is None:
+        return "response"
+    sub = (
+        msg.get("message_type")
+        or msg.get("notice_type")
+        or msg.get("request_type")
+        or msg.get("meta_event_type")
+    )
+    return f"{post_type}/{sub}" if sub else post_type
+
+
+class HandlerStats:
+    """单个处理器在某类事件上的耗时统计"""
+
+    __slots__ = (
+        "count",
+        "wall_total",
+        "wall_max",
+        "busy_total",
+        "busy_max",
+        "slow",
+        "samples",
+    )
+
+    def __init__(self):
+        self.count = 0
+        self.wall_total = 0.0
+        self.wall_max = 0.0
+        self.busy_total = 0.0
+        self.busy_max = 0.0
+        self.slow = 0
+        # 阻塞时采样的调用栈
+        self.samples = deque(maxlen=MAX_STACK_SAMPLES)
+
+
+class _TimedCoroutine:
+    """
+    逐步驱动协程并记录每一步的执行时间
+    协程每次从 await 恢复到再次挂起之间的时间就是它占用事件循环的时间
+    """
+
+    def __init__(self, profiler, name, coro):
+        self.profiler = profiler
+        self.name = name
+        self.coro = coro
+        self.busy = 0.0
+        self.longest = 0.0
+
+    def __await__(self):
+        value, error = None, None
+        while True:
+            start = time.perf_counter()
+            self.profiler._step_started(self.name, start)
+            try:
+                if error is None:
+                    yielded = self.coro.send(value)
+                else:
+                    yielded = self.coro.throw(error)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                elapsed = time.perf_counter() - start
+                self.profiler._step_finished()
+                self.busy += elapsed
+                if elapsed > self.longest:
+                    self.longest = elapsed
+            try:
+                value, error = (yield yielded), None
+            except BaseException as e:
+                value, error = None, e
+
+
+class HandlerProfiler:
+    """处理器性能分析器"""
+
+    def __init__(
+        self,
+        enabled=PROFILE_HANDLERS,
+        threshold=SLOW_HANDLER_THRESHOLD,
+        report_interval=PROFILE_REPORT_INTERVAL,
+        top_n=PROFILE_TOP_N,
+    ):
+        self.enabled = enabled
+        self.threshold = threshold
+        self.report_interval = report_interval
+        self.top_n = top_n
+        # (处理器名称, 事件类型) -> HandlerStats
+        self._stats = {}
+        self.websocket = None
+        self._task = None
+        # 当前正在执行的步骤：(处理器名称, 开始时间)，由采样线程读取
+        self._current = None
+        self._sampled = None
+        self._loop_thread_id = None
+        self._watchdog = None
+        self._pending_samples = []
+
+    def bind(self, websocket):
+        """绑定当前连接，启动采样线程和定期汇报任务"""
+        if not self.enabled:
+            return
+        self.websocket = websocket
+        self._loop_thread_id = threading.get_ident()
+        if self._watchdog is None:
+            self._watchdog = threading.Thread(
+                target=self._watch, name="handler-watchdog", daemon=True
+            )
+            self._watchdog.start()
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def _step_started(self, name, start):
+        self._current = (name, start)
+
+    def _step_finished(self):
+        self._current = None
+
+    def _watch(self):
+        """采样线程：某一步执行时间超过阈值时，记录事件循环线程的调用栈"""
+        interval = max(self.threshold / 2, 0.01)
+        while True:
+            time.sleep(interval)
+            current = self._current
+            if current is None or current is self._sampled:
+                continue
+            name, start = current
+            elapsed = time.perf_counter() - start
+            if elapsed < self.threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = "".join(traceback.format_stack(frame)[-STACK_DEPTH:])
+            self._sampled = current
+            # 在采样线程中只记录，统计由事件循环线程合并
+            self._pending_samples.append((name, elapsed, stack))
+
+    def _get_stats(self, name, event_type):
+        stats = self._stats.get((name, event_type))
+        if stats is None:
+            stats = self._stats[(name, event_type)] = HandlerStats()
+        return stats
+
+    def _collect_samples(self, name, stats):
+        """把采样线程记录的调用栈归入对应处理器"""
+        while self._pending_samples:
+            sample_name, elapsed, stack = self._pending_samples.pop(0)
+            if sample_name == name:
+                stats.samples.append((elapsed, stack))
+            else:
+                self._get_stats(sample_name, "unknown").samples.append((elapsed, stack))
+
+    async def run(self, handler, websocket, msg):
+        """
+        执行处理器并记录耗时
+
+        Args:
+            handler: 异步处理函数 handler(websocket, msg)
+            websocket: WebSocket连接对象
+            msg: 事件
+        """
+        name = handler.__module__
+        timed = _TimedCoroutine(self, name, handler(websocket, msg))
+        start = time.perf_counter()
+        try:
+            return await timed
+        finally:
+            wall = time.perf_counter() - start
+            event_type = get_event_type(msg)
+            stats = self._get_stats(name, event_type)
+            stats.count += 1
+            stats.wall_total += wall
+            stats.wall_max = max(stats.wall_max, wall)
+            stats.busy_total += timed.busy
+            stats.busy_max = max(stats.busy_max, timed.busy)
+            if self._pending_samples:
+                self._collect_samples(name, stats)
+            if timed.longest >= self.threshold:
+                stats.slow += 1
+                SLOW_HANDLERS.inc(name, "blocking")
+                logger.warning(
+                    f"[Profiler]{name} 处理 {event_type} 时阻塞事件循环 "
+                    f"{timed.longest * 1000:.0f}ms（总耗时 {wall * 1000:.0f}ms）"
+                    + (f"\n{stats.samples[-1][1]}" if stats.samples else "")
+                )
+            elif wall >= self.threshold * SLOW_WALL_FACTOR:
+                SLOW_HANDLERS.inc(name, "wall")
+                logger.info(
+                    f"[Profiler]{name} 处理 {event_type} 总耗时 {wall * 1000:.0f}ms"
+                )
+
+    def get_top(self, n=None, key="busy_total"):
+        """
+        获取耗时最高的处理器
+
+        Args:
+            n (int): 返回数量，默认 PROFILE_TOP_N
+            key (str): 排序字段，busy_total / wall_total / busy_max / wall_max
+
+        Returns:
+            list: [(处理器名称, 事件类型, HandlerStats)]
+        """
+        items = sorted(
+            self._stats.items(), key=lambda item: getattr(item[1], key), reverse=True
+        )
+        return [(name, event_type, stats) for (name, event_type), stats in items][
+            : n or self.top_n
+        ]
+
+    def generate_report(self):
+        """生成耗时汇总文本"""
+        top = self.get_top()
+        if not top:
+            return "处理器耗时统计：暂无数据"
+        lines = [f"处理器耗时 Top {len(top)}（按阻塞事件循环的总时间排序）"]
+        for index, (name, event_type, stats) in enumerate(top, 1):
+            lines.append(
+                f"{index}. {name} [{event_type}]\n"
+                f"   次数 {stats.count}，阻塞 共{stats.busy_total:.2f}s/"
+                f"最长{stats.busy_max * 1000:.0f}ms，"
+                f"总耗时 平均{stats.wall_total / stats.count * 1000:.0f}ms/"
+                f"最长{stats.wall_max * 1000:.0f}ms，超阈值 {stats.slow} 次"
+            )
+            if stats.samples:
+                # 只附上最近一次采样的最后一帧，完整调用栈见日志
+                last_frame = stats.samples[-1][1].strip().splitlines()[-2:]
+                lines.append("   " + " ".join(line.strip() for line in last_frame))
+        return "\n".join(lines)
+
+    def reset(self):
+        """清空统计数据"""
+        self._stats.clear()
+
+    async def _run(self):
+        """定期向管理员发送汇总"""
+        while True:
+            await asyncio.sleep(self.report_interval)
+            try:
+                if self._stats:
+                    report = self.generate_report()
+                    logger.info(f"[Profiler]{report}")
+                    await send_private_msg(
+                        self.websocket, OWNER_ID, [generate_text_message(report)]
+                    )
+                    self.reset()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[Profiler]发送处理器耗时汇总失败: {e}")
+
+
+# 全局处理器性能分析实例
+handler_profiler = HandlerProfiler()
@@ -0,0 +1,293 @@
+"""
+事件处理流水线
+收到的 websocket 消息先进入有界队列，再由固定数量的工作任务处理，
+任务数量和内存占用不再随消息量无限增长
+
+- 按会话（群聊按群号、私聊按QQ号）分队列，工作任务轮流从各会话取事件，
+  刷屏的群不会挤占其他群的处理机会
+- call_api 等待的响应不进入队列，直接交给调用方，较大的响应不在接收循环中解析
+- 心跳事件只保留最新一条，重复推送的状态类通知（进退群、管理员变动等）直接丢弃
+- 队列满时丢弃积压最多的会话中最早的事件，模块自行处理的 API 响应（撤回、名单刷新等）不会被丢弃
+"""
+
+import time
+import asyncio
+from collections import OrderedDict, deque
+from logger import logger
+from api.base import resolve_response, resolve_raw_response
+from utils import json_codec, metrics
+from config import INBOUND_WORKERS, INBOUND_QUEUE_SIZE
+
+# 记录最近多少条通知用于去重
+NOTICE_DEDUP_SIZE = 512
+
+# 丢弃事件的告警日志最短间隔，单位：秒
+SHED_LOG_INTERVAL = 10
+
+# 心跳事件所在的会话
+HEARTBEAT_KEY = ("heartbeat",)
+
+# API 响应所在的会话，队列满时不丢弃
+RESPONSE_KEY = ("response",)
+
+# 参与去重的通知类型：同一秒内重复出现时只可能是重复推送。
+# 戳一戳等 notify 通知同一秒内可能真的发生多次，且没有能区分的字段，不去重
+DEDUP_NOTICE_TYPES = frozenset(
+    {
+        "group_increase",
+        "group_decrease",
+        "group_admin",
+        "group_ban",
+        "group_card",
+        "group_recall",
+        "friend_recall",
+        "friend_add",
+        "essence",
+    }
+)
+
+# 运行指标
+EVENTS_RECEIVED = metrics.counter(
+    "bot_events_received_total", "收到的websocket消息数", ["post_type"]
+)
+EVENTS_SHED = metrics.counter(
+    "bot_events_shed_total", "事件队列丢弃的事件数", ["reason"]
+)
+QUEUE_DEPTH = metrics.gauge("bot_inbound_queue_depth", "事件队列中等待处理的事件数")
+
+
+def get_session_key(msg):
+    """
+    获取事件所属的会话，用于分队列
+
+    Returns:
+        tuple: ("group", 群号) / ("private", QQ号) / (post_type,) / RESPONSE_KEY
+    """
+    if msg.get("post_type") is None:
+        return RESPONSE_KEY
+    if msg.get("group_id") is not None:
+        return ("group", msg["group_id"])
+    if msg.get("user_id") is not None:
+        return ("private", msg["user_id"])
+    if msg.get("meta_event_type") == "heartbeat":
+        return HEARTBEAT_KEY
+    return (msg.get("post_type"),)
+
+
+def get_notice_key(msg):
+    """通知事件的去重键，同一通知重复推送时各字段完全相同"""
+    return (
+        msg.get("time"),
+        msg.get("notice_type"),
+        msg.get("sub_type"),
+        msg.get("group_id"),
+        msg.get("user_id"),
+        msg.get("operator_id"),
+        msg.get("target_id"),
+        msg.get("message_id"),
+    )
+
+
+class InboundPipeline:
+    """
+    事件处理流水线
+
+    Args:
+        dispatch: 异步函数 dispatch(websocket, msg)，处理一条已解析的事件
+        workers (int): 工作任务数量
+        max_size (int): 队列容量
+    """
+
+    def __init__(self, dispatch, workers=INBOUND_WORKERS, max_size=INBOUND_QUEUE_SIZE):
+        self.dispatch = dispatch
+        self.worker_count = workers
+        self.max_size = max_size
+        # 会话 -> deque[(websocket, msg, 入队时间)]
+        self._sessions = OrderedDict()
+        self._size = 0
+        self._ready = asyncio.Event()
+        self._workers = []
+        # 最近的通知，用于去重
+        self._recent_notices = deque()
+        self._recent_notice_keys = set()
+        self._last_shed_log = 0
+        # 统计信息
+        self.received = 0
+        self.processed = 0
+        self.responses = 0
+        self.shed_heartbeats = 0
+        self.shed_duplicates = 0
+        self.shed_overflow = 0
+        self.max_depth = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def start(self):
+        """启动工作任务"""
+        QUEUE_DEPTH.set_function(lambda: self._size)
+        for index in range(self.worker_count):
+            self._workers.append(asyncio.create_task(self._worker(index)))
+
+    async def stop(self, timeout=5):
+        """
+        停止工作任务，先等待队列中的事件处理完
+
+        Args:
+            timeout (float): 最长等待时间（秒），超时后丢弃剩余事件
+        """
+        deadline = time.monotonic() + timeout
+        while self._size and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if self._size:
+            logger.warning(f"事件队列停止时仍有 {self._size} 条事件未处理，已丢弃")
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._sessions.clear()
+        self._size = 0
+
+    def _is_duplicate_notice(self, msg):
+        """判断通知是否重复推送，并记录该通知"""
+        key = get_notice_key(msg)
+        if key in self._recent_notice_keys:
+            return True
+        self._recent_notice_keys.add(key)
+        self._recent_notices.append(key)
+        if len(self._recent_notices) > NOTICE_DEDUP_SIZE:
+            self._recent_notice_keys.discard(self._recent_notices.popleft())
+        return False
+
+    def _log_shed(self, reason):
+        """丢弃事件时记录告警，限制日志频率"""
+        now = time.monotonic()
+        if now - self._last_shed_log >= SHED_LOG_INTERVAL:
+            self._last_shed_log = now
+            logger.warning(
+                f"事件队列{reason}，当前积压 {self._size} 条，统计: {self.get_stats()}"
+            )
+
+    def _shed_overflow(self):
+        """队列满时丢弃积压最多的会话中最早的事件，API 响应不丢弃"""
+        keys = [key for key in self._sessions if key != RESPONSE_KEY]
+        if not keys:
+            # 只积压了 API 响应，暂时超出容量
+            return
+        key = max(keys, key=lambda k: len(self._sessions[k]))
+        queue = self._sessions[key]
+        queue.popleft()
+        if not queue:
+            del self._sessions[key]
+        self._size -= 1
+        self.shed_overflow += 1
+        EVENTS_SHED.inc("overflow")
+        self._log_shed("已满，丢弃积压最多的会话中最早的事件")
+
+    def submit(self, websocket, message):
+        """
+        提交一条收到的websocket消息，不会阻塞接收循环
+
+        Args:
+            websocket: WebSocket连接对象
+            message (str): 原始消息
+        """
+        self.received += 1
+        # 较大的 call_api 响应不解析，由等待方解析
+        if resolve_raw_response(message):
+            self.responses += 1
+            EVENTS_RECEIVED.inc("response")
+            return
+        try:
+            msg = json_codec.loads(message)
+        except Exception as e:
+            logger.error(f"处理websocket消息的逻辑错误: {e}")
+            return
+        EVENTS_RECEIVED.inc(msg.get("post_type") or "response")
+
+        # call_api 等待的响应直接交给调用方，不进入队列
+        if resolve_response(msg):
+            self.responses += 1
+            return
+
+        key = get_session_key(msg)
+        if key == HEARTBEAT_KEY:
+            # 心跳只保留最新一条
+            pending = self._sessions.get(key)
+            if pending:
+                self._size -= len(pending)
+                self.shed_heartbeats += len(pending)
+                EVENTS_SHED.inc("heartbeat", amount=len(pending))
+                pending.clear()
+        elif (
+            msg.get("post_type") == "notice"
+            and msg.get("notice_type") in DEDUP_NOTICE_TYPES
+            and self._is_duplicate_notice(msg)
+        ):
+            self.shed_duplicates += 1
+            EVENTS_SHED.inc("duplicate")
+            return
+
+        if self._size >= self.max_size:
+            self._shed_overflow()
+
+        queue = self._sessions.get(key)
+        if queue is None:
+            queue = self._sessions[key] = deque()
+        queue.append((websocket, msg, time.monotonic()))
+        self._size += 1
+        self.max_depth = max(self.max_depth, self._size)
+        self._ready.set()
+
+    def _next(self):
+        """按会话轮流取出下一条事件"""
+        for key, queue in self._sessions.items():
+            item = queue.popleft()
+            if queue:
+                self._sessions.move_to_end(key)
+            else:
+                del self._sessions[key]
+            self._size -= 1
+            return item
+        return None
+
+    async def _worker(self, index):
+        """工作任务：循环取出事件并处理"""
+        while True:
+            item = self._next()
+            if item is None:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+
+            websocket, msg, enqueued_at = item
+            waited = time.monotonic() - enqueued_at
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+            try:
+                await self.dispatch(websocket, msg)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"事件处理任务 {index} 出错: {e}")
+            self.processed += 1
+
+    def get_stats(self):
+        """
+        获取流水线统计信息
+
+        Returns:
+            dict: 收到/处理的事件数、各类丢弃数量、当前和最大积压、平均/最大排队时间（秒）
+        """
+        return {
+            "received": self.received,
+            "processed": self.processed,
+            "responses": self.responses,
+            "queued": self._size,
+            "sessions": len(self._sessions),
+            "max_depth": self.max_depth,
+            "shed_heartbeats": self.shed_heartbeats,
+            "shed_duplicates": self.shed_duplicates,
+            "shed_overflow": self.shed_overflow,
+            "avg_wait": self._wait_total / self.processed if self.processed else 0.0,
+            "max_wait": self._wait_max,
+        }
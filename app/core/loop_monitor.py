@@ -0,0 +1,177 @@
+"""
+事件循环延迟监控
+后台任务每隔 CHECK_INTERVAL 秒醒来一次，实际醒来时间比预期晚多少就是事件循环的延迟。
+延迟超过 LOOP_LAG_THRESHOLD 说明有代码在事件循环中执行了阻塞操作（同步文件读写、
+SQLite 查询、requests 请求等），此时采样线程记录事件循环线程的调用栈，
+定位到项目代码中的模块和函数，写入日志和运行指标
+
+设置 LOOP_DEBUG=true 时同时开启 asyncio 的调试模式，
+asyncio 会报告每个执行时间超过阈值的回调（调试模式本身有一定开销）
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+from logger import logger
+from config import LOOP_LAG_THRESHOLD, LOOP_DEBUG
+from utils import metrics
+
+# 检查间隔，单位：秒
+CHECK_INTERVAL = 0.1
+
+# 调用栈样本保留的帧数
+STACK_DEPTH = 8
+
+# 项目代码所在目录，用于在调用栈中找到项目自己的代码
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LOOP_LAG = metrics.gauge("bot_event_loop_lag_seconds", "事件循环延迟（秒）", ["stat"])
+LOOP_STALLS = metrics.counter(
+    "bot_event_loop_stalls_total", "事件循环阻塞超过阈值的次数", ["location"]
+)
+
+
+def get_code_location(frame):
+    """
+    从调用栈中找到最内层的项目代码
+
+    Args:
+        frame: 调用栈最内层的帧
+
+    Returns:
+        str: 如 core.group_roster:save_group_member_list_to_file:42
+    """
+    innermost = frame
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename.startswith(APP_DIR) and filename != os.path.abspath(__file__):
+            module = os.path.splitext(os.path.relpath(filename, APP_DIR))[0]
+            module = module.replace(os.sep, ".")
+            return f"{module}:{frame.f_code.co_name}:{frame.f_lineno}"
+        frame = frame.f_back
+    code = innermost.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}:{innermost.f_lineno}"
+
+
+class _AsyncioLogHandler(logging.Handler):
+    """把 asyncio 调试模式的慢回调报告转到项目日志"""
+
+    def emit(self, record):
+        try:
+            logger.warning(f"[LoopMonitor]{record.getMessage()}")
+        except Exception:
+            pass
+
+
+class LoopMonitor:
+    """事件循环延迟监控"""
+
+    def __init__(self, threshold=LOOP_LAG_THRESHOLD, debug=LOOP_DEBUG):
+        self.threshold = threshold
+        self.debug = debug
+        self._task = None
+        self._watchdog = None
+        self._loop_thread_id = None
+        # 监控任务最近一次醒来的时间，采样线程据此判断事件循环是否卡住
+        self._last_tick = time.perf_counter()
+        # 采样线程记录的阻塞位置：(对应的 tick, 位置, 调用栈)
+        self._sample = None
+        # 统计信息
+        self.current_lag = 0.0
+        self.max_lag = 0.0
+        self.stalls = 0
+        self.locations = {}
+
+    def start(self):
+        """在当前事件循环中启动监控，已启动时不重复启动"""
+        if self._task is not None and not self._task.done():
+            return
+        loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        if self.debug:
+            loop.set_debug(True)
+            loop.slow_callback_duration = self.threshold
+            asyncio_logger = logging.getLogger("asyncio")
+            if not any(
+                isinstance(handler, _AsyncioLogHandler)
+                for handler in asyncio_logger.handlers
+            ):
+                asyncio_logger.addHandler(_AsyncioLogHandler(logging.WARNING))
+            logger.info("[LoopMonitor]已开启asyncio调试模式")
+        LOOP_LAG.set_function(
+            lambda: {"current": self.current_lag, "max": self.max_lag}
+        )
+        self._last_tick = time.perf_counter()
+        self._task = loop.create_task(self._run())
+        if self._watchdog is None:
+            self._watchdog = threading.Thread(
+                target=self._watch, name="loop-watchdog", daemon=True
+            )
+            self._watchdog.start()
+
+    def _watch(self):
+        """采样线程：监控任务超时未醒来时，记录事件循环线程正在执行的代码"""
+        while True:
+            time.sleep(max(self.threshold / 2, 0.01))
+            tick = self._last_tick
+            if self._sample is not None and self._sample[0] == tick:
+                continue
+            if time.perf_counter() - tick < CHECK_INTERVAL + self.threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = "".join(traceback.format_stack(frame)[-STACK_DEPTH:])
+            self._sample = (tick, get_code_location(frame), stack)
+
+    def _record_stall(self, tick, lag):
+        """记录一次阻塞，由监控任务在事件循环恢复后调用"""
+        sample = self._sample
+        if sample is not None and sample[0] == tick:
+            _, location, stack = sample
+        else:
+            # 阻塞时间较短，采样线程没来得及采样
+            location, stack = "unknown", ""
+        self.stalls += 1
+        self.locations[location] = self.locations.get(location, 0) + 1
+        LOOP_STALLS.inc(location)
+        logger.warning(
+            f"[LoopMonitor]事件循环阻塞 {lag * 1000:.0f}ms，位置: {location}"
+            + (f"\n{stack}" if stack else "")
+        )
+
+    async def _run(self):
+        """监控循环"""
+        while True:
+            tick = time.perf_counter()
+            self._last_tick = tick
+            await asyncio.sleep(CHECK_INTERVAL)
+            lag = max(0.0, time.perf_counter() - tick - CHECK_INTERVAL)
+            self.current_lag = lag
+            if lag > self.max_lag:
+                self.max_lag = lag
+            if lag >= self.threshold:
+                self._record_stall(tick, lag)
+
+    def get_stats(self):
+        """
+        获取监控统计信息
+
+        Returns:
+            dict: 当前/最大延迟（秒）、阻塞次数、阻塞次数最多的位置
+        """
+        top = sorted(self.locations.items(), key=lambda item: item[1], reverse=True)
+        return {
+            "current_lag": self.current_lag,
+            "max_lag": self.max_lag,
+            "stalls": self.stalls,
+            "top_locations": top[:5],
+        }
+
+
+# 全局事件循环监控实例
+loop_monitor = LoopMonitor()
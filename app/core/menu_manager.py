@@ -1,34 +1,56 @@
-import importlib
-import os
 from logger import logger
 from typing import Dict, List, Optional
 from utils.generate import generate_reply_message, generate_text_message
 from api.message import send_group_msg, send_private_msg
+from config import MENU_ENABLED_ONLY
+from core.module_manifest import module_manifest
+from core.switch import switch_cache
 
 # 菜单命令
 MENU_COMMAND = "menu"
 
+# 菜单的开头和结尾
+MENU_HEADER = "📋 功能菜单\n\n"
+MENU_FOOTER = (
+    "发送开关命令+menu，可以查看该模块的所有子命令\n"
+    "框架作者：http://github.com/W1ndys\n"
+    "卷卷的交流小窝：489237389\n"
+)
+
+# 最多缓存的群菜单组合数量
+MAX_GROUP_VIEWS = 256
+
+# 事件订阅：只处理菜单命令
+SUBSCRIPTIONS = {"command": [MENU_COMMAND]}
+
 
 class MenuManager:
-    """菜单管理器 - 用于收集和展示所有模块的菜单信息"""
+    """
+    菜单管理器 - 用于收集和展示所有模块的菜单信息，信息来自模块清单，不导入模块
+    菜单文本只在第一次使用时生成，之后的菜单命令直接发送缓存的文本
+    """
+
+    # 各模块在菜单中的一段文本
+    _sections = None
+    # 完整的菜单文本
+    _menu_text = None
+    # 模块名称 -> 命令说明文本
+    _commands_texts = {}
+    # 已开启的模块组合 -> 只包含这些模块的菜单文本
+    _group_views = {}
 
     @staticmethod
     def get_all_modules() -> List[str]:
         """获取所有模块名称"""
-        modules_dir = os.path.join(os.path.dirname(__file__), "..", "modules")
-        modules = []
-        for item in os.listdir(modules_dir):
-            if os.path.isdir(os.path.join(modules_dir, item)) and not item.startswith(
-                "_"
-            ):
-                modules.append(item)
-        return modules
+        return module_manifest.module_names()
 
     @staticmethod
     def get_module_menu_info(module_name: str) -> Optional[Dict]:
         """获取单个模块的菜单信息"""
         try:
-            module = importlib.import_module(f"modules.{module_name}")
+            module = module_manifest.get(module_name)
+            if module is None:
+                return None
             menu_info = {
                 "name": getattr(module, "MODULE_NAME", module_name),
                 "commands": getattr(module, "COMMANDS", {}),
@@ -40,40 +62,87 @@ class MenuManager:
             logger.error(f"获取模块 {module_name} 菜单信息失败: {e}")
             return None
 
-    @staticmethod
-    def get_module_commands_text(module_name: str) -> str:
+    @classmethod
+    def get_module_commands_text(cls, module_name: str) -> str:
         """
         获取单个模块的可用命令及其解释，返回格式化文本
+        文本生成一次后缓存，模块加载、重新加载或卸载时清空
         """
+        text = cls._commands_texts.get(module_name)
+        if text is not None:
+            return text
         try:
-            module = importlib.import_module(f"modules.{module_name}")
+            module = module_manifest.get(module_name)
             commands = getattr(module, "COMMANDS", {})
             if not commands:
-                return "暂无可用命令。"
-            text = ""
-            for cmd, desc in commands.items():
-                text += f"{cmd}: {desc}\n\n"
-            return text
+                text = "暂无可用命令。"
+            else:
+                text = "".join(f"{cmd}: {desc}\n\n" for cmd, desc in commands.items())
         except Exception as e:
             logger.error(f"获取模块 {module_name} 命令信息失败: {e}")
             return "获取命令信息失败。"
+        cls._commands_texts[module_name] = text
+        return text
 
-    @staticmethod
-    def generate_menu_text() -> str:
-        """生成完整的菜单文本"""
-        menu_text = "📋 功能菜单\n\n"
-        # 获取所有模块并按字母顺序排序
-        modules = sorted(MenuManager.get_all_modules())
-        for module_name in modules:
-            menu_info = MenuManager.get_module_menu_info(module_name)
-            if menu_info:
-                menu_text += f"【{menu_info['name']}】：{menu_info['description']}\n"
-                menu_text += f"开关: {menu_info['switch_name']}\n"
-                menu_text += "\n"
-        menu_text += "发送开关命令+menu，可以查看该模块的所有子命令\n"
-        menu_text += "框架作者：http://github.com/W1ndys\n"
-        menu_text += "卷卷的交流小窝：489237389\n"
-        return menu_text
+    @classmethod
+    def _get_sections(cls) -> Dict[str, tuple]:
+        """各模块在菜单中的一段文本，按模块名称排序，{模块目录名: (MODULE_NAME, 文本)}"""
+        if cls._sections is None:
+            sections = {}
+            # 获取所有模块并按字母顺序排序
+            for module_name in sorted(cls.get_all_modules()):
+                menu_info = cls.get_module_menu_info(module_name)
+                if menu_info:
+                    sections[module_name] = (
+                        menu_info["name"],
+                        f"【{menu_info['name']}】：{menu_info['description']}\n"
+                        f"开关: {menu_info['switch_name']}\n\n",
+                    )
+            cls._sections = sections
+        return cls._sections
+
+    @classmethod
+    def generate_menu_text(cls) -> str:
+        """生成完整的菜单文本，生成一次后缓存"""
+        if cls._menu_text is None:
+            sections = "".join(text for _, text in cls._get_sections().values())
+            cls._menu_text = MENU_HEADER + sections + MENU_FOOTER
+        return cls._menu_text
+
+    @classmethod
+    def generate_group_menu_text(cls, group_id) -> str:
+        """
+        生成只包含本群已开启模块的菜单文本
+        开启的模块相同的群共用同一份文本，开关变化后自动使用新的组合
+
+        Args:
+            group_id: 群号
+        """
+        sections = cls._get_sections()
+        enabled = tuple(
+            module_name
+            for module_name, (name, _) in sections.items()
+            if switch_cache.get_group(name, group_id)
+        )
+        text = cls._group_views.get(enabled)
+        if text is None:
+            if enabled:
+                body = "".join(sections[module_name][1] for module_name in enabled)
+            else:
+                body = "本群还没有开启任何模块\n\n"
+            text = MENU_HEADER + body + MENU_FOOTER
+            if len(cls._group_views) >= MAX_GROUP_VIEWS:
+                cls._group_views.clear()
+            cls._group_views[enabled] = text
+        return text
+
+    @classmethod
+    def invalidate(cls):
+        """清空已生成的菜单，模块加载、重新加载或卸载后调用"""
+        cls._sections = None
+        cls._menu_text = None
+        cls._commands_texts = {}
+        cls._group_views = {}
 
 
 async def handle_events(websocket, message):
@@ -92,10 +161,13 @@ async def handle_events(websocket, message):
         message_type = message.get("message_type", "")
 
         reply_message = generate_reply_message(message.get("message_id", ""))
-        menu_text = MenuManager.generate_menu_text()
-        text_message = generate_text_message(menu_text)
         if message_type == "group":
             group_id = str(message.get("group_id", ""))
+            if MENU_ENABLED_ONLY:
+                menu_text = MenuManager.generate_group_menu_text(group_id)
+            else:
+                menu_text = MenuManager.generate_menu_text()
+            text_message = generate_text_message(menu_text)
             await send_group_msg(
                 websocket,
                 group_id,
@@ -104,6 +176,7 @@ async def handle_events(websocket, message):
             )
         elif message_type == "private" and message.get("sub_type") == "friend":
             user_id = str(message.get("user_id", ""))
+            text_message = generate_text_message(MenuManager.generate_menu_text())
             await send_private_msg(
                 websocket,
                 user_id,
@@ -0,0 +1,448 @@
+"""
+模块清单
+不导入模块，直接解析各模块 __init__.py 和 main.py 的语法树，读取 MODULE_NAME、SWITCH_NAME、
+MODULE_DESCRIPTION、COMMANDS、SUBSCRIPTIONS 等元数据，菜单和命令路由表都从清单中读取
+
+- 清单按模块目录下 .py 文件的最新修改时间缓存在 data/Core/module_manifest.json，
+  没有修改的模块直接使用缓存，修改过的模块在线程池中并行读取和解析
+- 只能解析字面量、引用前面常量的 f-string 和字符串拼接，其他写法（函数调用、从其他文件导入等）
+  视为无法解析，这类模块在启动时照常导入
+- 可以解析的模块先注册占位处理器 LazyModuleHandler，收到第一个订阅的事件时才导入模块，
+  模块导入时的数据库初始化、创建目录等操作不再拖慢启动和重连
+
+默认所有模块在启动时导入，设置 LAZY_MODULE_IMPORT=true 开启延迟导入
+"""
+
+import os
+import ast
+from concurrent.futures import ThreadPoolExecutor
+from logger import logger
+from utils import json_codec
+from utils.storage import storage
+from core.module_reloader import MODULES_DIR, list_module_names, get_module_mtime
+
+# 清单缓存文件
+MANIFEST_PATH = os.path.join("data", "Core", "module_manifest.json")
+
+# 缓存格式版本，解析规则变化时加一，旧缓存自动失效
+MANIFEST_VERSION = 1
+
+# 并行解析的线程数
+MAX_WORKERS = 8
+
+# 从模块中读取的元数据
+METADATA_KEYS = (
+    "MODULE_NAME",
+    "SWITCH_NAME",
+    "MODULE_DESCRIPTION",
+    "COMMANDS",
+    "SUBSCRIPTIONS",
+)
+
+
+def _evaluate(node, env):
+    """
+    计算常量表达式的值
+
+    Args:
+        node: 表达式语法树节点
+        env (dict): 文件中前面已经解析出的常量
+
+    Raises:
+        ValueError: 表达式不是常量
+    """
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, ast.Name):
+        if node.id in env:
+            return env[node.id]
+        raise ValueError(f"无法解析的名称 {node.id}")
+    if isinstance(node, ast.JoinedStr):
+        parts = []
+        for value in node.values:
+            if isinstance(value, ast.Constant):
+                parts.append(value.value)
+                continue
+            if value.format_spec is not None:
+                raise ValueError("不支持格式说明符")
+            result = _evaluate(value.value, env)
+            if value.conversion == ord("r"):
+                result = repr(result)
+            elif value.conversion == ord("a"):
+                result = ascii(result)
+            parts.append(str(result))
+        return "".join(parts)
+    if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+        # 统一转为列表，保证可以写入JSON缓存
+        return [_evaluate(item, env) for item in node.elts]
+    if isinstance(node, ast.Dict):
+        result = {}
+        for key, value in zip(node.keys, node.values):
+            if key is None:
+                raise ValueError("不支持字典解包")
+            key = _evaluate(key, env)
+            if not isinstance(key, str):
+                raise ValueError("字典的键必须是字符串")
+            result[key] = _evaluate(value, env)
+        return result
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+        left = _evaluate(node.left, env)
+        right = _evaluate(node.right, env)
+        if type(left) is not type(right) or not isinstance(left, (str, list)):
+            raise ValueError("只支持字符串或列表相加")
+        return left + right
+    raise ValueError(f"不支持的表达式 {type(node).__name__}")
+
+
+def _bound_names(node):
+    """语句中被赋值或导入的名称"""
+    if isinstance(node, (ast.Import, ast.ImportFrom)):
+        return {(alias.asname or alias.name).split(".")[0] for alias in node.names}
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        return {node.name}
+    return {
+        item.id
+        for item in ast.walk(node)
+        if isinstance(item, ast.Name) and isinstance(item.ctx, (ast.Store, ast.Del))
+    }
+
+
+def _mutated_names(node):
+    """语句中调用了方法或按下标修改的名称，如 COMMANDS.update(...)、COMMANDS[key] = ..."""
+    names = set()
+    for item in ast.walk(node):
+        if isinstance(item, ast.Attribute) and isinstance(item.value, ast.Name):
+            names.add(item.value.id)
+        elif (
+            isinstance(item, ast.Subscript)
+            and isinstance(item.ctx, (ast.Store, ast.Del))
+            and isinstance(item.value, ast.Name)
+        ):
+            names.add(item.value.id)
+    return names
+
+
+def parse_constants(source, filename="<module>"):
+    """
+    解析文件顶层的常量赋值
+
+    Args:
+        source (str): 源代码
+        filename (str): 文件名，用于语法错误提示
+
+    Returns:
+        tuple: (常量字典, 无法解析的名称集合, 顶层的异步函数名称集合)
+
+    Raises:
+        SyntaxError: 文件存在语法错误
+    """
+    tree = ast.parse(source, filename)
+    env = {}
+    unresolved = set()
+    async_functions = set()
+    for node in tree.body:
+        target = None
+        if isinstance(node, ast.Assign) and len(node.targets) == 1:
+            target = node.targets[0]
+        elif isinstance(node, ast.AnnAssign) and node.value is not None:
+            target = node.target
+        if isinstance(target, ast.Name):
+            name = target.id
+            try:
+                env[name] = _evaluate(node.value, env)
+                unresolved.discard(name)
+            except ValueError:
+                env.pop(name, None)
+                unresolved.add(name)
+            continue
+        if isinstance(node, ast.AsyncFunctionDef):
+            async_functions.add(node.name)
+            env.pop(node.name, None)
+            continue
+        # 其他语句中赋值、导入或修改的名称都无法确定取值
+        changed = _bound_names(node) | (_mutated_names(node) & set(env))
+        async_functions -= changed
+        for name in changed:
+            env.pop(name, None)
+            unresolved.add(name)
+    return env, unresolved, async_functions
+
+
+def _read(path):
+    """读取文件，文件不存在时返回None"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def parse_module(module_dir):
+    """
+    解析一个模块目录的元数据
+
+    Args:
+        module_dir (str): 模块目录
+
+    Returns:
+        dict: metadata 为解析出的元数据，lazy 表示是否可以延迟导入，
+            error 为不能延迟导入的原因
+    """
+    metadata = {}
+    try:
+        init_source = _read(os.path.join(module_dir, "__init__.py"))
+        if init_source is not None:
+            env, unresolved, _ = parse_constants(init_source, "__init__.py")
+            for key in METADATA_KEYS:
+                if key in unresolved:
+                    return {"metadata": {}, "lazy": False, "error": f"无法解析 {key}"}
+                if key in env:
+                    metadata[key] = env[key]
+
+        main_source = _read(os.path.join(module_dir, "main.py"))
+        if main_source is None:
+            return {"metadata": metadata, "lazy": False, "error": "缺少main.py文件"}
+        env, unresolved, async_functions = parse_constants(main_source, "main.py")
+        # 订阅声明优先取 main.py 中的
+        if "SUBSCRIPTIONS" in unresolved:
+            return {
+                "metadata": metadata,
+                "lazy": False,
+                "error": "无法解析 SUBSCRIPTIONS",
+            }
+        if "SUBSCRIPTIONS" in env:
+            metadata["SUBSCRIPTIONS"] = env["SUBSCRIPTIONS"]
+        if "handle_events" not in async_functions:
+            return {
+                "metadata": metadata,
+                "lazy": False,
+                "error": "未找到异步handle_events函数定义",
+            }
+    except SyntaxError as e:
+        return {"metadata": metadata, "lazy": False, "error": f"语法错误: {e}"}
+    except (OSError, UnicodeDecodeError) as e:
+        return {"metadata": metadata, "lazy": False, "error": str(e)}
+    return {"metadata": metadata, "lazy": True, "error": None}
+
+
+class ModuleInfo:
+    """
+    一个模块的清单信息
+    元数据可以像模块属性一样读取（如 info.COMMANDS），可以直接交给 get_subscriptions 和命令路由表
+    """
+
+    def __init__(self, name, mtime, metadata, lazy, error=None):
+        self.name = name
+        self.mtime = mtime
+        self.metadata = metadata
+        self.lazy = lazy
+        self.error = error
+
+    def __getattr__(self, key):
+        if key in METADATA_KEYS and key in self.__dict__.get("metadata", {}):
+            return self.metadata[key]
+        raise AttributeError(key)
+
+    def to_dict(self):
+        return {
+            "mtime": self.mtime,
+            "metadata": self.metadata,
+            "lazy": self.lazy,
+            "error": self.error,
+        }
+
+
+class ModuleManifest:
+    """模块清单，按修改时间缓存各模块的元数据"""
+
+    def __init__(self, modules_dir=MODULES_DIR, cache_path=MANIFEST_PATH):
+        self.modules_dir = modules_dir
+        self.cache_path = cache_path
+        # 模块名称 -> ModuleInfo
+        self._modules = None
+        # 统计信息
+        self.cache_hits = 0
+        self.parsed = 0
+
+    def _load_cache(self):
+        """读取缓存文件，格式版本不一致或文件损坏时忽略"""
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json_codec.loads(f.read())
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"[Manifest]读取模块清单缓存失败，重新解析: {e}")
+            return {}
+        if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+            return {}
+        try:
+            return {
+                name: ModuleInfo(name, **entry)
+                for name, entry in data["modules"].items()
+            }
+        except Exception as e:
+            logger.warning(f"[Manifest]模块清单缓存格式有误，重新解析: {e}")
+            return {}
+
+    def _scan_module(self, module_name, cached):
+        """检查一个模块的修改时间，有变化时重新解析（在线程池中调用）"""
+        module_dir = os.path.join(self.modules_dir, module_name)
+        mtime = get_module_mtime(module_dir)
+        if cached is not None and cached.mtime == mtime:
+            return cached, False
+        return ModuleInfo(module_name, mtime, **parse_module(module_dir)), True
+
+    def refresh(self, module_names=None):
+        """
+        检查模块的修改时间，重新解析有变化的模块
+
+        Args:
+            module_names (list, optional): 只检查这些模块，默认检查全部模块并移除已删除的模块
+
+        Returns:
+            list: 重新解析的模块名称
+        """
+        if self._modules is None:
+            self._modules = self._load_cache()
+        if module_names is None:
+            if os.path.exists(self.modules_dir):
+                module_names = list_module_names(self.modules_dir)
+            else:
+                module_names = []
+            removed = set(self._modules) - set(module_names)
+        else:
+            removed = set()
+        module_names = [
+            name
+            for name in module_names
+            if os.path.isdir(os.path.join(self.modules_dir, name))
+        ]
+
+        results = []
+        if module_names:
+            workers = min(MAX_WORKERS, len(module_names))
+            with ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="manifest"
+            ) as executor:
+                results = list(
+                    executor.map(
+                        lambda name: self._scan_module(name, self._modules.get(name)),
+                        module_names,
+                    )
+                )
+
+        changed = []
+        for info, parsed in results:
+            self._modules[info.name] = info
+            if parsed:
+                changed.append(info.name)
+                self.parsed += 1
+            else:
+                self.cache_hits += 1
+        for name in removed:
+            del self._modules[name]
+
+        if changed or removed:
+            storage.write_json(
+                self.cache_path,
+                {
+                    "version": MANIFEST_VERSION,
+                    "modules": {
+                        name: info.to_dict() for name, info in self._modules.items()
+                    },
+                },
+            )
+        return changed
+
+    def forget(self, module_name):
+        """移除已删除模块的清单"""
+        if self._modules is not None:
+            self._modules.pop(module_name, None)
+
+    def update_from_module(self, module_name, package, module=None):
+        """
+        无法解析的模块导入后，用模块中的实际值补全元数据（不写入缓存）
+
+        Args:
+            module_name (str): 模块名称
+            package: 模块包（__init__.py）
+            module: 模块的 main.py
+        """
+        info = self.get(module_name)
+        if info is None or info.lazy:
+            return
+        for key in METADATA_KEYS:
+            for source in (module, package) if key == "SUBSCRIPTIONS" else (package,):
+                if source is not None and hasattr(source, key):
+                    info.metadata[key] = getattr(source, key)
+                    break
+            else:
+                info.metadata.pop(key, None)
+
+    def get(self, module_name):
+        """
+        获取模块的清单信息，首次调用时建立清单
+
+        Returns:
+            ModuleInfo|None: 模块不存在时返回None
+        """
+        if self._modules is None:
+            self.refresh()
+        return self._modules.get(module_name)
+
+    def module_names(self):
+        """清单中的全部模块名称，按字母顺序排列"""
+        if self._modules is None:
+            self.refresh()
+        return sorted(self._modules)
+
+    def get_stats(self):
+        """
+        获取清单统计信息
+
+        Returns:
+            dict: 模块数量、可延迟导入的模块数量、使用缓存和重新解析的次数
+        """
+        modules = self._modules or {}
+        return {
+            "modules": len(modules),
+            "lazy": sum(1 for info in modules.values() if info.lazy),
+            "cache_hits": self.cache_hits,
+            "parsed": self.parsed,
+        }
+
+
+class LazyModuleHandler:
+    """
+    占位处理器：按清单中的订阅声明注册，收到第一个事件时才导入模块
+    导入由 activate(占位处理器) 完成，它负责在路由表中换成模块真正的 handle_events 并返回，
+    导入失败时返回None，之后收到的事件直接忽略
+    """
+
+    def __init__(self, module_name, activate):
+        self.module_name = module_name
+        # 运行指标和性能分析按处理器所在的模块统计
+        self.__module__ = f"modules.{module_name}.main"
+        self._activate = activate
+        self.handler = None
+
+    @property
+    def loaded(self):
+        """是否已经尝试导入"""
+        return self._activate is None
+
+    async def __call__(self, websocket, msg):
+        if self._activate is not None:
+            # 导入过程中没有 await，同时到达的事件不会重复导入
+            activate, self._activate = self._activate, None
+            self.handler = activate(self)
+        if self.handler is not None:
+            await self.handler(websocket, msg)
+
+    def __repr__(self):
+        return f"<LazyModuleHandler {self.module_name}>"
+
+
+# 全局模块清单实例
+module_manifest = ModuleManifest()
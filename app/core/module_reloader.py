@@ -0,0 +1,187 @@
+"""
+模块热重载
+定期检查 modules 目录下各模块的 .py 文件修改时间，只重新导入有变化的模块并替换它的处理器，
+websocket 连接、其他模块以及撤回任务、缓存等运行状态都不受影响
+
+- 修改的模块：先检查语法，再用 importlib.reload 按依赖顺序重新执行模块代码，
+  重新导入失败时继续使用旧版本，下次修改后再试
+- 新增的模块：按正常流程加载
+- 删除的模块：从路由表中移除
+
+注意：模块中的全局对象（如数据库连接、后台任务）会随重新导入重新创建，
+旧对象不会被主动关闭，有这类状态的模块修改后建议重启
+
+默认关闭，在 .env 中设置 MODULE_RELOAD_INTERVAL=检查间隔秒数 开启
+"""
+
+import os
+import sys
+import asyncio
+import importlib
+from logger import logger
+from config import MODULE_RELOAD_INTERVAL
+from utils.storage import storage
+
+MODULES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "modules")
+
+
+def list_module_names(modules_dir=MODULES_DIR):
+    """modules 目录下的模块名称，忽略以下划线开头的目录"""
+    return [
+        module_name
+        for module_name in os.listdir(modules_dir)
+        if os.path.isdir(os.path.join(modules_dir, module_name))
+        and not module_name.startswith("_")
+    ]
+
+
+def get_module_mtime(module_dir):
+    """模块目录下所有 .py 文件的最新修改时间"""
+    latest = 0
+    for root, dirs, files in os.walk(module_dir):
+        dirs[:] = [name for name in dirs if name != "__pycache__"]
+        for name in files:
+            if name.endswith(".py"):
+                try:
+                    latest = max(latest, os.path.getmtime(os.path.join(root, name)))
+                except OSError:
+                    # 文件在扫描过程中被删除
+                    pass
+    return latest
+
+
+def _package_module_names(module_name):
+    """已导入的属于该模块的子模块，按导入完成的顺序排列"""
+    prefix = f"modules.{module_name}"
+    return [
+        name
+        for name in list(sys.modules)
+        if name == prefix or name.startswith(prefix + ".")
+    ]
+
+
+def reload_package(module_name):
+    """
+    重新导入模块包及其所有已导入的子模块
+
+    先重新导入包的 __init__.py（模块名称、命令等常量），再按 sys.modules 中的顺序重新导入子模块：
+    模块执行完毕时才排到 sys.modules 末尾，被依赖的子模块总是排在使用它的模块之前
+
+    Args:
+        module_name (str): modules 目录下的模块名称
+
+    Raises:
+        SyntaxError: 有文件存在语法错误，此时不会重新导入任何文件
+    """
+    names = _package_module_names(module_name)
+    # 先检查全部文件的语法，避免只更新了一半
+    for name in names:
+        path = getattr(sys.modules[name], "__file__", None)
+        if path and path.endswith(".py") and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                compile(f.read(), path, "exec")
+
+    package_name = f"modules.{module_name}"
+    if package_name in sys.modules:
+        importlib.reload(sys.modules[package_name])
+    for name in names:
+        module = sys.modules.get(name)
+        if name == package_name or module is None:
+            continue
+        if getattr(module, "__file__", None) and not os.path.exists(module.__file__):
+            # 文件已删除
+            del sys.modules[name]
+            continue
+        importlib.reload(module)
+
+
+def forget_package(module_name):
+    """从 sys.modules 中移除模块包及其子模块，下次导入时重新执行"""
+    for name in _package_module_names(module_name):
+        del sys.modules[name]
+
+
+class ModuleReloader:
+    """模块热重载"""
+
+    def __init__(self, interval=MODULE_RELOAD_INTERVAL, modules_dir=MODULES_DIR):
+        self.interval = interval
+        self.modules_dir = modules_dir
+        self.event_handler = None
+        self._task = None
+        # 模块名称 -> 最新修改时间
+        self._mtimes = None
+        # 统计信息
+        self.reloads = 0
+        self.failures = 0
+
+    def bind(self, event_handler):
+        """绑定当前的事件处理器，监控任务未运行时启动"""
+        if not self.interval:
+            return
+        self.event_handler = event_handler
+        if self._mtimes is None:
+            # 第一次绑定时记录当前状态，之后的修改才触发重新加载
+            self._mtimes = self._scan()
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logger.info(f"[Reloader]已开启模块热重载，检查间隔 {self.interval} 秒")
+
+    def _scan(self):
+        """获取所有模块的最新修改时间（在存储线程池中调用）"""
+        if not os.path.exists(self.modules_dir):
+            return {}
+        return {
+            module_name: get_module_mtime(os.path.join(self.modules_dir, module_name))
+            for module_name in list_module_names(self.modules_dir)
+        }
+
+    def check(self, mtimes):
+        """
+        比较修改时间，重新加载有变化的模块
+
+        Args:
+            mtimes (dict): 模块名称 -> 最新修改时间
+
+        Returns:
+            list: 重新加载、新增或卸载的模块名称
+        """
+        changed = []
+        for module_name, mtime in sorted(mtimes.items()):
+            if self._mtimes.get(module_name) == mtime:
+                continue
+            changed.append(module_name)
+            if self.event_handler.reload_module(module_name):
+                self.reloads += 1
+            else:
+                self.failures += 1
+        for module_name in sorted(set(self._mtimes) - set(mtimes)):
+            changed.append(module_name)
+            self.event_handler.unload_module(module_name)
+        # 失败的模块同样记录修改时间，再次修改后重试
+        self._mtimes = mtimes
+        return changed
+
+    async def _run(self):
+        """监控循环"""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.check(await storage.run(self._scan))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[Reloader]检查模块变化失败: {e}")
+
+    def get_stats(self):
+        """
+        获取热重载统计信息
+
+        Returns:
+            dict: 重新加载成功和失败的次数
+        """
+        return {"reloads": self.reloads, "failures": self.failures}
+
+
+# 全局模块热重载实例
+module_reloader = ModuleReloader()
@@ -1,55 +1,169 @@
 from logger import logger
 from config import OWNER_ID
-from api.key import nc_get_rkey
+from api.base import call_api
 from api.message import send_private_msg
 import re
 import os
 import json
 import time
+import asyncio
+from utils.storage import storage
 
 DATA_DIR = os.path.join("data", "Core", "nc_get_rkey.json")
 
-# 全局变量，记录上次请求时间
-last_request_time = 0
-REQUEST_INTERVAL = 600  # 10分钟，单位：秒
+# 刷新参数
+REQUEST_INTERVAL = 600  # 不知道有效期时的刷新间隔，10分钟，单位：秒
+REFRESH_MARGIN = 300  # 在过期前多久刷新，单位：秒
+MIN_REFRESH_INTERVAL = 60  # 两次刷新的最短间隔，单位：秒
+RETRY_INTERVAL = 30  # 刷新失败后的重试间隔，单位：秒
+
+# 只使用type=20的rkey
+RKEY_TYPE = 20
+
+# 包含rkey参数的CQ图片码，第一组为rkey值之前的部分，一次扫描完成查找和替换
+CQ_IMAGE_RKEY_PATTERN = re.compile(r"(\[CQ:image,[^\]]*?rkey=)[^,^\]]+")
+
+# CQ图片码中的rkey参数
+RKEY_PARAM_PATTERN = re.compile(r"rkey=[^,^\]]+")
+
+# 事件订阅：连接建立时绑定后台刷新任务，接收模块主动请求的nc_get_rkey响应
+SUBSCRIPTIONS = {"post_type": ["meta_event"], "echo": ["nc_get_rkey"]}
+
+
+class RkeyCache:
+    """rkey内存缓存 - 保存当前type=20的rkey及其过期时间，在过期前主动刷新"""
+
+    def __init__(self):
+        self.rkey = None
+        # 过期时间戳，None 表示不知道有效期
+        self.expires_at = None
+        self._loaded = False
+        self.websocket = None
+        self._task = None
+
+    def _ensure_loaded(self):
+        """首次使用时从文件加载上次保存的rkey"""
+        if self._loaded:
+            return
+        self._loaded = True
+        if not os.path.exists(DATA_DIR):
+            return
+        try:
+            with open(DATA_DIR, "r", encoding="utf-8") as f:
+                self.update(json.load(f))
+        except Exception as e:
+            logger.error(f"读取本地rkey失败: {e}")
+
+    def update(self, data_list):
+        """
+        根据nc_get_rkey响应更新缓存
+
+        Args:
+            data_list (list): nc_get_rkey 响应中的 data
+
+        Returns:
+            bool: 是否找到type=20的rkey
+        """
+        self._loaded = True
+        for rkey_item in data_list:
+            if rkey_item.get("type") != RKEY_TYPE or not rkey_item.get("rkey"):
+                continue
+
+            new_rkey = rkey_item.get("rkey")
+            # 去掉rkey值开头的&rkey=前缀，只保留实际的rkey值
+            if new_rkey.startswith("&rkey="):
+                new_rkey = new_rkey[6:]
+            self.rkey = new_rkey
+
+            try:
+                issued_at = float(rkey_item.get("time") or time.time())
+                self.expires_at = issued_at + float(rkey_item.get("ttl"))
+            except (TypeError, ValueError):
+                self.expires_at = None
+            return True
+
+        logger.warning("未找到type=20的rkey")
+        return False
+
+    def get(self):
+        """
+        获取当前rkey
+
+        Returns:
+            str|None: rkey值，没有可用的rkey时返回None
+        """
+        self._ensure_loaded()
+        return self.rkey
+
+    def get_refresh_delay(self):
+        """计算距离下次刷新的秒数"""
+        if self.expires_at is None:
+            return REQUEST_INTERVAL
+        return max(MIN_REFRESH_INTERVAL, self.expires_at - REFRESH_MARGIN - time.time())
+
+    def bind(self, websocket):
+        """绑定当前连接，后台刷新任务未运行时启动"""
+        self.websocket = websocket
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def refresh(self):
+        """
+        请求新的rkey并保存
+
+        Returns:
+            bool: 是否刷新成功
+        """
+        response = await call_api(self.websocket, "nc_get_rkey")
+        if not response or response.get("status") != "ok":
+            logger.warning("获取nc_get_rkey失败")
+            return False
+
+        data_list = response.get("data") or []
+        if not self.update(data_list):
+            return False
+
+        save_rkey_to_file(data_list)
+        logger.info("获取到nc_get_rkey，已保存到文件")
+        return True
+
+    async def _run(self):
+        """后台刷新循环，按rkey有效期安排下次刷新"""
+        while True:
+            try:
+                if await self.refresh():
+                    delay = self.get_refresh_delay()
+                else:
+                    delay = RETRY_INTERVAL
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"自动刷新rkey失败: {e}")
+                await send_private_msg(
+                    self.websocket, OWNER_ID, f"自动刷新rkey失败: {e}"
+                )
+                delay = RETRY_INTERVAL
+            await asyncio.sleep(delay)
+
+
+# 全局rkey缓存实例
+rkey_cache = RkeyCache()
 
 
 # 如果字符串中有图片（包含rkey），则替换为本地缓存的rkey
 def replace_rkey_match(match):
     """
-    替换匹配对象中的rkey参数
+    替换匹配对象中的rkey参数，match.group(0) 为包含rkey参数的CQ图片码，
+    不依赖匹配时使用的正则分组
     """
-    try:
-        cq_img = match.group(0)
-        # 查找rkey参数
-        rkey_pattern = r"rkey=([^,^\]]+)"
-        rkey_search = re.search(rkey_pattern, cq_img)
-        if rkey_search:
-            # 读取本地rkey
-            with open(DATA_DIR, "r", encoding="utf-8") as f:
-                rkey_json = json.load(f)
-
-            # 只使用type=20的rkey
-            new_rkey = None
-            for rkey_item in rkey_json:
-                if rkey_item.get("type") == 20:
-                    new_rkey = rkey_item.get("rkey")
-                    break
-
-            if new_rkey:
-                # 去掉rkey值开头的&rkey=前缀，只保留实际的rkey值
-                if new_rkey.startswith("&rkey="):
-                    new_rkey = new_rkey[6:]  # 去掉"&rkey="前缀
-
-                # 替换rkey参数
-                new_cq_img = re.sub(rkey_pattern, f"rkey={new_rkey}", cq_img)
-                logger.info(f"替换rkey成功: {new_cq_img}")
-                return new_cq_img
-            else:
-                logger.warning("未找到type=20的rkey，跳过替换")
-    except Exception as e:
-        logger.error(f"本地rkey替换失败: {e}")
-    return match.group(0)
+    cq_img = match.group(0)
+    if not RKEY_PARAM_PATTERN.search(cq_img):
+        return cq_img
+    new_rkey = rkey_cache.get()
+    if not new_rkey:
+        logger.warning("未找到type=20的rkey，跳过替换")
+        return cq_img
+    return RKEY_PARAM_PATTERN.sub(lambda _: f"rkey={new_rkey}", cq_img)
 
 
 def replace_rkey(text):
@@ -61,15 +175,16 @@ def replace_rkey(text):
         str 替换后的文本
     """
     try:
-        if not text or not isinstance(text, str):
+        if not text or not isinstance(text, str) or "rkey=" not in text:
             return text
 
-        # 查找所有CQ图片码模式，包含rkey参数的
-        cq_img_pattern = r"\[CQ:image,[^\]]*rkey=[^\]]*\]"
+        new_rkey = rkey_cache.get()
+        if not new_rkey:
+            logger.warning("未找到type=20的rkey，跳过替换")
+            return text
 
-        # 使用re.sub替换所有匹配的图片码
-        result = re.sub(cq_img_pattern, replace_rkey_match, text)
-        return result
+        # 一次扫描替换所有匹配的图片码
+        return CQ_IMAGE_RKEY_PATTERN.sub(lambda match: match.group(1) + new_rkey, text)
     except Exception as e:
         logger.error(f"替换rkey失败: {e}")
         return text
@@ -77,13 +192,9 @@ def replace_rkey(text):
 
 def save_rkey_to_file(data_list):
     """
-    保存rkey信息到文件，确保文件夹存在
+    保存rkey信息到文件，在存储线程池中异步写入
     """
-    dir_path = os.path.dirname(DATA_DIR)
-    if not os.path.exists(dir_path):
-        os.makedirs(dir_path, exist_ok=True)
-    with open(DATA_DIR, "w", encoding="utf-8") as f:
-        json.dump(data_list, f, ensure_ascii=False, indent=2)
+    storage.write_json(DATA_DIR, data_list)
 
 
 async def handle_events(websocket, msg):
@@ -106,24 +217,19 @@ async def handle_events(websocket, msg):
         "echo": "string"
     }
     """
-    global last_request_time
     try:
-        current_time = int(time.time())
-        # 检查距离上次请求是否已超过10分钟
-        if current_time - last_request_time >= REQUEST_INTERVAL:
-            # 发送nc_get_rkey请求
-            await nc_get_rkey(websocket)
-            last_request_time = current_time
+        # 绑定当前连接，后台任务在rkey过期前自动刷新
+        rkey_cache.bind(websocket)
 
         if msg.get("status") == "ok":
             echo = msg.get("echo", "")
-            # 格式：nc_get_rkey
-            match = re.search(r"nc_get_rkey", echo)
-            if match:
+            # 格式：nc_get_rkey，模块主动请求的响应同样更新缓存
+            if echo.startswith("nc_get_rkey"):
                 data_list = msg.get("data", [])
-                # 保存到文件
-                save_rkey_to_file(data_list)
-                logger.info(f"获取到nc_get_rkey，已保存到文件")
+                if rkey_cache.update(data_list):
+                    # 保存到文件
+                    save_rkey_to_file(data_list)
+                    logger.info(f"获取到nc_get_rkey，已保存到文件")
     except Exception as e:
         logger.error(f"自动刷新rkey失败: {e}")
         await send_private_msg(websocket, OWNER_ID, f"自动刷新rkey失败: {e}")
@@ -1,18 +1,26 @@
 from logger import logger
 from config import OWNER_ID
 from api.message import send_private_msg
-from utils.feishu import send_feishu_msg
+from utils.feishu import feishu_alerter
 import time
 
-# 全局变量
+# 事件订阅：只关心生命周期和心跳事件
+SUBSCRIPTIONS = {"post_type": ["meta_event"]}
+
+# 重复上线通知的最短间隔（秒），频繁断线重连时不重复通知管理员
+CONNECT_NOTICE_INTERVAL = 600
+
+# 全局变量，进程内跨连接保留
 is_online = None  # 初始状态为None
 last_state_change_time = 0
 last_report_time = 0
+last_connect_notice_time = 0
 
 
 async def handle_events(websocket, message):
     """处理心跳事件，检测在线状态"""
     global is_online, last_state_change_time, last_report_time
+    global last_connect_notice_time
 
     try:
         # 处理首次连接事件
@@ -30,6 +38,13 @@ async def handle_events(websocket, message):
                 f"机器人连接成功，当前在线状态: {is_online}，心跳间隔: {message.get('interval', 0)/1000}秒，机器人ID: {message.get('self_id')}，管理员ID: {OWNER_ID}"
             )
 
+            # 短时间内重复连接时只记录日志
+            now = time.time()
+            if now - last_connect_notice_time < CONNECT_NOTICE_INTERVAL:
+                logger.info("机器人重新连接，距上次上线通知时间较短，不再通知管理员")
+                return
+            last_connect_notice_time = now
+
             # 向管理员发送私聊消息
             try:
                 await send_private_msg(websocket, OWNER_ID, connect_msg)
@@ -74,11 +89,8 @@ async def handle_events(websocket, message):
                 )
 
                 try:
-                    # 发送飞书通知
-                    feishu_result = send_feishu_msg(title, content)
-                    if "error" in feishu_result:
-                        logger.error(f"发送飞书通知失败: {feishu_result.get('error')}")
-
+                    # 提交飞书通知，由后台任务发送，频繁掉线重连时合并为一条摘要
+                    feishu_alerter.alert(title, content, key="online_status")
                 except Exception as e:
                     logger.error(f"发送飞书通知失败: {e}")
 
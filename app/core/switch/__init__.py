@@ -7,6 +7,7 @@ from .switch_manager import SwitchManager
 from .command_handler import SwitchCommandHandler
 from .migration import SwitchMigration
 from .database import db
+from .cache import switch_cache
 
 
 # 兼容性函数，保持原有API不变
@@ -45,6 +46,23 @@ def copy_group_switches(source_group_id, target_group_id):
     return SwitchManager.copy_group_switches(source_group_id, target_group_id)
 
 
+async def toggle_group_switch_async(group_id, module_name):
+    """切换群聊开关，不阻塞事件循环"""
+    return await SwitchManager.toggle_group_switch_async(group_id, module_name)
+
+
+async def toggle_private_switch_async(module_name):
+    """切换私聊开关，不阻塞事件循环"""
+    return await SwitchManager.toggle_private_switch_async(module_name)
+
+
+async def copy_group_switches_async(source_group_id, target_group_id):
+    """复制群组开关设置，不阻塞事件循环"""
+    return await SwitchManager.copy_group_switches_async(
+        source_group_id, target_group_id
+    )
+
+
 async def handle_module_private_switch(module_name, websocket, user_id, message_id):
     """处理模块私聊开关命令"""
     return await SwitchCommandHandler.handle_module_private_switch(
@@ -79,6 +97,7 @@ __all__ = [
     "SwitchManager",
     "SwitchCommandHandler",
     "SwitchMigration",
+    "switch_cache",
     "is_group_switch_on",
     "is_private_switch_on",
     "toggle_group_switch",
@@ -86,6 +105,9 @@ __all__ = [
     "load_group_all_switch",
     "get_all_enabled_groups",
     "copy_group_switches",
+    "toggle_group_switch_async",
+    "toggle_private_switch_async",
+    "copy_group_switches_async",
     "handle_module_private_switch",
     "handle_module_group_switch",
     "handle_events",
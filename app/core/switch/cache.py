@@ -0,0 +1,166 @@
+"""
+开关状态内存缓存
+首次查询时从数据库一次性加载全部开关，之后的查询直接读内存，
+开关切换、复制、清理时由 SwitchManager 先写数据库再同步更新缓存
+"""
+
+import threading
+from logger import logger
+from utils import metrics
+from .database import db
+
+
+class SwitchCache:
+    """开关状态内存表"""
+
+    def __init__(self):
+        # 加载锁，保证只从数据库加载一次
+        self._load_lock = threading.Lock()
+        self._loaded = False
+        # (module_name, group_id) -> bool
+        self._group_switches = {}
+        # module_name -> bool
+        self._private_switches = {}
+        # 命中：内存中有该开关记录；未命中：没有记录，按默认关闭处理（均不访问数据库）
+        self.hits = 0
+        self.misses = 0
+
+    def _ensure_loaded(self):
+        """确保开关数据已加载到内存"""
+        if self._loaded:
+            return
+        with self._load_lock:
+            if self._loaded:
+                return
+            rows = db.execute_query(
+                "SELECT module_name, switch_type, group_id, status FROM module_switches",
+                fetch_all=True,
+            )
+            if rows is None:
+                # 查询失败时不标记为已加载，下次查询重试
+                logger.error("[Switch]加载开关缓存失败")
+                return
+
+            group_switches = {}
+            private_switches = {}
+            for module_name, switch_type, group_id, status in rows:
+                if switch_type == "group":
+                    group_switches[(module_name, str(group_id))] = bool(status)
+                elif switch_type == "private":
+                    private_switches[module_name] = bool(status)
+
+            self._group_switches = group_switches
+            self._private_switches = private_switches
+            self._loaded = True
+            logger.info(
+                f"[Switch]开关缓存已加载：群聊开关 {len(group_switches)} 条，私聊开关 {len(private_switches)} 条"
+            )
+
+    def _lookup(self, key, private=False):
+        """加载后再查询内存表并记录命中情况（加载和 invalidate 都会替换内存表）"""
+        self._ensure_loaded()
+        table = self._private_switches if private else self._group_switches
+        status = table.get(key)
+        if status is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return status
+
+    def get_group(self, module_name, group_id):
+        """
+        查询群聊开关
+
+        Returns:
+            bool|None: 开关状态，None 表示没有记录
+        """
+        return self._lookup((module_name, str(group_id)))
+
+    def get_private(self, module_name):
+        """
+        查询私聊开关
+
+        Returns:
+            bool|None: 开关状态，None 表示没有记录
+        """
+        return self._lookup(module_name, private=True)
+
+    def set_group(self, module_name, group_id, status):
+        """写入群聊开关（数据库写入成功后调用）"""
+        self._ensure_loaded()
+        self._group_switches[(module_name, str(group_id))] = bool(status)
+
+    def set_private(self, module_name, status):
+        """写入私聊开关（数据库写入成功后调用）"""
+        self._ensure_loaded()
+        self._private_switches[module_name] = bool(status)
+
+    def remove_group(self, group_id):
+        """移除某群的所有开关（数据库删除成功后调用）"""
+        self._ensure_loaded()
+        group_id = str(group_id)
+        for key in [key for key in self._group_switches if key[1] == group_id]:
+            del self._group_switches[key]
+
+    def get_group_switches(self, group_id):
+        """
+        获取某群所有模块的开关
+
+        Returns:
+            dict: {module_name: bool}
+        """
+        self._ensure_loaded()
+        group_id = str(group_id)
+        return {
+            module_name: status
+            for (module_name, stored_group_id), status in self._group_switches.items()
+            if stored_group_id == group_id
+        }
+
+    def get_enabled_groups(self, module_name):
+        """获取某模块所有已开启的群号列表"""
+        self._ensure_loaded()
+        return [
+            group_id
+            for (stored_module_name, group_id), status in self._group_switches.items()
+            if stored_module_name == module_name and status
+        ]
+
+    def get_group_ids(self):
+        """获取所有存在开关记录的群号"""
+        self._ensure_loaded()
+        return {group_id for _, group_id in self._group_switches}
+
+    def invalidate(self):
+        """清空缓存，下次查询时重新从数据库加载"""
+        with self._load_lock:
+            self._loaded = False
+            self._group_switches = {}
+            self._private_switches = {}
+
+    def get_stats(self):
+        """
+        获取缓存统计信息
+
+        Returns:
+            dict: 命中次数、未命中次数、命中率和缓存条目数
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "group_entries": len(self._group_switches),
+            "private_entries": len(self._private_switches),
+        }
+
+
+# 全局开关缓存实例
+switch_cache = SwitchCache()
+
+metrics.counter(
+    "bot_switch_cache_lookups_total",
+    "开关缓存查询次数",
+    ["result"],
+    collect=lambda: {"hit": switch_cache.hits, "miss": switch_cache.misses},
+)
@@ -7,7 +7,7 @@ from logger import logger
 from utils.generate import generate_reply_message, generate_text_message
 from api.message import send_private_msg, send_group_msg
 from utils.auth import is_system_admin, is_group_admin
-from .config import SWITCH_COMMAND
+from .config import SWITCH_COMMAND, COPY_SWITCH_COMMAND
 from .switch_manager import SwitchManager
 
 
@@ -26,7 +26,7 @@ class SwitchCommandHandler:
             message_id: 消息ID
         """
         try:
-            switch_status = SwitchManager.toggle_private_switch(module_name)
+            switch_status = await SwitchManager.toggle_private_switch_async(module_name)
             switch_status_text = "开启" if switch_status else "关闭"
 
             reply_message = generate_reply_message(message_id)
@@ -58,7 +58,9 @@ class SwitchCommandHandler:
             str: 切换后的状态文本
         """
         try:
-            switch_status = SwitchManager.toggle_group_switch(group_id, module_name)
+            switch_status = await SwitchManager.toggle_group_switch_async(
+                group_id, module_name
+            )
             switch_status_text = "开启" if switch_status else "关闭"
 
             reply_message = generate_reply_message(message_id)
@@ -167,7 +169,7 @@ class SwitchCommandHandler:
 
             # 执行复制操作
             success, copied_modules, unchanged_modules = (
-                SwitchManager.copy_group_switches(source_group_id, group_id)
+                await SwitchManager.copy_group_switches_async(source_group_id, group_id)
             )
 
             # 构建回复消息
@@ -258,7 +260,9 @@ class SwitchCommandHandler:
 
             # 执行复制操作
             success, copied_modules, unchanged_modules = (
-                SwitchManager.copy_group_switches(source_group_id, target_group_id)
+                await SwitchManager.copy_group_switches_async(
+                    source_group_id, target_group_id
+                )
             )
 
             # 构建回复消息
@@ -318,7 +322,7 @@ class SwitchCommandHandler:
             # 检查是否是支持的命令
             if not (
                 raw_message.lower() == SWITCH_COMMAND
-                or raw_message.startswith("复制开关 ")
+                or raw_message.startswith(COPY_SWITCH_COMMAND)
             ):
                 return
 
@@ -336,7 +340,7 @@ class SwitchCommandHandler:
                     return
 
                 # 处理复制开关命令
-                if raw_message.startswith("复制开关 "):
+                if raw_message.startswith(COPY_SWITCH_COMMAND):
                     parts = raw_message.split(" ", 1)
                     if len(parts) != 2:
                         reply_message = generate_reply_message(message_id)
@@ -368,7 +372,7 @@ class SwitchCommandHandler:
                     return
 
                 # 私聊中只支持复制开关命令
-                if raw_message.startswith("复制开关 "):
+                if raw_message.startswith(COPY_SWITCH_COMMAND):
                     parts = raw_message.split(" ")
                     if len(parts) != 3:
                         reply_message = generate_reply_message(message_id)
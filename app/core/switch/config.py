@@ -7,11 +7,23 @@ import os
 # 开关命令
 SWITCH_COMMAND = "switch"
 
+# 复制开关命令，后接群号
+COPY_SWITCH_COMMAND = "复制开关 "
+
 # 数据根目录
 DATA_ROOT_DIR = "data"
 
 # 数据库文件路径
 DATABASE_PATH = os.path.join(DATA_ROOT_DIR, "Core", "switches.db")
 
+# 只读连接池大小
+READER_POOL_SIZE = 4
+
+# 每个连接缓存的预编译语句数量
+STATEMENT_CACHE_SIZE = 64
+
+# 数据库被锁定时的等待时间（毫秒）
+BUSY_TIMEOUT_MS = 5000
+
 # 确保数据目录存在
 os.makedirs(DATA_ROOT_DIR, exist_ok=True)
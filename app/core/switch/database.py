@@ -1,22 +1,68 @@
 """
 开关系统数据库操作模块
 负责数据库初始化、连接管理和基础数据库操作
+
+连接管理：
+- 数据库使用 WAL 模式，读写互不阻塞
+- 一个长期持有的写连接，所有写操作在写锁下串行执行
+- 一组长期持有的只读连接（mode=ro 打开）组成连接池，查询从池中借用连接
+- 连接长期存在，sqlite3 的预编译语句缓存可以跨调用复用
+- 提供 *_async 方法，在线程池中执行语句，避免阻塞事件循环
 """
 
 import sqlite3
 import threading
+import queue
+import asyncio
+import atexit
 import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from urllib.request import pathname2url
 from logger import logger
-from .config import DATABASE_PATH
+from .config import (
+    DATABASE_PATH,
+    READER_POOL_SIZE,
+    STATEMENT_CACHE_SIZE,
+    BUSY_TIMEOUT_MS,
+)
 
 
 class SwitchDatabase:
     """开关系统数据库管理类"""
 
     def __init__(self):
-        # 线程锁，确保数据库操作线程安全
+        # 写锁，保证同一时间只有一个写操作
         self.db_lock = threading.Lock()
+        # 长期持有的写连接
+        self._writer = None
+        # 只读连接池
+        self._readers = queue.Queue()
+        self._reader_count = 0
+        self._reader_count_lock = threading.Lock()
+        # 异步接口使用的线程池
+        self._executor = ThreadPoolExecutor(
+            max_workers=READER_POOL_SIZE + 1, thread_name_prefix="switch-db"
+        )
         self.init_database()
+        atexit.register(self.close)
+
+    def _connect(self, read_only=False):
+        """创建一个配置好的数据库连接，read_only 为 True 时以只读方式打开"""
+        if read_only:
+            database = f"file:{pathname2url(os.path.abspath(DATABASE_PATH))}?mode=ro"
+        else:
+            database = DATABASE_PATH
+        conn = sqlite3.connect(
+            database,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            uri=read_only,
+        )
+        conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
 
     def init_database(self):
         """
@@ -27,7 +73,9 @@ class SwitchDatabase:
                 # 确保Core目录存在
                 os.makedirs(os.path.dirname(DATABASE_PATH), exist_ok=True)
 
-                conn = sqlite3.connect(DATABASE_PATH)
+                conn = self._connect()
+                # WAL 模式是数据库级别的持久设置，设置一次即可
+                conn.execute("PRAGMA journal_mode = WAL")
                 cursor = conn.cursor()
 
                 # 创建模块开关表
@@ -50,7 +98,7 @@ class SwitchDatabase:
                 self._create_indexes(cursor)
 
                 conn.commit()
-                conn.close()
+                self._writer = conn
                 logger.info("数据库初始化完成")
             except Exception as e:
                 logger.error(f"数据库初始化失败: {e}")
@@ -70,23 +118,41 @@ class SwitchDatabase:
 
     def get_connection(self):
         """
-        获取数据库连接
+        获取一个新的独立数据库连接，由调用方负责关闭
         """
         return sqlite3.connect(DATABASE_PATH)
 
+    def _get_writer(self):
+        """获取写连接，初始化失败时重新创建（调用方需持有写锁）"""
+        if self._writer is None:
+            self._writer = self._connect()
+        return self._writer
+
+    @contextmanager
+    def _reader(self):
+        """从连接池借用一个只读连接，池中没有空闲连接且未达上限时新建"""
+        conn = None
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            with self._reader_count_lock:
+                if self._reader_count < READER_POOL_SIZE:
+                    conn = self._connect(read_only=True)
+                    self._reader_count += 1
+            if conn is None:
+                conn = self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
+
     def execute_query(self, query, params=None, fetch_one=False, fetch_all=False):
         """
         执行查询操作
         """
-        with self.db_lock:
-            try:
-                conn = self.get_connection()
-                cursor = conn.cursor()
-
-                if params:
-                    cursor.execute(query, params)
-                else:
-                    cursor.execute(query)
+        try:
+            with self._reader() as conn:
+                cursor = conn.execute(query, params or ())
 
                 result = None
                 if fetch_one:
@@ -94,11 +160,11 @@ class SwitchDatabase:
                 elif fetch_all:
                     result = cursor.fetchall()
 
-                conn.close()
+                cursor.close()
                 return result
-            except Exception as e:
-                logger.error(f"数据库查询失败: {e}")
-                return None
+        except Exception as e:
+            logger.error(f"数据库查询失败: {e}")
+            return None
 
     def execute_update(self, query, params=None):
         """
@@ -106,17 +172,11 @@ class SwitchDatabase:
         """
         with self.db_lock:
             try:
-                conn = self.get_connection()
-                cursor = conn.cursor()
-
-                if params:
-                    cursor.execute(query, params)
-                else:
-                    cursor.execute(query)
-
+                conn = self._get_writer()
+                with conn:
+                    cursor = conn.execute(query, params or ())
                 affected_rows = cursor.rowcount
-                conn.commit()
-                conn.close()
+                cursor.close()
                 return affected_rows
             except Exception as e:
                 logger.error(f"数据库更新失败: {e}")
@@ -124,27 +184,64 @@ class SwitchDatabase:
 
     def execute_batch(self, operations):
         """
-        批量执行数据库操作
+        批量执行数据库操作，在同一个事务中完成，失败时整体回滚
         operations: 操作列表，每个操作为 (query, params) 元组
         """
         with self.db_lock:
             try:
-                conn = self.get_connection()
-                cursor = conn.cursor()
-
-                for query, params in operations:
-                    if params:
-                        cursor.execute(query, params)
-                    else:
-                        cursor.execute(query)
-
-                conn.commit()
-                conn.close()
+                conn = self._get_writer()
+                with conn:
+                    for query, params in operations:
+                        conn.execute(query, params or ())
                 return True
             except Exception as e:
                 logger.error(f"批量数据库操作失败: {e}")
                 return False
 
+    async def _run_async(self, func, *args, **kwargs):
+        """在数据库线程池中执行同步方法"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, partial(func, *args, **kwargs)
+        )
+
+    async def execute_query_async(
+        self, query, params=None, fetch_one=False, fetch_all=False
+    ):
+        """
+        异步执行查询操作，不阻塞事件循环
+        """
+        return await self._run_async(
+            self.execute_query, query, params, fetch_one=fetch_one, fetch_all=fetch_all
+        )
+
+    async def execute_update_async(self, query, params=None):
+        """
+        异步执行更新操作，不阻塞事件循环
+        """
+        return await self._run_async(self.execute_update, query, params)
+
+    async def execute_batch_async(self, operations):
+        """
+        异步批量执行数据库操作，不阻塞事件循环
+        """
+        return await self._run_async(self.execute_batch, operations)
+
+    def close(self):
+        """关闭所有连接，进程退出时自动调用"""
+        with self.db_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._reader_count_lock:
+            self._reader_count = 0
+        self._executor.shutdown(wait=False)
+
 
 # 全局数据库实例
 db = SwitchDatabase()
@@ -7,6 +7,7 @@ import os
 import json
 from logger import logger
 from .database import db
+from .cache import switch_cache
 from .config import DATA_ROOT_DIR
 
 
@@ -79,6 +80,8 @@ class SwitchMigration:
             if operations:
                 success = db.execute_batch(operations)
                 if success:
+                    # 迁移写入了新数据，缓存需要重新加载
+                    switch_cache.invalidate()
                     logger.info(
                         f"数据迁移完成：成功迁移 {migrated_count} 个模块，失败 {error_count} 个"
                     )
@@ -1,15 +1,27 @@
 """
 开关管理核心模块
 负责开关状态的查询、切换和管理逻辑
+查询走内存缓存，写操作先写数据库再同步更新缓存
 """
 
+import asyncio
 from logger import logger
 from .database import db
+from .cache import switch_cache
+
+# 清理群开关数据使用的语句
+CLEAN_SELECT_GROUPS_QUERY = "SELECT DISTINCT group_id FROM module_switches WHERE switch_type = 'group' AND group_id IS NOT NULL"
+CLEAN_DELETE_QUERY = (
+    "DELETE FROM module_switches WHERE switch_type = 'group' AND group_id = ?"
+)
 
 
 class SwitchManager:
     """开关管理器"""
 
+    # 异步写操作锁，首次使用时创建
+    _write_lock = None
+
     @staticmethod
     def is_group_switch_on(group_id, module_name):
         """
@@ -23,12 +35,7 @@ class SwitchManager:
             bool: True表示开启，False表示关闭
         """
         try:
-            result = db.execute_query(
-                "SELECT status FROM module_switches WHERE module_name = ? AND switch_type = 'group' AND group_id = ?",
-                (module_name, str(group_id)),
-                fetch_one=True,
-            )
-            return bool(result[0]) if result else False
+            return bool(switch_cache.get_group(module_name, group_id))
         except Exception as e:
             logger.error(f"[{module_name}]查询群聊开关状态失败: {e}")
             return False
@@ -45,12 +52,7 @@ class SwitchManager:
             bool: True表示开启，False表示关闭
         """
         try:
-            result = db.execute_query(
-                "SELECT status FROM module_switches WHERE module_name = ? AND switch_type = 'private'",
-                (module_name,),
-                fetch_one=True,
-            )
-            return bool(result[0]) if result else False
+            return bool(switch_cache.get_private(module_name))
         except Exception as e:
             logger.error(f"[{module_name}]查询私聊开关状态失败: {e}")
             return False
@@ -98,6 +100,56 @@ class SwitchManager:
             logger.error(f"[{module_name}]切换私聊开关失败: {e}")
             return False
 
+    @staticmethod
+    async def toggle_group_switch_async(group_id, module_name):
+        """
+        切换群聊开关，数据库写入在线程池中执行，不阻塞事件循环
+
+        Args:
+            group_id: 群号
+            module_name: 模块名称
+
+        Returns:
+            bool: 切换后的状态
+        """
+        try:
+            switch_status = await SwitchManager._toggle_switch_async(
+                switch_type="group", module_name=module_name, group_id=group_id
+            )
+            logger.info(f"[{module_name}]群聊开关已切换为【{switch_status}】")
+            return switch_status
+        except Exception as e:
+            logger.error(f"[{module_name}]切换群聊开关失败: {e}")
+            return False
+
+    @staticmethod
+    async def toggle_private_switch_async(module_name):
+        """
+        切换私聊开关，数据库写入在线程池中执行，不阻塞事件循环
+
+        Args:
+            module_name: 模块名称
+
+        Returns:
+            bool: 切换后的状态
+        """
+        try:
+            switch_status = await SwitchManager._toggle_switch_async(
+                switch_type="private", module_name=module_name
+            )
+            logger.info(f"[{module_name}]私聊开关已切换为【{switch_status}】")
+            return switch_status
+        except Exception as e:
+            logger.error(f"[{module_name}]切换私聊开关失败: {e}")
+            return False
+
+    @staticmethod
+    def _get_write_lock():
+        """异步写操作锁，保证读取缓存、写入数据库、更新缓存之间不会穿插其他写操作"""
+        if SwitchManager._write_lock is None:
+            SwitchManager._write_lock = asyncio.Lock()
+        return SwitchManager._write_lock
+
     @staticmethod
     def _toggle_switch(switch_type, module_name, group_id="0"):
         """
@@ -112,70 +164,84 @@ class SwitchManager:
             bool: 切换后的状态
         """
         try:
-            if switch_type == "group":
-                return SwitchManager._toggle_group_switch_internal(
-                    module_name, group_id
+            query, params, new_status = SwitchManager._plan_toggle(
+                switch_type, module_name, group_id
+            )
+            affected_rows = db.execute_update(query, params)
+            return SwitchManager._apply_toggle(
+                switch_type, module_name, group_id, new_status, affected_rows
+            )
+        except Exception as e:
+            logger.error(f"[{module_name}]切换开关失败: {e}")
+            return False
+
+    @staticmethod
+    async def _toggle_switch_async(switch_type, module_name, group_id="0"):
+        """切换某模块的开关（内部方法），数据库写入在线程池中执行"""
+        try:
+            async with SwitchManager._get_write_lock():
+                query, params, new_status = SwitchManager._plan_toggle(
+                    switch_type, module_name, group_id
+                )
+                affected_rows = await db.execute_update_async(query, params)
+                return SwitchManager._apply_toggle(
+                    switch_type, module_name, group_id, new_status, affected_rows
                 )
-            elif switch_type == "private":
-                return SwitchManager._toggle_private_switch_internal(module_name)
-            else:
-                raise ValueError(f"不支持的开关类型: {switch_type}")
         except Exception as e:
             logger.error(f"[{module_name}]切换开关失败: {e}")
             return False
 
     @staticmethod
-    def _toggle_group_switch_internal(module_name, group_id):
-        """群聊开关切换内部实现"""
-        # 查询当前状态
-        result = db.execute_query(
-            "SELECT status FROM module_switches WHERE module_name = ? AND switch_type = 'group' AND group_id = ?",
-            (module_name, str(group_id)),
-            fetch_one=True,
-        )
+    def _plan_toggle(switch_type, module_name, group_id):
+        """
+        根据缓存中的当前状态生成切换开关的写入语句
 
-        if result:
-            # 如果记录存在，切换状态
-            new_status = 0 if result[0] else 1
-            db.execute_update(
-                "UPDATE module_switches SET status = ?, updated_at = CURRENT_TIMESTAMP WHERE module_name = ? AND switch_type = 'group' AND group_id = ?",
-                (new_status, module_name, str(group_id)),
-            )
-        else:
+        Returns:
+            tuple: (query, params, new_status)
+        """
+        if switch_type == "group":
+            current_status = switch_cache.get_group(module_name, group_id)
+            if current_status is not None:
+                # 如果记录存在，切换状态
+                new_status = 0 if current_status else 1
+                return (
+                    "UPDATE module_switches SET status = ?, updated_at = CURRENT_TIMESTAMP WHERE module_name = ? AND switch_type = 'group' AND group_id = ?",
+                    (new_status, module_name, str(group_id)),
+                    new_status,
+                )
             # 如果记录不存在，创建新记录，默认开启
-            new_status = 1
-            db.execute_update(
+            return (
                 "INSERT INTO module_switches (module_name, switch_type, group_id, status) VALUES (?, 'group', ?, ?)",
-                (module_name, str(group_id), new_status),
+                (module_name, str(group_id), 1),
+                1,
             )
-
-        return bool(new_status)
-
-    @staticmethod
-    def _toggle_private_switch_internal(module_name):
-        """私聊开关切换内部实现"""
-        # 查询当前状态
-        result = db.execute_query(
-            "SELECT status FROM module_switches WHERE module_name = ? AND switch_type = 'private'",
-            (module_name,),
-            fetch_one=True,
-        )
-
-        if result:
-            # 如果记录存在，切换状态
-            new_status = 0 if result[0] else 1
-            db.execute_update(
-                "UPDATE module_switches SET status = ?, updated_at = CURRENT_TIMESTAMP WHERE module_name = ? AND switch_type = 'private'",
-                (new_status, module_name),
-            )
-        else:
+        elif switch_type == "private":
+            current_status = switch_cache.get_private(module_name)
+            if current_status is not None:
+                # 如果记录存在，切换状态
+                new_status = 0 if current_status else 1
+                return (
+                    "UPDATE module_switches SET status = ?, updated_at = CURRENT_TIMESTAMP WHERE module_name = ? AND switch_type = 'private'",
+                    (new_status, module_name),
+                    new_status,
+                )
             # 如果记录不存在，创建新记录，默认开启
-            new_status = 1
-            db.execute_update(
+            return (
                 "INSERT INTO module_switches (module_name, switch_type, group_id, status) VALUES (?, 'private', NULL, ?)",
-                (module_name, new_status),
+                (module_name, 1),
+                1,
             )
+        raise ValueError(f"不支持的开关类型: {switch_type}")
 
+    @staticmethod
+    def _apply_toggle(switch_type, module_name, group_id, new_status, affected_rows):
+        """数据库写入成功后再更新缓存，返回切换后的状态"""
+        if not affected_rows:
+            raise RuntimeError("开关状态写入数据库失败")
+        if switch_type == "group":
+            switch_cache.set_group(module_name, group_id, new_status)
+        else:
+            switch_cache.set_private(module_name, new_status)
         return bool(new_status)
 
     @staticmethod
@@ -190,17 +256,7 @@ class SwitchManager:
             dict: 格式为 {group_id: {module_name1: True, module_name2: False}}
         """
         try:
-            results = db.execute_query(
-                "SELECT module_name, status FROM module_switches WHERE switch_type = 'group' AND group_id = ?",
-                (str(group_id),),
-                fetch_all=True,
-            )
-
-            switch = {group_id: {}}
-            for module_name, status in results or []:
-                switch[group_id][module_name] = bool(status)
-
-            return switch
+            return {group_id: switch_cache.get_group_switches(group_id)}
         except Exception as e:
             logger.error(f"获取群组 {group_id} 所有模块开关失败: {e}")
             return {group_id: {}}
@@ -217,13 +273,7 @@ class SwitchManager:
             list: 开启的群号列表
         """
         try:
-            results = db.execute_query(
-                "SELECT group_id FROM module_switches WHERE module_name = ? AND switch_type = 'group' AND status = 1",
-                (module_name,),
-                fetch_all=True,
-            )
-
-            return [row[0] for row in results or []]
+            return switch_cache.get_enabled_groups(module_name)
         except Exception as e:
             logger.error(f"[{module_name}]获取已开启群聊列表失败: {e}")
             return []
@@ -240,13 +290,13 @@ class SwitchManager:
             list: 已开启的模块名称列表
         """
         try:
-            results = db.execute_query(
-                "SELECT module_name FROM module_switches WHERE switch_type = 'group' AND group_id = ? AND status = 1",
-                (str(group_id),),
-                fetch_all=True,
-            )
-
-            return [row[0] for row in results or []]
+            return [
+                module_name
+                for module_name, status in switch_cache.get_group_switches(
+                    group_id
+                ).items()
+                if status
+            ]
         except Exception as e:
             logger.error(f"查询群组 {group_id} 已开启模块失败: {e}")
             return []
@@ -265,84 +315,117 @@ class SwitchManager:
             tuple: (是否成功, 复制的模块列表, 保持不变的模块列表)
         """
         try:
-            # 获取源群组的所有开关数据
-            source_switches = db.execute_query(
-                "SELECT module_name, status FROM module_switches WHERE switch_type = 'group' AND group_id = ?",
-                (str(source_group_id),),
-                fetch_all=True,
-            )
+            plan = SwitchManager._plan_copy(source_group_id, target_group_id)
+            if plan is None:
+                return False, [], []
 
-            if not source_switches:
+            # 执行批量操作
+            success = db.execute_batch(plan[2])
+
+            if not success:
                 return False, [], []
+            return SwitchManager._apply_copy(source_group_id, target_group_id, plan)
 
-            # 获取目标群组现有的模块列表和状态
-            target_existing_data = (
-                db.execute_query(
-                    "SELECT module_name, status FROM module_switches WHERE switch_type = 'group' AND group_id = ?",
-                    (str(target_group_id),),
-                    fetch_all=True,
-                )
-                or []
-            )
+        except Exception as e:
+            logger.error(f"复制群开关数据失败: {e}")
+            return False, [], []
+
+    @staticmethod
+    async def copy_group_switches_async(source_group_id, target_group_id):
+        """
+        复制源群组的开关数据到目标群组，数据库写入在线程池中执行，不阻塞事件循环
 
-            target_existing_modules = {row[0] for row in target_existing_data}
-            target_modules_status = {row[0]: row[1] for row in target_existing_data}
+        Returns:
+            tuple: (是否成功, 复制的模块列表, 保持不变的模块列表)
+        """
+        try:
+            async with SwitchManager._get_write_lock():
+                plan = SwitchManager._plan_copy(source_group_id, target_group_id)
+                if plan is None:
+                    return False, [], []
 
-            copied_modules = []
-            source_module_names = set()
+                # 执行批量操作
+                success = await db.execute_batch_async(plan[2])
 
-            # 准备批量操作
-            operations = []
+                if not success:
+                    return False, [], []
+                return SwitchManager._apply_copy(source_group_id, target_group_id, plan)
 
-            # 复制每个模块的开关状态
-            for module_name, status in source_switches:
-                source_module_names.add(module_name)
+        except Exception as e:
+            logger.error(f"复制群开关数据失败: {e}")
+            return False, [], []
 
-                # 检查目标群是否已有该模块配置
-                if module_name in target_existing_modules:
-                    # 更新现有记录
-                    operations.append(
-                        (
-                            "UPDATE module_switches SET status = ?, updated_at = CURRENT_TIMESTAMP WHERE module_name = ? AND switch_type = 'group' AND group_id = ?",
-                            (status, module_name, str(target_group_id)),
-                        )
-                    )
-                else:
-                    # 插入新记录
-                    operations.append(
-                        (
-                            "INSERT INTO module_switches (module_name, switch_type, group_id, status, created_at, updated_at) VALUES (?, 'group', ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)",
-                            (module_name, str(target_group_id), status),
-                        )
-                    )
+    @staticmethod
+    def _plan_copy(source_group_id, target_group_id):
+        """
+        根据缓存生成复制开关的批量写入语句
 
-                # 记录复制的模块信息
-                status_text = "开启" if status else "关闭"
-                copied_modules.append(f"【{module_name}】- {status_text}")
+        Returns:
+            tuple|None: (源群开关列表, 目标群原有开关, 批量操作, 复制的模块列表)，
+                源群没有开关数据时返回None
+        """
+        # 获取源群组的所有开关数据
+        source_switches = list(switch_cache.get_group_switches(source_group_id).items())
 
-            # 执行批量操作
-            success = db.execute_batch(operations)
+        if not source_switches:
+            return None
 
-            if not success:
-                return False, [], []
+        # 获取目标群组现有的模块列表和状态
+        target_modules_status = switch_cache.get_group_switches(target_group_id)
 
-            # 计算保持不变的模块
-            unchanged_module_names = target_existing_modules - source_module_names
-            unchanged_modules = []
-            for module_name in unchanged_module_names:
-                status = target_modules_status.get(module_name, 0)
-                status_text = "开启" if status else "关闭"
-                unchanged_modules.append(f"【{module_name}】- {status_text}")
+        copied_modules = []
 
-            logger.info(
-                f"成功从群 {source_group_id} 复制 {len(copied_modules)} 个模块开关到群 {target_group_id}，"
-                f"{len(unchanged_modules)} 个模块保持原有配置"
-            )
-            return True, copied_modules, unchanged_modules
+        # 准备批量操作
+        operations = []
 
-        except Exception as e:
-            logger.error(f"复制群开关数据失败: {e}")
-            return False, [], []
+        # 复制每个模块的开关状态
+        for module_name, status in source_switches:
+            # 检查目标群是否已有该模块配置
+            if module_name in target_modules_status:
+                # 更新现有记录
+                operations.append(
+                    (
+                        "UPDATE module_switches SET status = ?, updated_at = CURRENT_TIMESTAMP WHERE module_name = ? AND switch_type = 'group' AND group_id = ?",
+                        (int(status), module_name, str(target_group_id)),
+                    )
+                )
+            else:
+                # 插入新记录
+                operations.append(
+                    (
+                        "INSERT INTO module_switches (module_name, switch_type, group_id, status, created_at, updated_at) VALUES (?, 'group', ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)",
+                        (module_name, str(target_group_id), int(status)),
+                    )
+                )
+
+            # 记录复制的模块信息
+            status_text = "开启" if status else "关闭"
+            copied_modules.append(f"【{module_name}】- {status_text}")
+
+        return source_switches, target_modules_status, operations, copied_modules
+
+    @staticmethod
+    def _apply_copy(source_group_id, target_group_id, plan):
+        """数据库写入成功后同步更新缓存，返回复制结果"""
+        source_switches, target_modules_status, _, copied_modules = plan
+        for module_name, status in source_switches:
+            switch_cache.set_group(module_name, target_group_id, status)
+
+        # 计算保持不变的模块
+        unchanged_module_names = set(target_modules_status) - {
+            module_name for module_name, _ in source_switches
+        }
+        unchanged_modules = []
+        for module_name in unchanged_module_names:
+            status = target_modules_status.get(module_name, 0)
+            status_text = "开启" if status else "关闭"
+            unchanged_modules.append(f"【{module_name}】- {status_text}")
+
+        logger.info(
+            f"成功从群 {source_group_id} 复制 {len(copied_modules)} 个模块开关到群 {target_group_id}，"
+            f"{len(unchanged_modules)} 个模块保持原有配置"
+        )
+        return True, copied_modules, unchanged_modules
 
     @staticmethod
     def clean_invalid_group_switches(valid_group_ids):
@@ -362,74 +445,135 @@ class SwitchManager:
                 return 0, 0, []
 
             # 获取所有群开关数据中的群号
-            results = db.execute_query(
-                "SELECT DISTINCT group_id FROM module_switches WHERE switch_type = 'group' AND group_id IS NOT NULL",
-                fetch_all=True,
+            results = db.execute_query(CLEAN_SELECT_GROUPS_QUERY, fetch_all=True)
+            groups_to_clean = SwitchManager._find_groups_to_clean(
+                results, valid_group_ids
             )
-
-            if not results:
-                logger.info("[Switch]数据库中没有群开关数据，无需清理")
-                return 0, 0, []
-
-            stored_group_ids = [row[0] for row in results]
-
-            # 找出不在有效群列表中的群号
-            groups_to_clean = []
-            for stored_group_id in stored_group_ids:
-                if stored_group_id not in valid_group_ids:
-                    groups_to_clean.append(stored_group_id)
-
             if not groups_to_clean:
-                logger.info("[Switch]所有群开关数据都对应有效群，无需清理")
                 return 0, 0, []
 
             # 删除无效群的开关数据
-            cleaned_count = 0
-            error_count = 0
-            cleaned_groups = []
-
+            deleted = []
             for group_id in groups_to_clean:
                 try:
-                    # 先查询该群有多少条开关记录
-                    count_result = db.execute_query(
-                        "SELECT COUNT(*) FROM module_switches WHERE switch_type = 'group' AND group_id = ?",
-                        (group_id,),
-                        fetch_one=True,
+                    deleted.append(
+                        (group_id, db.execute_update(CLEAN_DELETE_QUERY, (group_id,)))
                     )
-                    record_count = count_result[0] if count_result else 0
+                except Exception as e:
+                    deleted.append((group_id, e))
+            return SwitchManager._apply_clean(deleted)
 
-                    if record_count > 0:
-                        # 删除该群的所有开关记录
-                        affected_rows = db.execute_update(
-                            "DELETE FROM module_switches WHERE switch_type = 'group' AND group_id = ?",
-                            (group_id,),
-                        )
+        except Exception as e:
+            logger.error(f"[Switch]清理群开关数据失败: {e}")
+            return 0, 1, []
 
-                        if affected_rows > 0:
-                            cleaned_count += affected_rows
-                            cleaned_groups.append(group_id)
-                            logger.info(
-                                f"[Switch]已清理群 {group_id} 的 {affected_rows} 条开关记录"
-                            )
-                        else:
-                            logger.warning(f"[Switch]群 {group_id} 的开关记录删除失败")
-                            error_count += 1
-                    else:
-                        logger.warning(f"[Switch]群 {group_id} 没有开关记录")
+    @staticmethod
+    async def clean_invalid_group_switches_async(valid_group_ids):
+        """
+        清理不在有效群列表中的群开关数据，数据库操作在线程池中执行，不阻塞事件循环
 
-                except Exception as e:
-                    error_count += 1
-                    logger.error(f"[Switch]清理群 {group_id} 的开关记录失败: {e}")
+        Args:
+            valid_group_ids: 有效的群号列表（字符串格式）
 
-            if cleaned_count > 0:
-                logger.info(
-                    f"[Switch]群开关数据清理完成，清理了 {len(cleaned_groups)} 个群的 {cleaned_count} 条记录"
-                )
-            if error_count > 0:
-                logger.error(f"[Switch]群开关数据清理过程中出现 {error_count} 个错误")
+        Returns:
+            tuple: (cleaned_count, error_count, cleaned_groups)
+                   清理的记录数量、出错数量、被清理的群号列表
+        """
+        try:
+            if not valid_group_ids:
+                logger.warning("[Switch]有效群列表为空，跳过清理群开关数据")
+                return 0, 0, []
 
-            return cleaned_count, error_count, cleaned_groups
+            async with SwitchManager._get_write_lock():
+                # 获取所有群开关数据中的群号
+                results = await db.execute_query_async(
+                    CLEAN_SELECT_GROUPS_QUERY, fetch_all=True
+                )
+                groups_to_clean = SwitchManager._find_groups_to_clean(
+                    results, valid_group_ids
+                )
+                if not groups_to_clean:
+                    return 0, 0, []
+
+                # 删除无效群的开关数据
+                deleted = []
+                for group_id in groups_to_clean:
+                    try:
+                        deleted.append(
+                            (
+                                group_id,
+                                await db.execute_update_async(
+                                    CLEAN_DELETE_QUERY, (group_id,)
+                                ),
+                            )
+                        )
+                    except Exception as e:
+                        deleted.append((group_id, e))
+                return SwitchManager._apply_clean(deleted)
 
         except Exception as e:
             logger.error(f"[Switch]清理群开关数据失败: {e}")
             return 0, 1, []
+
+    @staticmethod
+    def _find_groups_to_clean(results, valid_group_ids):
+        """找出数据库中不在有效群列表中的群号"""
+        if not results:
+            logger.info("[Switch]数据库中没有群开关数据，无需清理")
+            return []
+
+        valid_group_ids = set(valid_group_ids)
+        groups_to_clean = [row[0] for row in results if row[0] not in valid_group_ids]
+        if not groups_to_clean:
+            logger.info("[Switch]所有群开关数据都对应有效群，无需清理")
+        return groups_to_clean
+
+    @staticmethod
+    def _apply_clean(deleted):
+        """
+        根据删除结果同步更新缓存并汇总
+
+        Args:
+            deleted: [(群号, 删除的记录数或异常)]
+
+        Returns:
+            tuple: (cleaned_count, error_count, cleaned_groups)
+        """
+        cleaned_count = 0
+        error_count = 0
+        cleaned_groups = []
+
+        for group_id, affected_rows in deleted:
+            if isinstance(affected_rows, Exception):
+                error_count += 1
+                logger.error(
+                    f"[Switch]清理群 {group_id} 的开关记录失败: {affected_rows}"
+                )
+            elif affected_rows > 0:
+                switch_cache.remove_group(group_id)
+                cleaned_count += affected_rows
+                cleaned_groups.append(group_id)
+                logger.info(
+                    f"[Switch]已清理群 {group_id} 的 {affected_rows} 条开关记录"
+                )
+            else:
+                logger.warning(f"[Switch]群 {group_id} 没有开关记录")
+
+        if cleaned_count > 0:
+            logger.info(
+                f"[Switch]群开关数据清理完成，清理了 {len(cleaned_groups)} 个群的 {cleaned_count} 条记录"
+            )
+        if error_count > 0:
+            logger.error(f"[Switch]群开关数据清理过程中出现 {error_count} 个错误")
+
+        return cleaned_count, error_count, cleaned_groups
+
+    @staticmethod
+    def get_cache_stats():
+        """
+        获取开关缓存统计信息
+
+        Returns:
+            dict: 命中次数、未命中次数、命中率和缓存条目数
+        """
+        return switch_cache.get_stats()
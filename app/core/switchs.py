@@ -16,6 +16,11 @@ from .switch import (
     SwitchCommandHandler,
     SwitchMigration,
 )
+from .switch.config import SWITCH_COMMAND, COPY_SWITCH_COMMAND
+
+
+# 事件订阅：只处理 switch 和复制开关命令
+SUBSCRIPTIONS = {"command": [SWITCH_COMMAND, COPY_SWITCH_COMMAND]}
 
 
 # 为了完全向后兼容，提供原有API但使用新的实现
@@ -59,6 +64,28 @@ def clean_invalid_group_switches(valid_group_ids):
     return SwitchManager.clean_invalid_group_switches(valid_group_ids)
 
 
+async def toggle_group_switch_async(group_id, MODULE_NAME):
+    """切换群聊开关，不阻塞事件循环"""
+    return await SwitchManager.toggle_group_switch_async(group_id, MODULE_NAME)
+
+
+async def toggle_private_switch_async(MODULE_NAME):
+    """切换私聊开关，不阻塞事件循环"""
+    return await SwitchManager.toggle_private_switch_async(MODULE_NAME)
+
+
+async def copy_group_switches_async(source_group_id, target_group_id):
+    """复制群组开关设置，不阻塞事件循环"""
+    return await SwitchManager.copy_group_switches_async(
+        source_group_id, target_group_id
+    )
+
+
+async def clean_invalid_group_switches_async(valid_group_ids):
+    """清理不在有效群列表中的群开关数据，不阻塞事件循环"""
+    return await SwitchManager.clean_invalid_group_switches_async(valid_group_ids)
+
+
 async def handle_module_private_switch(MODULE_NAME, websocket, user_id, message_id):
     """处理模块私聊开关命令"""
     return await SwitchCommandHandler.handle_module_private_switch(
@@ -88,6 +115,10 @@ __all__ = [
     "get_all_enabled_groups",
     "copy_group_switches",
     "clean_invalid_group_switches",
+    "toggle_group_switch_async",
+    "toggle_private_switch_async",
+    "copy_group_switches_async",
+    "clean_invalid_group_switches_async",
     "handle_module_private_switch",
     "handle_module_group_switch",
     "handle_events",
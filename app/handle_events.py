@@ -1,12 +1,24 @@
-import json
+import time
 import asyncio
 from logger import logger
 import os
 import importlib
 import inspect
-from config import OWNER_ID
+from config import OWNER_ID, LAZY_MODULE_IMPORT
 from api.message import send_private_msg
+from utils import metrics
 from utils.generate import generate_text_message
+from core.event_router import EventRouter, get_subscriptions
+from core.events import parse_event
+from core.menu_manager import MENU_COMMAND, MenuManager
+from core.handler_profiler import handler_profiler
+from core.module_reloader import (
+    module_reloader,
+    list_module_names,
+    reload_package,
+    forget_package,
+)
+from core.module_manifest import module_manifest, LazyModuleHandler
 
 
 # 核心模块列表 - 这些模块将始终被加载
@@ -26,15 +38,59 @@ CORE_MODULES = [
     # 在这里添加其他必须加载的核心模块
 ]
 
+# 运行指标
+HANDLER_SECONDS = metrics.histogram(
+    "bot_handler_seconds", "处理器处理一条事件的耗时（秒）", ["handler"]
+)
+HANDLER_ERRORS = metrics.counter(
+    "bot_handler_errors_total", "处理器抛出异常的次数", ["handler"]
+)
+COMMAND_MATCHES = metrics.counter(
+    "bot_command_matches_total", "命令路由表的匹配次数", ["result"]
+)
+COMMAND_MATCH_COST = metrics.gauge(
+    "bot_command_match_cost_us", "命令匹配的耗时（微秒）", ["stat"]
+)
+MODULE_IMPORT_SECONDS = metrics.gauge(
+    "bot_module_import_seconds", "模块导入耗时（秒）", ["module"]
+)
+
+# 日志忽略列表，echo字段包含这些字符串时不记录日志
+LOG_IGNORE_ECHO_LIST = [
+    "get_group_member_list",
+    "get_group_list",
+    "get_friend_list",
+    "get_group_info",
+    "nc_get_rkey",
+    # 可以根据需要继续添加
+]
+
 
 class EventHandler:
     def __init__(self, websocket):
         self.websocket = websocket
         self.handlers = []
+        # 模块名称 -> 处理器，用于重新加载
+        self.module_handlers = {}
+        # 事件路由表，根据模块的 SUBSCRIPTIONS 只分发给关心该事件的处理器
+        self.router = EventRouter()
+        commands = self.router.commands
+        COMMAND_MATCHES.set_function(
+            lambda: {"hit": commands.hits, "miss": commands.matches - commands.hits}
+        )
+        COMMAND_MATCH_COST.set_function(
+            lambda: {
+                "avg": commands.get_stats()["avg_cost_us"],
+                "max": commands.get_stats()["max_cost_us"],
+            }
+        )
         # 用于记录成功加载的模块
         self.loaded_modules = []
         # 用于记录加载失败的模块及原因
         self.failed_modules = []
+        # 模块名称 -> 导入耗时（秒），延迟导入的模块在第一次收到事件后记录
+        self.import_times = {}
+        MODULE_IMPORT_SECONDS.set_function(lambda: dict(self.import_times))
 
         # 加载核心模块（固定加载）
         self._load_core_modules()
@@ -42,16 +98,30 @@ class EventHandler:
         # 动态加载modules目录下的所有模块
         self._load_modules_dynamically()
 
+        # 开启性能分析时启动采样线程和定期汇报
+        handler_profiler.bind(websocket)
+
+        # 开启模块热重载时监控模块目录
+        module_reloader.bind(self)
+
         # 记录已加载的模块数量
         logger.info(f"总共加载了 {len(self.handlers)} 个事件处理器")
+        logger.info(f"事件路由表: {self.router.describe()}")
 
         # 向管理员上报模块加载状况
         asyncio.create_task(self._report_loading_status())
 
     async def _report_loading_status(self):
         """向管理员上报模块加载状况"""
-        # 生成成功加载的模块报告（按字母顺序排序）
-        sorted_loaded_modules = sorted(self.loaded_modules)
+        # 生成成功加载的模块报告（按字母顺序排序），标出尚未导入的模块
+        sorted_loaded_modules = [
+            (
+                f"{module_name}（延迟导入）"
+                if isinstance(self.module_handlers.get(module_name), LazyModuleHandler)
+                else module_name
+            )
+            for module_name in sorted(self.loaded_modules)
+        ]
         success_msg = "模块加载成功：\n" + "\n".join(sorted_loaded_modules)
 
         # 生成失败加载的模块报告（按字母顺序排序）
@@ -81,6 +151,7 @@ class EventHandler:
             try:
                 module = importlib.import_module(module_path)
                 handler = getattr(module, handler_name)
+                self.router.add(handler, get_subscriptions(module))
                 self.handlers.append(handler)
                 # 记录成功加载的模块
                 self.loaded_modules.append(f"{module_path}.{handler_name}")
@@ -99,84 +170,232 @@ class EventHandler:
             logger.warning(f"模块目录不存在: {modules_dir}")
             return
 
-        # 获取所有模块目录并按字母顺序排序
-        module_names = sorted(
-            [
-                module_name
-                for module_name in os.listdir(modules_dir)
-                if os.path.isdir(os.path.join(modules_dir, module_name))
-                and not module_name.startswith("_")
-            ]
+        # 按修改时间更新模块清单，只重新解析有变化的模块
+        start = time.perf_counter()
+        module_manifest.refresh()
+        logger.info(
+            f"模块清单更新完成，耗时 {(time.perf_counter() - start) * 1000:.1f}ms，"
+            f"{module_manifest.get_stats()}"
         )
 
-        # 遍历排序后的模块目录
-        for module_name in module_names:
-            module_path = os.path.join(modules_dir, module_name)
+        # 获取所有模块目录并按字母顺序排序，遍历加载
+        for module_name in sorted(list_module_names(modules_dir)):
+            self.load_module(module_name)
 
-            # 检查模块是否有main.py文件
-            main_file = os.path.join(module_path, "main.py")
-            if not os.path.exists(main_file):
-                self.failed_modules.append((module_name, "缺少main.py文件"))
-                logger.warning(f"模块 {module_name} 缺少main.py文件，已跳过")
-                continue
+    def _import_module(self, module_name):
+        """
+        导入模块，返回处理函数和模块包
 
-            try:
-                # 动态导入模块
-                module_import_path = f"modules.{module_name}.main"
-                module = importlib.import_module(module_import_path)
-
-                # 检查模块是否有handle_events函数
-                if hasattr(module, "handle_events") and inspect.iscoroutinefunction(
-                    module.handle_events
-                ):
-                    self.handlers.append(module.handle_events)
-                    # 记录成功加载的模块
-                    self.loaded_modules.append(module_name)
-                    logger.info(f"已加载模块: {module_name}")
-                else:
-                    # 记录加载失败的模块及原因
-                    self.failed_modules.append(
-                        (module_name, "缺少异步handle_events函数")
-                    )
-                    logger.warning(
-                        f"模块 {module_name} 缺少异步handle_events函数，已跳过"
-                    )
-            except Exception as e:
-                # 记录加载失败的模块及原因
-                self.failed_modules.append((module_name, str(e)))
-                logger.error(f"加载模块失败: {module_name}, 错误: {e}")
+        Raises:
+            ValueError: 缺少main.py文件或异步handle_events函数
+        """
+        main_file = os.path.join(
+            os.path.dirname(__file__), "modules", module_name, "main.py"
+        )
+        if not os.path.exists(main_file):
+            raise ValueError("缺少main.py文件")
 
-    async def _safe_handle(self, handler, websocket, msg):
+        # 动态导入模块
+        module = importlib.import_module(f"modules.{module_name}.main")
+
+        # 检查模块是否有handle_events函数
+        if not (
+            hasattr(module, "handle_events")
+            and inspect.iscoroutinefunction(module.handle_events)
+        ):
+            raise ValueError("缺少异步handle_events函数")
+        package = importlib.import_module(f"modules.{module_name}")
+        return module, package
+
+    def _timed_import(self, module_name):
+        """导入模块并记录耗时"""
+        start = time.perf_counter()
+        module, package = self._import_module(module_name)
+        elapsed = time.perf_counter() - start
+        self.import_times[module_name] = elapsed
+        logger.info(f"模块 {module_name} 导入耗时 {elapsed * 1000:.1f}ms")
+        return module, package
+
+    def load_module(self, module_name):
+        """
+        加载modules目录下的一个模块
+        清单中可以解析的模块先注册占位处理器，收到第一个订阅的事件时才导入
+
+        Returns:
+            bool: 是否加载成功
+        """
         try:
-            await handler(websocket, msg)
+            info = module_manifest.get(module_name)
+            if LAZY_MODULE_IMPORT and info is not None and info.lazy:
+                handler = LazyModuleHandler(module_name, self._activate_module)
+                # 订阅声明和命令都从清单中读取，不需要导入模块
+                self.router.add(handler, get_subscriptions(info))
+                self.router.commands.add_module(module_name, info, MENU_COMMAND)
+            else:
+                module, package = self._timed_import(module_name)
+                handler = module.handle_events
+                # 订阅声明可写在 main.py 或模块的 __init__.py 中
+                self.router.add(handler, get_subscriptions(module, package))
+                # 模块的开关名称和 COMMANDS 加入命令路由表
+                self.router.commands.add_module(module_name, package, MENU_COMMAND)
+                module_manifest.update_from_module(module_name, package, module)
+            self.handlers.append(handler)
+            self.module_handlers[module_name] = handler
+            MenuManager.invalidate()
+            # 记录成功加载的模块
+            self.loaded_modules.append(module_name)
+            logger.info(f"已加载模块: {module_name}")
+            return True
+        except ValueError as e:
+            # 记录加载失败的模块及原因
+            self.failed_modules.append((module_name, str(e)))
+            logger.warning(f"模块 {module_name} {e}，已跳过")
         except Exception as e:
-            logger.error(f"模块 {handler} 处理消息时出错: {e}")
+            # 记录加载失败的模块及原因
+            self.failed_modules.append((module_name, str(e)))
+            logger.error(f"加载模块失败: {module_name}, 错误: {e}")
+        return False
 
-    async def handle_message(self, websocket, message):
-        """处理websocket消息"""
+    def _activate_module(self, placeholder):
+        """
+        导入延迟加载的模块，在路由表中用模块的 handle_events 替换占位处理器
+        由占位处理器在收到第一个事件时调用
+
+        Returns:
+            处理函数，导入失败或占位处理器已被替换时返回None
+        """
+        module_name = placeholder.module_name
+        if self.module_handlers.get(module_name) is not placeholder:
+            return None
         try:
-            msg = json.loads(message)
-
-            # 日志忽略列表，echo字段包含这些字符串时不记录日志
-            LOG_IGNORE_ECHO_LIST = [
-                "get_group_member_list",
-                "get_group_list",
-                "get_friend_list",
-                "get_group_info",
-                "nc_get_rkey",
-                # 可以根据需要继续添加
+            module, package = self._timed_import(module_name)
+            handler = module.handle_events
+            self.router.replace(
+                placeholder, handler, get_subscriptions(module, package)
+            )
+        except Exception as e:
+            logger.error(f"导入模块失败: {module_name}, 错误: {e}")
+            self.router.remove(placeholder)
+            self.router.commands.remove(module_name)
+            self.handlers.remove(placeholder)
+            del self.module_handlers[module_name]
+            if module_name in self.loaded_modules:
+                self.loaded_modules.remove(module_name)
+            self.failed_modules.append((module_name, str(e)))
+            return None
+
+        self.router.commands.remove(module_name)
+        self.router.commands.add_module(module_name, package, MENU_COMMAND)
+        self.handlers[self.handlers.index(placeholder)] = handler
+        self.module_handlers[module_name] = handler
+        return handler
+
+    def reload_module(self, module_name):
+        """
+        重新导入模块并替换它的处理器，websocket 连接和其他模块不受影响
+        模块尚未加载时按新模块加载，重新导入失败时继续使用旧的处理器
+
+        Returns:
+            bool: 是否加载成功
+        """
+        module_manifest.refresh([module_name])
+        old_handler = self.module_handlers.get(module_name)
+        if isinstance(old_handler, LazyModuleHandler) and not old_handler.loaded:
+            # 尚未导入的模块直接按新的清单重新注册
+            self.router.remove(old_handler)
+            self.router.commands.remove(module_name)
+            self.handlers.remove(old_handler)
+            del self.module_handlers[module_name]
+            if module_name in self.loaded_modules:
+                self.loaded_modules.remove(module_name)
+            old_handler = None
+        if old_handler is None:
+            self.failed_modules = [
+                item for item in self.failed_modules if item[0] != module_name
             ]
+            # 上次加载失败时可能残留部分子模块，全部重新执行
+            forget_package(module_name)
+            return self.load_module(module_name)
+
+        try:
+            reload_package(module_name)
+            module, package = self._timed_import(module_name)
+            new_handler = module.handle_events
+            self.router.replace(
+                old_handler, new_handler, get_subscriptions(module, package)
+            )
+        except Exception as e:
+            logger.error(f"重新加载模块失败，继续使用旧版本: {module_name}, 错误: {e}")
+            return False
 
-            # 判断是否需要忽略日志
-            echo_value = msg.get("echo", "")
-            if not any(
-                ignore_str in str(echo_value) for ignore_str in LOG_IGNORE_ECHO_LIST
-            ):
-                logger.info(f"接收到websocket消息: {msg}")
+        self.router.commands.remove(module_name)
+        self.router.commands.add_module(module_name, package, MENU_COMMAND)
+        module_manifest.update_from_module(module_name, package, module)
+        MenuManager.invalidate()
+        self.handlers[self.handlers.index(old_handler)] = new_handler
+        self.module_handlers[module_name] = new_handler
+        logger.info(f"已重新加载模块: {module_name}")
+        return True
 
-            # 每个 handler 独立异步后台处理
-            for handler in self.handlers:
-                asyncio.create_task(self._safe_handle(handler, websocket, msg))
+    def unload_module(self, module_name):
+        """
+        卸载模块（模块目录已删除）
 
+        Returns:
+            bool: 模块是否已加载
+        """
+        module_manifest.forget(module_name)
+        self.import_times.pop(module_name, None)
+        handler = self.module_handlers.pop(module_name, None)
+        if handler is None:
+            return False
+        self.router.remove(handler)
+        self.router.commands.remove(module_name)
+        self.handlers.remove(handler)
+        if module_name in self.loaded_modules:
+            self.loaded_modules.remove(module_name)
+        forget_package(module_name)
+        MenuManager.invalidate()
+        logger.info(f"已卸载模块: {module_name}")
+        return True
+
+    async def _safe_handle(self, handler, websocket, msg):
+        start = time.perf_counter()
+        try:
+            if handler_profiler.enabled:
+                await handler_profiler.run(handler, websocket, msg)
+            else:
+                await handler(websocket, msg)
         except Exception as e:
-            logger.error(f"处理websocket消息的逻辑错误: {e}")
+            HANDLER_ERRORS.inc(handler.__module__)
+            logger.error(f"模块 {handler} 处理消息时出错: {e}")
+        finally:
+            HANDLER_SECONDS.observe(time.perf_counter() - start, handler.__module__)
+
+    def _log_message(self, msg):
+        """记录收到的消息，echo 在忽略列表中的响应不记录"""
+        echo_value = msg.get("echo", "")
+        if not any(
+            ignore_str in str(echo_value) for ignore_str in LOG_IGNORE_ECHO_LIST
+        ):
+            logger.info(f"接收到websocket消息: {msg}")
+
+    async def dispatch(self, websocket, msg):
+        """
+        处理一条已解析的事件，等待所有订阅该事件的处理器执行完毕
+        由事件处理流水线的工作任务调用
+        """
+        self._log_message(msg)
+        # 命令只匹配一次，结果随事件对象交给各处理器
+        command = self.router.match_command(msg)
+        handlers = self.router.route(msg, command)
+        if not handlers:
+            return
+        # 每条消息只生成一个事件对象，所有处理器共用
+        event = parse_event(msg, command)
+        if len(handlers) == 1:
+            await self._safe_handle(handlers[0], websocket, event)
+        else:
+            await asyncio.gather(
+                *(self._safe_handle(handler, websocket, event) for handler in handlers)
+            )
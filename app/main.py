@@ -5,6 +5,12 @@ from datetime import datetime
 from logger import logger
 from bot import connect_to_bot
 from config import OWNER_ID, WS_URL, TOKEN, FEISHU_BOT_URL, FEISHU_BOT_SECRET
+from config import METRICS_HOST, METRICS_PORT
+from utils import metrics
+from core.loop_monitor import loop_monitor
+
+# 运行指标
+RECONNECTS = metrics.counter("bot_reconnects_total", "连接断开后重新连接的次数")
 
 
 def verify_config():
@@ -45,6 +51,10 @@ class Application:
         """运行主程序"""
         # 打印当前运行根目录
         logger.info(f"当前运行根目录: {os.getcwd()}")
+        if METRICS_PORT:
+            await metrics.metrics_server.start(METRICS_HOST, METRICS_PORT)
+        # 监控事件循环延迟，定位阻塞事件循环的代码
+        loop_monitor.start()
         while True:
             try:
                 result = await connect_to_bot()
@@ -56,6 +66,7 @@ class Application:
             except Exception as e:
                 current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                 logger.error(f"连接失败，正在重试: {e} 当前时间: {current_time}")
+                RECONNECTS.inc()
 
                 await asyncio.sleep(2)  # 每2秒重试一次
 
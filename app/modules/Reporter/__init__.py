@@ -17,12 +17,12 @@ os.makedirs(DATA_DIR, exist_ok=True)
 # 模块的一些命令可以在这里定义，方便在其他地方调用，提高代码的复用率
 # ------------------------------------------------------------
 
-# 转发消息给owner的标志，用于响应函数提取
-FORWARD_MESSAGE_TO_OWNER = "forward_message_to_owner"
-
 AUTO_AGREE_FRIEND_VERIFY = "自动同意好友验证"
 TEST_COMMAND = "测试"
 
+# 事件订阅，分发器只会把匹配的事件交给本模块
+SUBSCRIPTIONS = {"post_type": ["message", "notice", "request"]}
+
 COMMANDS = {
     AUTO_AGREE_FRIEND_VERIFY: f"开启自动同意好友验证，用法：{AUTO_AGREE_FRIEND_VERIFY}",
     TEST_COMMAND: f"测试，用法：{TEST_COMMAND}",
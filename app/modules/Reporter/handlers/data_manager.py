@@ -1,191 +1,316 @@
-import sqlite3
+"""
+消息映射存储
+记录转发给管理员的消息与原始消息的对应关系，管理员回复转发消息时据此找到原始消息
+
+- 所有数据库操作在同一个后台线程中顺序执行，共用一个 WAL 模式的连接，不阻塞事件循环
+- 按转发消息ID、原始消息ID、发送者和时间建立索引，查询不随记录数增长而变慢
+- 后台任务定期分批删除超过 RETENTION_DAYS 天的记录，每批是一个很短的事务，不影响查询
+"""
+
 import os
-from .. import MODULE_NAME
+import sqlite3
+import asyncio
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from logger import logger
+from .. import MODULE_NAME, DATA_DIR
+
+DB_PATH = os.path.join(DATA_DIR, "data.db")
+
+# 数据库结构版本，保存在 PRAGMA user_version 中
+SCHEMA_VERSION = 1
+
+# 记录保留天数
+RETENTION_DAYS = 30
+
+# 清理任务的执行间隔，单位：秒
+RETENTION_INTERVAL = 6 * 3600
+
+# 每批删除的记录数
+RETENTION_CHUNK_SIZE = 500
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
 
 
 class DataManager:
-    def __init__(self):
-        data_dir = os.path.join("data", MODULE_NAME)
-        os.makedirs(data_dir, exist_ok=True)
-        db_path = os.path.join(data_dir, f"data.db")
-        self.conn = sqlite3.connect(db_path)
-        self.cursor = self.conn.cursor()
-        self._create_table()
-
-    def _create_table(self):
-        """建表函数，如果表不存在则创建"""
-        self.cursor.execute(
-            """CREATE TABLE IF NOT EXISTS message_mapping (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            original_sender_id INTEGER NOT NULL,
-            original_message_id INTEGER NOT NULL,
-            forwarded_message_id INTEGER UNIQUE,   
-            raw_message TEXT NOT NULL,
-            created_at TEXT NOT NULL
-        )"""
+    """消息映射存储，所有数据库操作在同一个后台线程中顺序执行"""
+
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = db_path
+        self._conn = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="reporter-db"
         )
-        self.conn.commit()
+        self._retention_task = None
+        # 统计信息
+        self.pruned = 0
 
-    def __enter__(self):
-        return self
+    def _get_conn(self):
+        """获取数据库连接，首次调用时建表并升级旧数据库（仅在后台线程中调用）"""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(self.db_path)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS message_mapping (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    original_sender_id INTEGER NOT NULL,
+                    original_message_id INTEGER NOT NULL,
+                    forwarded_message_id INTEGER UNIQUE,
+                    raw_message TEXT NOT NULL,
+                    created_at TEXT NOT NULL
+                )
+            """
+            )
+            self._migrate(conn)
+            self._conn = conn
+        return self._conn
 
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        self.conn.close()
+    def _migrate(self, conn):
+        """按 user_version 升级数据库结构，旧版本的数据库只有 forwarded_message_id 的唯一索引"""
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < 1:
+            with conn:
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_mapping_original_message ON message_mapping(original_message_id)"
+                )
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_mapping_sender_created ON message_mapping(original_sender_id, created_at)"
+                )
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_mapping_created ON message_mapping(created_at)"
+                )
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
 
-    def add_original_message(
+    def _execute(self, sql, params=(), fetch=None):
+        """
+        执行一条语句（仅在后台线程中调用）
+
+        Args:
+            sql (str): SQL语句
+            params (tuple): 参数
+            fetch (str, optional): one 返回一行，all 返回所有行，不填返回影响的行数
+        """
+        conn = self._get_conn()
+        if fetch is None:
+            with conn:
+                return conn.execute(sql, params).rowcount
+        cursor = conn.execute(sql, params)
+        return cursor.fetchone() if fetch == "one" else cursor.fetchall()
+
+    async def _run(self, func, *args):
+        """在后台线程中执行数据库操作，首次调用时启动清理任务"""
+        if self._retention_task is None or self._retention_task.done():
+            self._retention_task = asyncio.get_running_loop().create_task(
+                self._run_retention()
+            )
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def add_original_message(
         self, original_sender_id, original_message_id, raw_message
     ):
         """先存储原始消息ID和原始消息内容"""
         try:
-            from datetime import datetime
-
-            created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            self.cursor.execute(
+            await self._run(
+                self._execute,
                 "INSERT INTO message_mapping (original_sender_id, original_message_id, forwarded_message_id, raw_message, created_at) VALUES (?, ?, ?, ?, ?)",
                 (
                     original_sender_id,
                     original_message_id,
                     None,
                     raw_message,
-                    created_at,
+                    datetime.now().strftime(TIME_FORMAT),
                 ),
             )
-            self.conn.commit()
-            print(
+            logger.debug(
                 f"[{MODULE_NAME}]已添加原始消息：发送者ID={original_sender_id}, 原始消息ID={original_message_id}, 原始消息内容={raw_message}"
             )
             return True
         except sqlite3.IntegrityError:
-            # 如果原始消息ID已存在，返回False
-            print(f"[{MODULE_NAME}]原始消息ID已存在：{original_message_id}")
+            logger.warning(f"[{MODULE_NAME}]原始消息ID已存在：{original_message_id}")
             return False
 
-    def update_forwarded_message_id(self, original_message_id, forwarded_message_id):
+    async def update_forwarded_message_id(
+        self, original_message_id, forwarded_message_id
+    ):
         """更新对应的转发消息ID"""
-
-        self.cursor.execute(
+        rowcount = await self._run(
+            self._execute,
             "UPDATE message_mapping SET forwarded_message_id = ? WHERE original_message_id = ?",
             (forwarded_message_id, original_message_id),
         )
-        self.conn.commit()
-        return self.cursor.rowcount > 0
+        return rowcount > 0
 
-    def add_message_mapping(
+    async def add_message_mapping(
         self, original_sender_id, original_message_id, forwarded_message_id
     ):
         """添加消息映射关系（转发完成后调用）"""
         try:
-            from datetime import datetime
-
-            created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            self.cursor.execute(
-                "INSERT INTO message_mapping (original_sender_id, original_message_id, forwarded_message_id, created_at) VALUES (?, ?, ?, ?)",
+            await self._run(
+                self._execute,
+                "INSERT INTO message_mapping (original_sender_id, original_message_id, forwarded_message_id, raw_message, created_at) VALUES (?, ?, ?, ?, ?)",
                 (
                     original_sender_id,
                     original_message_id,
                     forwarded_message_id,
-                    created_at,
+                    "",
+                    datetime.now().strftime(TIME_FORMAT),
                 ),
             )
-            self.conn.commit()
             return True
         except sqlite3.IntegrityError:
             # 如果映射关系已存在，返回False
             return False
 
-    def get_original_message_id(self, forwarded_message_id):
+    async def get_original_message_id(self, forwarded_message_id):
         """根据转发后的消息ID获取原始消息ID（核心功能）"""
-        self.cursor.execute(
+        result = await self._run(
+            self._execute,
             "SELECT original_message_id FROM message_mapping WHERE forwarded_message_id = ?",
             (forwarded_message_id,),
+            "one",
         )
-        result = self.cursor.fetchone()
         return result[0] if result else None
 
-    def get_original_sender_id(self, forwarded_message_id):
+    async def get_original_sender_id(self, forwarded_message_id):
         """根据转发后的消息ID获取原始发送者ID"""
-        self.cursor.execute(
+        result = await self._run(
+            self._execute,
             "SELECT original_sender_id FROM message_mapping WHERE forwarded_message_id = ?",
             (forwarded_message_id,),
+            "one",
         )
-        result = self.cursor.fetchone()
         return result[0] if result else None
 
-    def get_original_message_info(self, forwarded_message_id):
+    async def get_original_message_info(self, forwarded_message_id):
         """根据转发后的消息ID获取原始消息的完整信息"""
-        self.cursor.execute(
+        result = await self._run(
+            self._execute,
             "SELECT original_sender_id, original_message_id FROM message_mapping WHERE forwarded_message_id = ?",
             (forwarded_message_id,),
+            "one",
         )
-        result = self.cursor.fetchone()
         if result:
             return {"original_sender_id": result[0], "original_message_id": result[1]}
         return None
 
-    def get_forwarded_message_id(self, original_message_id):
+    async def get_forwarded_message_id(self, original_message_id):
         """根据原始消息ID获取转发后的消息ID"""
-        self.cursor.execute(
+        result = await self._run(
+            self._execute,
             "SELECT forwarded_message_id FROM message_mapping WHERE original_message_id = ?",
             (original_message_id,),
+            "one",
         )
-        result = self.cursor.fetchone()
         return result[0] if result else None
 
-    def delete_message_mapping(
+    async def delete_message_mapping(
         self, original_message_id=None, forwarded_message_id=None
     ):
         """删除消息映射关系"""
         if original_message_id:
-            self.cursor.execute(
+            await self._run(
+                self._execute,
                 "DELETE FROM message_mapping WHERE original_message_id = ?",
                 (original_message_id,),
             )
         elif forwarded_message_id:
-            self.cursor.execute(
+            await self._run(
+                self._execute,
                 "DELETE FROM message_mapping WHERE forwarded_message_id = ?",
                 (forwarded_message_id,),
             )
-        self.conn.commit()
 
-    def get_all_mappings(self):
+    async def get_all_mappings(self):
         """获取所有消息映射关系"""
-        self.cursor.execute(
-            "SELECT original_message_id, forwarded_message_id, created_at FROM message_mapping"
+        return await self._run(
+            self._execute,
+            "SELECT original_message_id, forwarded_message_id, created_at FROM message_mapping",
+            (),
+            "all",
         )
-        return self.cursor.fetchall()
 
-    def get_pending_messages(self):
+    async def get_pending_messages(self):
         """获取所有还未转发的消息（forwarded_message_id为NULL的记录）"""
-        self.cursor.execute(
-            "SELECT original_message_id, created_at FROM message_mapping WHERE forwarded_message_id IS NULL"
+        return await self._run(
+            self._execute,
+            "SELECT original_message_id, created_at FROM message_mapping WHERE forwarded_message_id IS NULL",
+            (),
+            "all",
         )
-        return self.cursor.fetchall()
 
-    def is_message_forwarded(self, original_message_id):
+    async def is_message_forwarded(self, original_message_id):
         """检查消息是否已经转发"""
-        self.cursor.execute(
+        result = await self._run(
+            self._execute,
             "SELECT forwarded_message_id FROM message_mapping WHERE original_message_id = ? AND forwarded_message_id IS NOT NULL",
             (original_message_id,),
+            "one",
         )
-        return self.cursor.fetchone() is not None
+        return result is not None
 
-    def get_sender_messages(self, original_sender_id, limit=10):
+    async def get_sender_messages(self, original_sender_id, limit=10):
         """获取指定发送者的最近消息记录"""
-        self.cursor.execute(
+        return await self._run(
+            self._execute,
             "SELECT original_sender_id, original_message_id, forwarded_message_id, created_at FROM message_mapping WHERE original_sender_id = ? ORDER BY created_at DESC LIMIT ?",
             (original_sender_id, limit),
+            "all",
         )
-        return self.cursor.fetchall()
 
-    def cleanup_old_mappings(self, days=30):
-        """清理超过指定天数的旧映射记录"""
-        from datetime import datetime, timedelta
+    async def cleanup_old_mappings(self, days=RETENTION_DAYS):
+        """
+        分批清理超过指定天数的旧映射记录，每批之间让出事件循环和数据库
 
-        cutoff_date = (datetime.now() - timedelta(days=days)).strftime(
-            "%Y-%m-%d %H:%M:%S"
-        )
-        self.cursor.execute(
-            "DELETE FROM message_mapping WHERE created_at < ?", (cutoff_date,)
-        )
-        self.conn.commit()
-        return self.cursor.rowcount
+        Returns:
+            int: 删除的记录数
+        """
+        cutoff_date = (datetime.now() - timedelta(days=days)).strftime(TIME_FORMAT)
+        total = 0
+        while True:
+            deleted = await self._run(
+                self._execute,
+                "DELETE FROM message_mapping WHERE id IN (SELECT id FROM message_mapping WHERE created_at < ? LIMIT ?)",
+                (cutoff_date, RETENTION_CHUNK_SIZE),
+            )
+            total += deleted
+            if deleted < RETENTION_CHUNK_SIZE:
+                break
+            await asyncio.sleep(0)
+        self.pruned += total
+        return total
+
+    async def _run_retention(self):
+        """定期清理旧记录"""
+        while True:
+            try:
+                deleted = await self.cleanup_old_mappings()
+                if deleted:
+                    logger.info(
+                        f"[{MODULE_NAME}]已清理 {deleted} 条超过 {RETENTION_DAYS} 天的消息映射"
+                    )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[{MODULE_NAME}]清理消息映射失败: {e}")
+            await asyncio.sleep(RETENTION_INTERVAL)
+
+    def get_stats(self):
+        """
+        获取存储统计信息
+
+        Returns:
+            dict: 清理任务是否运行、累计清理的记录数
+        """
+        return {
+            "retention_running": self._retention_task is not None
+            and not self._retention_task.done(),
+            "pruned": self.pruned,
+        }
+
+
+# 全局消息映射存储实例
+data_manager = DataManager()
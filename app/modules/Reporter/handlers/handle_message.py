@@ -9,7 +9,7 @@ class MessageHandler:
     def __init__(self, websocket, msg):
         self.websocket = websocket
         self.msg = msg
-        self.message_type = msg.get("message_type", "")
+        self.message_type = msg.message_type
 
     async def handle(self):
         if self.message_type == "group":
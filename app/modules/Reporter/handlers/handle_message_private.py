@@ -5,7 +5,6 @@ from utils.auth import is_system_admin
 from core.switchs import is_private_switch_on, handle_module_private_switch
 from api.message import send_private_msg
 from utils.generate import generate_reply_message, generate_text_message
-from datetime import datetime
 from core.menu_manager import MenuManager
 from .message_processor import MessageProcessor
 
@@ -16,18 +15,16 @@ class PrivateMessageHandler:
     def __init__(self, websocket, msg):
         self.websocket = websocket
         self.msg = msg
-        self.time = msg.get("time", "")
-        self.formatted_time = datetime.fromtimestamp(self.time).strftime(
-            "%Y-%m-%d %H:%M:%S"
-        )  # 格式化时间
-        self.sub_type = msg.get("sub_type", "")  # 子类型,friend/group
-        self.user_id = str(msg.get("user_id", ""))  # 发送者QQ号
-        self.message_id = str(msg.get("message_id", ""))  # 消息ID
-        self.message = msg.get("message", {})  # 消息段数组
-        self.raw_message = msg.get("raw_message", "")  # 原始消息
-        self.sender = msg.get("sender", {})  # 发送者信息
-        self.nickname = self.sender.get("nickname", "")  # 昵称
-        self.group_id = str(msg.get("group_id", ""))  # 群号
+        self.time = msg.time
+        self.formatted_time = msg.formatted_time  # 格式化时间
+        self.sub_type = msg.sub_type  # 子类型,friend/group
+        self.user_id = msg.user_id  # 发送者QQ号
+        self.message_id = msg.message_id  # 消息ID
+        self.message = msg.message  # 消息段数组
+        self.raw_message = msg.raw_message  # 原始消息
+        self.sender = msg.sender  # 发送者信息
+        self.nickname = msg.nickname  # 昵称
+        self.group_id = msg.group_id  # 群号
 
     async def handle(self):
         """
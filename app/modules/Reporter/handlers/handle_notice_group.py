@@ -1,6 +1,5 @@
 from .. import MODULE_NAME
 from logger import logger
-from datetime import datetime
 from core.switchs import is_group_switch_on
 
 
@@ -12,15 +11,13 @@ class GroupNoticeHandler:
     def __init__(self, websocket, msg):
         self.websocket = websocket
         self.msg = msg
-        self.time = msg.get("time")
-        self.formatted_time = datetime.fromtimestamp(self.time).strftime(
-            "%Y-%m-%d %H:%M:%S"
-        )  # 格式化时间
-        self.notice_type = msg.get("notice_type")
-        self.sub_type = msg.get("sub_type")
-        self.user_id = str(msg.get("user_id"))
-        self.group_id = str(msg.get("group_id"))
-        self.operator_id = str(msg.get("operator_id"))
+        self.time = msg.time
+        self.formatted_time = msg.formatted_time  # 格式化时间
+        self.notice_type = msg.notice_type
+        self.sub_type = msg.sub_type
+        self.user_id = msg.user_id
+        self.group_id = msg.group_id
+        self.operator_id = msg.operator_id
 
     async def handle_group_notice(self):
         """
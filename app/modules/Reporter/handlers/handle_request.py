@@ -7,7 +7,6 @@ from logger import logger
 from utils.generate import generate_text_message
 from api.message import send_private_msg
 from config import OWNER_ID
-from datetime import datetime
 from api.user import set_friend_add_request
 
 
@@ -17,14 +16,12 @@ class RequestHandler:
     def __init__(self, websocket, msg):
         self.websocket = websocket
         self.msg = msg
-        self.time = msg.get("time", "")
-        self.formatted_time = datetime.fromtimestamp(self.time).strftime(
-            "%Y-%m-%d %H:%M:%S"
-        )  # 格式化时间
-        self.request_type = msg.get("request_type", "")
-        self.user_id = self.msg.get("user_id", "")
-        self.comment = self.msg.get("comment", "")
-        self.flag = self.msg.get("flag", "")
+        self.time = msg.time
+        self.formatted_time = msg.formatted_time  # 格式化时间
+        self.request_type = msg.request_type
+        self.user_id = msg.user_id
+        self.comment = msg.comment
+        self.flag = msg.flag
 
     def is_auto_agree_friend_verify(self):
         """
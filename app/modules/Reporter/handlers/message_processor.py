@@ -3,11 +3,13 @@ import os
 import json
 import asyncio
 from logger import logger
-from .. import MODULE_NAME, AUTO_AGREE_FRIEND_VERIFY, DATA_DIR, FORWARD_MESSAGE_TO_OWNER
+from .. import MODULE_NAME, AUTO_AGREE_FRIEND_VERIFY, DATA_DIR
 from config import OWNER_ID
-from api.message import send_private_msg, send_private_msg_with_cq, get_msg
+from api.base import call_api
+from api.message import send_private_msg, send_private_msg_with_cq
+from api.user import set_friend_add_request, set_group_add_request
 from utils.generate import generate_reply_message, generate_text_message
-from .data_manager import DataManager
+from .data_manager import data_manager
 
 
 class MessageProcessor:
@@ -64,12 +66,63 @@ class MessageProcessor:
                     f"[{MODULE_NAME}]检测到请求处理: {action}, 回复消息ID: {reply_msg_id}"
                 )
 
-                # 发送获取消息详情的API请求
-                note = f"{MODULE_NAME}-action={action}-operate_user_id={self.user_id}"
-                await get_msg(self.websocket, reply_msg_id, note)
+                # 获取被回复的请求通知详情
+                response = await call_api(
+                    self.websocket, "get_msg", {"message_id": reply_msg_id}
+                )
+                if not response or response.get("status") != "ok":
+                    logger.error(
+                        f"[{MODULE_NAME}]获取请求通知详情失败，回复消息ID: {reply_msg_id}"
+                    )
+                    return True
+
+                raw_message = (response.get("data") or {}).get("raw_message", "")
+                await self._approve_request(raw_message, action)
                 return True
         return False
 
+    async def _approve_request(self, raw_message, action):
+        """根据请求通知内容执行同意/拒绝操作"""
+        try:
+            # 在请求通知原文中提取请求类型和flag
+            request_type_match = re.search(r"request_type=(friend|group)", raw_message)
+            flag_match = re.search(r"flag=(\d+)", raw_message)
+            if not (request_type_match and flag_match):
+                logger.warning(f"[{MODULE_NAME}]被回复的消息不是请求通知")
+                return
+
+            request_type = request_type_match.group(1)
+            flag = flag_match.group(1)
+
+            # 执行相应操作
+            approve = action == "同意"
+
+            if request_type == "friend":
+                await set_friend_add_request(self.websocket, flag, approve)
+                action_text = "同意好友请求" if approve else "拒绝好友请求"
+            else:  # group
+                await set_group_add_request(self.websocket, flag, approve, reason="")
+                action_text = (
+                    "同意邀请登录号入群请求" if approve else "拒绝邀请登录号入群请求"
+                )
+
+            # 发送确认消息给用户
+            await send_private_msg(
+                self.websocket,
+                self.user_id,
+                [
+                    generate_text_message(
+                        f"已{action_text}请求\n"
+                        f"相关参数：request_type={request_type}\n"
+                        f"flag={flag}\n"
+                        f"action={action}\n"
+                        f"operate_user_id={self.user_id}"
+                    )
+                ],
+            )
+        except Exception as e:
+            logger.error(f"[{MODULE_NAME}]处理请求响应失败: {e}")
+
     async def handle_forward_message_to_owner_reply(self):
         """处理owner回复转发消息"""
         if self.raw_message.startswith(f"[CQ:reply,id="):
@@ -83,13 +136,12 @@ class MessageProcessor:
                 reply_content = reply_content.group(2)
 
                 # 根据转发消息id获取原始消息内容
-                with DataManager() as data_manager:
-                    original_message_id = data_manager.get_original_message_id(
-                        forwarded_message_id
-                    )
-                    original_sender_id = data_manager.get_original_sender_id(
-                        forwarded_message_id
-                    )
+                original_info = await data_manager.get_original_message_info(
+                    forwarded_message_id
+                )
+                if original_info:
+                    original_message_id = original_info["original_message_id"]
+                    original_sender_id = original_info["original_sender_id"]
 
                     # 构造回复消息
                     reply_message = f"[CQ:reply,id={original_message_id}]"
@@ -180,21 +232,32 @@ class MessageProcessor:
             )
             await asyncio.sleep(0.4)
 
-        # 发送消息内容
-        await send_private_msg(
-            self.websocket,
-            OWNER_ID,
-            self.message,
-            note=f"{MODULE_NAME}-{FORWARD_MESSAGE_TO_OWNER}-user_id={self.user_id}-original_message_id={self.message_id}",
+        # 存储消息映射关系（发送者ID, 原始消息ID）
+        await data_manager.add_original_message(
+            self.user_id, self.message_id, self.raw_message
+        )
+        logger.info(
+            f"[{MODULE_NAME}]已存储上报消息映射：发送者ID={self.user_id}, 原始消息ID={self.message_id}"
         )
 
-        # 存储消息映射关系（发送者ID, 原始消息ID）
-        with DataManager() as data_manager:
-            data_manager.add_original_message(
-                self.user_id, self.message_id, self.raw_message
-            )
-            logger.info(
-                f"[{MODULE_NAME}]已存储上报消息映射：发送者ID={self.user_id}, 原始消息ID={self.message_id}"
+        # 发送消息内容，并等待响应拿到转发后的消息ID
+        response = await call_api(
+            self.websocket,
+            "send_private_msg",
+            {"user_id": OWNER_ID, "message": self.message},
+        )
+        forwarded_message_id = ((response or {}).get("data") or {}).get("message_id")
+        if forwarded_message_id:
+            # 更新消息映射关系
+            if await data_manager.update_forwarded_message_id(
+                self.message_id, forwarded_message_id
+            ):
+                logger.info(
+                    f"[{MODULE_NAME}]已成功更新消息映射关系：发送者ID={self.user_id}, 原始消息ID={self.message_id}, 转发消息ID={forwarded_message_id}"
+                )
+        else:
+            logger.warning(
+                f"[{MODULE_NAME}]转发消息给owner未返回消息ID，原始消息ID={self.message_id}"
             )
 
         # 更新上次发送消息的用户ID
@@ -25,4 +25,13 @@ COMMANDS = {
     BASE_COMMAND: "主命令，用法：/base",
     # 可以继续添加其他命令
 }
+
+# 事件订阅，分发器只会把匹配的事件交给本模块，不定义则接收全部事件
+# post_type: 接收这些类型的全部事件
+# notice_type: 只接收这些类型的通知事件
+# echo: 接收 echo 以这些前缀开头的 API 响应
+SUBSCRIPTIONS = {
+    "post_type": ["message", "notice", "request", "meta_event"],
+    # "echo": ["get_msg-"],
+}
 # ------------------------------------------------------------
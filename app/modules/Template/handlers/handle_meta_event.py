@@ -1,6 +1,5 @@
 from .. import MODULE_NAME
 from logger import logger
-from datetime import datetime
 
 
 class MetaEventHandler:
@@ -12,12 +11,10 @@ class MetaEventHandler:
     def __init__(self, websocket, msg):
         self.websocket = websocket
         self.msg = msg
-        self.time = msg.get("time", "")
-        self.formatted_time = datetime.fromtimestamp(self.time).strftime(
-            "%Y-%m-%d %H:%M:%S"
-        )  # 格式化时间
-        self.post_type = msg.get("post_type", "")
-        self.meta_event_type = msg.get("meta_event_type", "")
+        self.time = msg.time
+        self.formatted_time = msg.formatted_time  # 格式化时间
+        self.post_type = msg.post_type
+        self.meta_event_type = msg.meta_event_type
 
     async def handle(self):
         try:
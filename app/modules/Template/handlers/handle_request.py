@@ -1,6 +1,5 @@
 from .. import MODULE_NAME
 from logger import logger
-from datetime import datetime
 
 
 class RequestHandler:
@@ -9,14 +8,12 @@ class RequestHandler:
     def __init__(self, websocket, msg):
         self.websocket = websocket
         self.msg = msg
-        self.time = msg.get("time", "")
-        self.formatted_time = datetime.fromtimestamp(self.time).strftime(
-            "%Y-%m-%d %H:%M:%S"
-        )  # 格式化时间
-        self.request_type = msg.get("request_type", "")
-        self.user_id = str(self.msg.get("user_id", ""))
-        self.comment = self.msg.get("comment", "")
-        self.flag = self.msg.get("flag", "")
+        self.time = msg.time
+        self.formatted_time = msg.formatted_time  # 格式化时间
+        self.request_type = msg.request_type
+        self.user_id = msg.user_id
+        self.comment = msg.comment
+        self.flag = msg.flag
 
     async def handle_friend(self):
         """
@@ -8,8 +8,8 @@ class ResponseHandler:
     def __init__(self, websocket, msg):
         self.websocket = websocket
         self.msg = msg
-        self.data = msg.get("data", {})
-        self.echo = msg.get("echo", {})
+        self.data = msg.data
+        self.echo = msg.echo
 
     async def handle(self):
         try:
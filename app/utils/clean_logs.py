@@ -13,6 +13,9 @@ LOGS_DIR = "logs"
 # 天数
 DAYS = 4
 
+# 事件订阅：借助心跳定期检查，无需处理其他事件
+SUBSCRIPTIONS = {"post_type": ["meta_event"]}
+
 
 async def clean_logs(websocket, msg):
     """清理日志"""
@@ -2,30 +2,32 @@ import time
 import hmac
 import hashlib
 import base64
+import asyncio
+import aiohttp
 import requests
 import json
 from logger import logger
 from config import FEISHU_BOT_URL, FEISHU_BOT_SECRET
 
+# 异步告警参数
+ALERT_QUEUE_SIZE = 100  # 告警队列容量，队列满时丢弃最早的告警
+REQUEST_TIMEOUT = 10  # 单次请求超时时间，单位：秒
+MAX_RETRIES = 3  # 失败后的最大重试次数
+RETRY_BASE_DELAY = 1  # 重试等待的初始时间，每次翻倍，单位：秒
+COALESCE_WINDOW = 10  # 合并窗口，窗口内同一类告警合并为一条摘要，单位：秒
 
-def send_feishu_msg(title: str, content: str) -> dict:
+
+def _build_message(title: str, content: str) -> dict:
     """
-    发送飞书机器人消息
+    构建带签名的飞书消息体
 
     Args:
-        webhook_url: 飞书机器人的webhook地址
-        secret: 安全设置中的签名校验密钥
         title: 消息标题
         content: 消息内容
 
     Returns:
-        dict: 接口返回结果
+        dict: 请求体
     """
-
-    if not FEISHU_BOT_URL or not FEISHU_BOT_SECRET:
-        logger.error(f"飞书webhook未配置")
-        return {"error": "飞书webhook未配置"}
-
     timestamp = str(int(time.time()))
 
     # 计算签名
@@ -35,11 +37,8 @@ def send_feishu_msg(title: str, content: str) -> dict:
     ).digest()
     sign = base64.b64encode(hmac_code).decode("utf-8")
 
-    # 构建请求头
-    headers = {"Content-Type": "application/json"}
-
     # 构建消息内容
-    msg = {
+    return {
         "timestamp": timestamp,
         "sign": sign,
         "msg_type": "post",
@@ -53,6 +52,31 @@ def send_feishu_msg(title: str, content: str) -> dict:
         },
     }
 
+
+def send_feishu_msg(title: str, content: str) -> dict:
+    """
+    发送飞书机器人消息（同步阻塞，异步代码中请使用 feishu_alerter.alert）
+
+    Args:
+        webhook_url: 飞书机器人的webhook地址
+        secret: 安全设置中的签名校验密钥
+        title: 消息标题
+        content: 消息内容
+
+    Returns:
+        dict: 接口返回结果
+    """
+
+    if not FEISHU_BOT_URL or not FEISHU_BOT_SECRET:
+        logger.error(f"飞书webhook未配置")
+        return {"error": "飞书webhook未配置"}
+
+    # 构建请求头
+    headers = {"Content-Type": "application/json"}
+
+    # 构建消息内容
+    msg = _build_message(title, content)
+
     # 发送请求
     try:
         if not isinstance(FEISHU_BOT_URL, str):
@@ -64,3 +88,181 @@ def send_feishu_msg(title: str, content: str) -> dict:
     except Exception as e:
         logger.error(f"飞书发送通知消息失败😞\n{e}")
         return {"error": str(e)}
+
+
+class FeishuAlerter:
+    """
+    异步飞书告警发送器，不阻塞事件循环
+
+    - 告警先进入有界队列，由一个后台任务发送，调用方无需等待
+    - 复用同一个 aiohttp 会话，每次请求有超时限制
+    - 网络错误、超时、HTTP 429/5xx 时按指数退避重试
+    - 合并窗口内同一 key 的多条告警（如频繁掉线重连）合并为一条摘要发送
+    """
+
+    def __init__(self):
+        self._queue = None
+        self._session = None
+        self._task = None
+        # 统计信息
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def alert(self, title: str, content: str, key: str = None) -> bool:
+        """
+        提交一条告警，立即返回
+
+        Args:
+            title: 消息标题
+            content: 消息内容
+            key: 告警类别，合并窗口内 key 相同的告警合并为一条摘要，None 表示不合并
+
+        Returns:
+            bool: 是否已提交，飞书webhook未配置时返回False
+        """
+        if not FEISHU_BOT_URL or not FEISHU_BOT_SECRET:
+            logger.error(f"飞书webhook未配置")
+            return False
+
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=ALERT_QUEUE_SIZE)
+        if self._queue.full():
+            # 丢弃最早的告警，保留最新状态
+            self._queue.get_nowait()
+            self.dropped += 1
+            logger.warning("飞书告警队列已满，丢弃最早的一条告警")
+        self._queue.put_nowait((key, title, content, time.time()))
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return True
+
+    async def _get_session(self):
+        """获取复用的 aiohttp 会话"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+            )
+        return self._session
+
+    async def _collect(self):
+        """等待第一条告警，再收集合并窗口内的其余告警"""
+        batch = [await self._queue.get()]
+        await asyncio.sleep(COALESCE_WINDOW)
+        while not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    @staticmethod
+    def _coalesce(batch):
+        """
+        合并同一 key 的告警
+
+        Returns:
+            list: [(title, content)]
+        """
+        groups = {}
+        for index, (key, title, content, created_at) in enumerate(batch):
+            # 不合并的告警各自一组，dict 保证按首条告警的顺序发送
+            group_key = key if key is not None else (None, index)
+            groups.setdefault(group_key, []).append((title, content, created_at))
+
+        result = []
+        for alerts in groups.values():
+            if len(alerts) == 1:
+                result.append(alerts[0][:2])
+                continue
+            # 多条告警合并为摘要，标题使用最新一条，正文按时间列出每次变化
+            lines = [
+                f"[{time.strftime('%H:%M:%S', time.localtime(created_at))}] {title}"
+                for title, _, created_at in alerts
+            ]
+            title, content, _ = alerts[-1]
+            result.append(
+                (
+                    f"{title}（{len(alerts)} 条告警已合并）",
+                    "\n".join(lines) + f"\n\n最新一条:\n{content}",
+                )
+            )
+        return result
+
+    async def _post(self, title: str, content: str) -> dict:
+        """
+        发送一条消息，失败时按指数退避重试
+
+        Returns:
+            dict: 接口返回结果，失败时包含 error 字段
+        """
+        headers = {"Content-Type": "application/json"}
+        error = None
+        for attempt in range(MAX_RETRIES + 1):
+            if attempt:
+                await asyncio.sleep(RETRY_BASE_DELAY * 2 ** (attempt - 1))
+            try:
+                session = await self._get_session()
+                async with session.post(
+                    FEISHU_BOT_URL,
+                    headers=headers,
+                    data=json.dumps(_build_message(title, content)),
+                ) as response:
+                    if response.status == 429 or response.status >= 500:
+                        error = f"HTTP {response.status}"
+                        continue
+                    try:
+                        result = await response.json(content_type=None)
+                    except ValueError as e:
+                        # 响应不是 JSON，重试也不会改变
+                        return {"error": f"HTTP {response.status} 响应解析失败: {e}"}
+                    if not isinstance(result, dict):
+                        return {
+                            "error": f"HTTP {response.status} 响应格式错误: {result}"
+                        }
+                    return result
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = str(e) or type(e).__name__
+        return {"error": error}
+
+    async def _run(self):
+        """后台发送循环"""
+        while True:
+            try:
+                batch = await self._collect()
+                for title, content in self._coalesce(batch):
+                    result = await self._post(title, content)
+                    if "error" in result:
+                        self.failed += 1
+                        logger.error(f"飞书发送通知消息失败😞\n{result['error']}")
+                    else:
+                        self.sent += 1
+                        logger.info(f"飞书发送通知消息成功🎉\n{result}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"飞书告警发送出错: {e}")
+
+    async def close(self):
+        """停止后台任务并关闭会话"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    def get_stats(self) -> dict:
+        """
+        获取发送统计信息
+
+        Returns:
+            dict: 成功、失败、丢弃数量和队列中的告警数量
+        """
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+        }
+
+
+# 全局飞书告警实例
+feishu_alerter = FeishuAlerter()
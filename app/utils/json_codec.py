@@ -0,0 +1,101 @@
+"""
+websocket 消息的 JSON 编解码
+
+安装了 orjson 时使用 orjson，否则使用标准库 json，两者的输入输出一致：
+- loads 接受 str / bytes，返回 dict
+- dumps 返回紧凑的 str（不转义中文），websocket 按文本帧发送
+
+可通过环境变量 JSON_CODEC 指定实现：auto（默认）/ orjson / json
+
+大消息（如几千人的群成员列表）可以先用 peek_echo 取出 echo，
+确认需要时再完整解析，见 api.base.resolve_raw_response
+"""
+
+import re
+import json
+from logger import logger
+from config import JSON_CODEC
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 顶层 echo 字段，字符串内容中的引号会被转义，不会误匹配到消息内容
+ECHO_PATTERN = re.compile(r'"echo"\s*:\s*"([^"\\]*)"')
+
+
+def _json_loads(data):
+    return json.loads(data)
+
+
+def _json_dumps(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def _orjson_loads(data):
+    try:
+        return orjson.loads(data)
+    except orjson.JSONDecodeError:
+        # orjson 不支持 NaN、超过64位的整数等，交给标准库处理
+        return json.loads(data)
+
+
+def _orjson_dumps(obj):
+    try:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    except TypeError:
+        # orjson.JSONEncodeError 是 TypeError 的子类，同样交给标准库处理
+        return _json_dumps(obj)
+
+
+# 可用的实现：名称 -> (loads, dumps)
+BACKENDS = {"json": (_json_loads, _json_dumps)}
+if orjson is not None:
+    BACKENDS["orjson"] = (_orjson_loads, _orjson_dumps)
+
+backend = None
+loads = None
+dumps = None
+
+
+def set_backend(name="auto"):
+    """
+    切换 JSON 实现
+
+    Args:
+        name (str): auto / orjson / json，auto 表示优先使用 orjson
+
+    Returns:
+        str: 实际使用的实现名称
+    """
+    global backend, loads, dumps
+    if name == "auto":
+        name = "orjson" if "orjson" in BACKENDS else "json"
+    elif name not in BACKENDS:
+        logger.warning(f"JSON实现 {name} 不可用，使用标准库json")
+        name = "json"
+    backend = name
+    loads, dumps = BACKENDS[name]
+    return name
+
+
+def peek_echo(message):
+    """
+    不解析整条消息，只取出顶层 echo 字段
+    OneBot 响应的 echo 在最后，从末尾查找，几MB的消息也只需扫描很少的内容
+
+    Args:
+        message (str): 原始消息
+
+    Returns:
+        str|None: echo 值，没有 echo 或无法确定时返回None
+    """
+    index = message.rfind('"echo"')
+    if index < 0:
+        return None
+    match = ECHO_PATTERN.match(message, index)
+    return match.group(1) if match else None
+
+
+set_backend(JSON_CODEC)
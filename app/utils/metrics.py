@@ -0,0 +1,281 @@
+"""
+运行指标
+提供计数器、仪表盘、直方图三种指标，在本地 HTTP 端口以 Prometheus 文本格式输出
+
+配置 METRICS_PORT 后启动，访问 http://127.0.0.1:端口/metrics 查看
+
+使用示例：
+    from utils import metrics
+
+    API_CALLS = metrics.counter("bot_api_calls_total", "发送的API请求数", ["action"])
+    API_CALLS.inc("send_group_msg")
+
+    # 采集时才读取的数值，适合队列长度、缓存命中数等已有统计
+    metrics.gauge("bot_pending_calls", "等待响应的请求数", collect=get_pending_call_count)
+"""
+
+import bisect
+from aiohttp import web
+from logger import logger
+
+# 直方图默认分桶，单位：秒
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _escape(value):
+    """转义标签值"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+class Metric:
+    """
+    指标基类
+
+    Args:
+        name (str): 指标名称
+        help (str): 说明
+        labelnames (list): 标签名称
+        collect: 可选，无参数函数，采集时调用，返回数值，或 {标签值元组: 数值}
+    """
+
+    type = "untyped"
+
+    def __init__(self, name, help, labelnames=(), collect=None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._collect = collect
+        # 标签值元组 -> 数值
+        self._values = {}
+
+    def set_function(self, collect):
+        """设置采集函数，采集时以函数返回值为准"""
+        self._collect = collect
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(
+                f"指标 {self.name} 需要标签 {self.labelnames}，收到 {labels}"
+            )
+        return tuple(str(label) for label in labels)
+
+    def _items(self):
+        if self._collect is None:
+            return list(self._values.items())
+        try:
+            result = self._collect()
+        except Exception as e:
+            logger.error(f"采集指标 {self.name} 失败: {e}")
+            return []
+        if isinstance(result, dict):
+            return [
+                (key if isinstance(key, tuple) else (key,), value)
+                for key, value in result.items()
+            ]
+        return [((), result)]
+
+    def render(self):
+        """输出 Prometheus 文本格式"""
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for labels, value in self._items():
+            lines.append(
+                f"{self.name}{_format_labels(self.labelnames, labels)} "
+                f"{_format_value(value)}"
+            )
+        return lines
+
+
+class Counter(Metric):
+    """计数器，只增不减"""
+
+    type = "counter"
+
+    def inc(self, *labels, amount=1):
+        """
+        计数加一
+
+        Args:
+            *labels: 标签值，按 labelnames 的顺序
+            amount: 增加的数量
+        """
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """仪表盘，可增可减的当前值"""
+
+    type = "gauge"
+
+    def set(self, value, *labels):
+        self._values[self._key(labels)] = value
+
+    def inc(self, *labels, amount=1):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    """直方图，统计数值的分布，如耗时"""
+
+    type = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 标签值元组 -> [各分桶计数..., 总和, 总数]
+        self._values = {}
+
+    def observe(self, value, *labels):
+        """
+        记录一个数值
+
+        Args:
+            value (float): 数值
+            *labels: 标签值，按 labelnames 的顺序
+        """
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = [0] * (len(self.buckets) + 2)
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            state[index] += 1
+        state[-2] += value
+        state[-1] += 1
+
+    def _bucket_line(self, labels, bound, count):
+        le = f'le="{_format_value(float(bound))}"'
+        return (
+            f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {count}"
+        )
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for labels, state in list(self._values.items()):
+            # 分桶计数按 Prometheus 要求累加输出，+Inf 桶等于总数
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                lines.append(self._bucket_line(labels, bound, cumulative))
+            lines.append(self._bucket_line(labels, float("inf"), state[-1]))
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{label_text} {state[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        """
+        注册指标，同名指标已存在时返回已有的指标（模块重新加载时不会重复注册）
+
+        Returns:
+            Metric: 注册表中的指标
+        """
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric):
+                raise ValueError(f"指标 {metric.name} 已注册为 {existing.type}")
+            if metric._collect is not None:
+                existing.set_function(metric._collect)
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        """输出全部指标的 Prometheus 文本格式"""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# 全局指标注册表
+registry = MetricsRegistry()
+
+
+def counter(name, help, labelnames=(), collect=None):
+    """创建或获取计数器"""
+    return registry.register(Counter(name, help, labelnames, collect))
+
+
+def gauge(name, help, labelnames=(), collect=None):
+    """创建或获取仪表盘"""
+    return registry.register(Gauge(name, help, labelnames, collect))
+
+
+def histogram(name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+    """创建或获取直方图"""
+    return registry.register(Histogram(name, help, labelnames, buckets))
+
+
+class MetricsServer:
+    """在本地端口提供 /metrics 接口"""
+
+    def __init__(self):
+        self._runner = None
+
+    async def _handle_metrics(self, request):
+        return web.Response(
+            text=registry.render(), content_type="text/plain", charset="utf-8"
+        )
+
+    async def start(self, host, port):
+        """
+        启动 HTTP 服务，已启动时不重复启动
+
+        Args:
+            host (str): 监听地址
+            port (int): 监听端口
+        """
+        if self._runner is not None:
+            return
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle_metrics)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        try:
+            await web.TCPSite(runner, host, port).start()
+        except OSError as e:
+            await runner.cleanup()
+            logger.error(f"指标服务启动失败，端口 {port} 不可用: {e}")
+            return
+        self._runner = runner
+        logger.info(f"指标服务已启动: http://{host}:{port}/metrics")
+
+    async def stop(self):
+        """停止 HTTP 服务"""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+# 全局指标服务实例
+metrics_server = MetricsServer()
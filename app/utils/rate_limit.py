@@ -0,0 +1,61 @@
+"""
+令牌桶限流
+"""
+
+import time
+import asyncio
+
+
+class TokenBucket:
+    """
+    令牌桶：以固定速率补充令牌，桶满时不再累积，允许不超过容量的突发
+
+    Args:
+        rate (float): 每秒补充的令牌数
+        capacity (float): 桶容量，即最大突发数量
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+
+    def _refill(self):
+        """按流逝的时间补充令牌"""
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
+
+    def try_acquire(self, tokens=1):
+        """
+        尝试立即取出令牌
+
+        Returns:
+            bool: 取出成功返回True，令牌不足返回False
+        """
+        self._refill()
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return True
+        return False
+
+    def time_until_available(self, tokens=1):
+        """获取令牌足够还需等待的秒数"""
+        self._refill()
+        if self._tokens >= tokens:
+            return 0.0
+        return (tokens - self._tokens) / self.rate
+
+    async def acquire(self, tokens=1):
+        """等待直到取出令牌"""
+        while not self.try_acquire(tokens):
+            await asyncio.sleep(self.time_until_available(tokens))
+
+    @property
+    def tokens(self):
+        """当前可用令牌数"""
+        self._refill()
+        return self._tokens
@@ -0,0 +1,173 @@
+"""
+异步文件存储
+缓存文件的序列化和写入都在有上限的线程池中执行，不阻塞事件循环
+
+- 同一文件短时间内多次写入只写最后一份，写入过程中收到的新数据在写完后再写一次
+- 先写入临时文件再重命名，进程中途退出不会留下写了一半的文件
+- 默认输出紧凑的 JSON，只给机器读取的缓存不需要缩进
+
+使用示例：
+    from utils.storage import storage
+
+    storage.write_json(os.path.join("data", "Core", "xxx.json"), data)
+    result = await storage.run(blocking_function, arg)
+"""
+
+import os
+import json
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from logger import logger
+from utils import json_codec, metrics
+
+# 线程池大小，限制同时进行的文件写入数量
+MAX_WORKERS = 4
+
+# 写入前等待的时间，合并短时间内对同一文件的多次写入，单位：秒
+COALESCE_DELAY = 0.2
+
+STORAGE_WRITES = metrics.counter(
+    "bot_storage_writes_total", "异步写入文件的次数", ["result"]
+)
+
+
+def write_json_file(path, data, indent=None):
+    """
+    以原子方式写入JSON文件：先写临时文件，再替换目标文件
+
+    Args:
+        path (str): 文件路径
+        data: 可序列化为JSON的数据
+        indent (int, optional): 缩进，默认输出紧凑格式
+    """
+    if indent is None:
+        text = json_codec.dumps(data)
+    else:
+        text = json.dumps(data, ensure_ascii=False, indent=indent)
+    dir_path = os.path.dirname(path)
+    if dir_path:
+        os.makedirs(dir_path, exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(temp_path, path)
+
+
+class AsyncStorage:
+    """异步文件存储"""
+
+    def __init__(self, max_workers=MAX_WORKERS):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="storage"
+        )
+        # 等待写入的最新数据，path -> (data, indent)
+        self._pending = {}
+        # 正在写入的文件，path -> Task
+        self._tasks = {}
+        # 统计信息
+        self.writes = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    async def run(self, func, *args):
+        """
+        在存储线程池中执行阻塞函数
+
+        Args:
+            func: 同步函数
+            *args: 函数参数
+
+        Returns:
+            函数的返回值
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def write_json(self, path, data, indent=None):
+        """
+        安排写入JSON文件，立即返回
+
+        Args:
+            path (str): 文件路径
+            data: 可序列化为JSON的数据，写入前不要再修改
+            indent (int, optional): 缩进，默认输出紧凑格式
+        """
+        if path in self._pending:
+            self.coalesced += 1
+        self._pending[path] = (data, indent)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # 没有事件循环时直接同步写入
+            self._pending.pop(path, None)
+            try:
+                write_json_file(path, data, indent)
+                self._record(path)
+            except Exception as e:
+                self._record(path, e)
+            return
+
+        if path not in self._tasks:
+            self._tasks[path] = loop.create_task(self._persist(path))
+
+    def discard(self, path):
+        """取消尚未开始的写入，如文件即将被删除"""
+        self._pending.pop(path, None)
+
+    def _record(self, path, error=None):
+        """记录写入结果，在事件循环线程中调用，日志不会从线程池中发出"""
+        if error is None:
+            self.writes += 1
+            STORAGE_WRITES.inc("ok")
+        else:
+            self.errors += 1
+            STORAGE_WRITES.inc("error")
+            logger.error(f"写入文件 {path} 失败: {error}")
+
+    async def _persist(self, path):
+        """写入某个文件，写入期间有新数据时继续写入最新的一份"""
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                await asyncio.sleep(COALESCE_DELAY)
+                if path not in self._pending:
+                    break
+                data, indent = self._pending.pop(path)
+                try:
+                    await loop.run_in_executor(
+                        self._executor, write_json_file, path, data, indent
+                    )
+                    self._record(path)
+                except Exception as e:
+                    self._record(path, e)
+        finally:
+            self._tasks.pop(path, None)
+
+    async def flush(self):
+        """等待所有写入完成"""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks.values()), return_exceptions=True)
+
+    def get_stats(self):
+        """
+        获取存储统计信息
+
+        Returns:
+            dict: 已写入次数、被合并的写入次数、失败次数、等待写入的文件数量
+        """
+        return {
+            "writes": self.writes,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "pending": len(self._pending.keys() | self._tasks.keys()),
+        }
+
+
+# 全局异步存储实例
+storage = AsyncStorage()
+
+metrics.gauge(
+    "bot_storage_pending_writes",
+    "等待写入的文件数量",
+    collect=lambda: storage.get_stats()["pending"],
+)
@@ -0,0 +1,135 @@
+"""
+JSON 编解码基准测试：比较各实现解析心跳、群消息、群成员列表响应的单条耗时
+
+用法（在项目根目录执行）：
+
+    python benchmarks/bench_json_codec.py
+    python benchmarks/bench_json_codec.py --members 5000 --number 200
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+)
+
+from utils import json_codec  # noqa: E402
+
+
+def build_heartbeat():
+    return {
+        "time": int(time.time()),
+        "self_id": 123456789,
+        "post_type": "meta_event",
+        "meta_event_type": "heartbeat",
+        "status": {"online": True, "good": True},
+        "interval": 30000,
+    }
+
+
+def build_group_message():
+    text = "今天的作业是什么？[CQ:image,file=abc.jpg,url=https://example.com/a.jpg&rkey=xyz]"
+    return {
+        "self_id": 123456789,
+        "user_id": 987654321,
+        "time": int(time.time()),
+        "message_id": 1234567890,
+        "message_seq": 1234567890,
+        "real_id": 1234567890,
+        "message_type": "group",
+        "sender": {
+            "user_id": 987654321,
+            "nickname": "测试用户",
+            "card": "群名片",
+            "role": "member",
+        },
+        "raw_message": text,
+        "font": 14,
+        "sub_type": "normal",
+        "message": [
+            {"type": "text", "data": {"text": "今天的作业是什么？"}},
+            {
+                "type": "image",
+                "data": {"file": "abc.jpg", "url": "https://example.com"},
+            },
+        ],
+        "message_format": "array",
+        "post_type": "message",
+        "group_id": 123456,
+    }
+
+
+def build_member_list(count):
+    members = [
+        {
+            "group_id": 123456,
+            "user_id": 10000 + index,
+            "nickname": f"成员{index}",
+            "card": f"群名片{index}" if index % 3 else "",
+            "sex": "unknown",
+            "age": 0,
+            "area": "",
+            "level": "1",
+            "qq_level": 0,
+            "join_time": 1700000000 + index,
+            "last_sent_time": 1700000000 + index,
+            "title_expire_time": 0,
+            "unfriendly": False,
+            "card_changeable": True,
+            "is_robot": False,
+            "shut_up_timestamp": 0,
+            "role": "member",
+            "title": "",
+        }
+        for index in range(count)
+    ]
+    return {
+        "status": "ok",
+        "retcode": 0,
+        "data": members,
+        "message": "",
+        "wording": "",
+        "echo": "call_api-get_group_member_list-1",
+    }
+
+
+def measure(func, arg, number):
+    """返回单次调用的平均耗时（微秒）"""
+    start = time.perf_counter()
+    for _ in range(number):
+        func(arg)
+    return (time.perf_counter() - start) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON 编解码基准测试")
+    parser.add_argument("--members", type=int, default=3000, help="群成员数量")
+    parser.add_argument("--number", type=int, default=100, help="大消息的重复次数")
+    args = parser.parse_args()
+
+    frames = [
+        ("heartbeat", json.dumps(build_heartbeat()), args.number * 100),
+        ("group message", json.dumps(build_group_message()), args.number * 100),
+        ("member list", json.dumps(build_member_list(args.members)), args.number),
+    ]
+
+    print(f"可用实现: {', '.join(json_codec.BACKENDS)}")
+    print(f"{'frame':<16}{'bytes':>10}{'backend':>10}{'loads us':>12}{'dumps us':>12}")
+    for name, message, number in frames:
+        obj = json.loads(message)
+        for backend, (loads, dumps) in json_codec.BACKENDS.items():
+            decode = measure(loads, message, number)
+            encode = measure(dumps, obj, number)
+            print(
+                f"{name:<16}{len(message):>10}{backend:>10}{decode:>12.2f}{encode:>12.2f}"
+            )
+        peek = measure(json_codec.peek_echo, message, number)
+        print(f"{name:<16}{len(message):>10}{'peek':>10}{peek:>12.2f}{'-':>12}")
+
+
+if __name__ == "__main__":
+    main()
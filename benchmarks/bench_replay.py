@@ -0,0 +1,530 @@
+"""
+事件回放基准测试：在本地启动一个模拟 NapCat 的 websocket 服务端，
+把合成的或录制的事件流推送给 connect_to_bot，记录框架的处理能力
+
+- 吞吐量：从推送第一条事件到最后一条事件处理完毕，每秒处理的事件数
+- 处理器耗时：每个处理器处理一条事件的耗时 p50/p99/最大值
+- 资源占用：运行期间的最大任务数、进程的峰值内存（RSS）、事件循环的最大延迟
+- 模拟服务端会回应框架发出的所有 API 请求，群成员列表等响应按参数生成
+
+每次运行的结果追加到 benchmarks/results/history.jsonl，并与同一场景的上一次结果比较
+
+用法（在项目根目录执行）：
+
+    python benchmarks/bench_replay.py
+    python benchmarks/bench_replay.py --scenario group_messages --events 20000
+    python benchmarks/bench_replay.py --scenario member_lists --members 3000
+    python benchmarks/bench_replay.py --replay recorded.jsonl
+
+场景：
+    mixed           群消息、心跳、通知、成员列表响应按比例混合（默认）
+    group_messages  群消息，包含少量开关和菜单命令
+    heartbeats      心跳事件
+    member_lists    大群的成员列表响应
+    notice_burst    进群、退群、群名片变更通知
+
+录制文件每行一条 NapCat 推送的原始 JSON 消息
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:
+    # Windows 没有 resource 模块，不记录峰值内存
+    resource = None
+
+import websockets
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+HISTORY_FILE = os.path.join(RESULTS_DIR, "history.jsonl")
+
+SELF_ID = 123456789
+OWNER = "10000"
+
+# 最后一条事件推送后，等待处理完毕的最长时间，单位：秒
+DRAIN_TIMEOUT = 60
+
+# 任务数的采样间隔，单位：秒
+SAMPLE_INTERVAL = 0.01
+
+# 合成消息使用的文本，包含开关命令、菜单命令和普通消息
+MESSAGE_TEXTS = [
+    "今天的作业是什么？",
+    "[CQ:image,file=abc.jpg,url=https://example.com/a.jpg&rkey=xyz]有人知道吗",
+    "哈哈哈哈哈",
+    "收到",
+    "menu",
+    "tp",
+    "下午三点开会，记得带电脑",
+]
+
+
+def build_group_message(index, groups):
+    text = MESSAGE_TEXTS[index % len(MESSAGE_TEXTS)]
+    user_id = 20000 + index % 500
+    return {
+        "self_id": SELF_ID,
+        "user_id": user_id,
+        "time": int(time.time()),
+        "message_id": 1000000 + index,
+        "message_seq": 1000000 + index,
+        "real_id": 1000000 + index,
+        "message_type": "group",
+        "sender": {
+            "user_id": user_id,
+            "nickname": f"用户{user_id}",
+            "card": "",
+            "role": "member",
+        },
+        "raw_message": text,
+        "font": 14,
+        "sub_type": "normal",
+        "message": [{"type": "text", "data": {"text": text}}],
+        "message_format": "array",
+        "post_type": "message",
+        "group_id": 100000 + index % groups,
+    }
+
+
+def build_heartbeat(index):
+    return {
+        "time": int(time.time()) + index,
+        "self_id": SELF_ID,
+        "post_type": "meta_event",
+        "meta_event_type": "heartbeat",
+        "status": {"online": True, "good": True},
+        "interval": 30000,
+    }
+
+
+def build_notice(index, groups):
+    notice_type = ("group_increase", "group_decrease", "group_card")[index % 3]
+    notice = {
+        "time": int(time.time()) + index,
+        "self_id": SELF_ID,
+        "post_type": "notice",
+        "notice_type": notice_type,
+        "sub_type": "approve" if notice_type == "group_increase" else "leave",
+        "group_id": 100000 + index % groups,
+        "user_id": 30000 + index,
+        "operator_id": 0,
+    }
+    if notice_type == "group_card":
+        notice["card_new"] = f"新名片{index}"
+        notice["card_old"] = ""
+    return notice
+
+
+def build_member_list(group_id, count):
+    return [
+        {
+            "group_id": group_id,
+            "user_id": 10000 + index,
+            "nickname": f"成员{index}",
+            "card": f"群名片{index}" if index % 3 else "",
+            "sex": "unknown",
+            "age": 0,
+            "area": "",
+            "level": "1",
+            "qq_level": 0,
+            "join_time": 1700000000 + index,
+            "last_sent_time": 1700000000 + index,
+            "title_expire_time": 0,
+            "unfriendly": False,
+            "card_changeable": True,
+            "is_robot": False,
+            "shut_up_timestamp": 0,
+            "role": "member",
+            "title": "",
+        }
+        for index in range(count)
+    ]
+
+
+def build_member_list_response(index, groups, members):
+    group_id = 100000 + index % groups
+    return {
+        "status": "ok",
+        "retcode": 0,
+        "data": build_member_list(group_id, members),
+        "message": "",
+        "wording": "",
+        "echo": f"get_group_member_list-group_id={group_id}",
+    }
+
+
+def build_scenario(name, events, groups, members):
+    """
+    生成合成事件流
+
+    Returns:
+        list: 序列化后的消息
+    """
+    rng = random.Random(0)
+    builders = {
+        "group_messages": lambda i: build_group_message(i, groups),
+        "heartbeats": build_heartbeat,
+        "notice_burst": lambda i: build_notice(i, groups),
+        "member_lists": lambda i: build_member_list_response(i, groups, members),
+    }
+    if name in builders:
+        return [
+            json.dumps(builders[name](i), ensure_ascii=False) for i in range(events)
+        ]
+
+    # mixed：按线上常见的比例混合
+    weights = [
+        ("group_messages", 90),
+        ("heartbeats", 4),
+        ("notice_burst", 5),
+        ("member_lists", 1),
+    ]
+    kinds = rng.choices(
+        [kind for kind, _ in weights], [weight for _, weight in weights], k=events
+    )
+    return [
+        json.dumps(builders[kind](i), ensure_ascii=False)
+        for i, kind in enumerate(kinds)
+    ]
+
+
+def load_replay(path):
+    """读取录制的事件流，每行一条原始消息"""
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def get_peak_rss_mb():
+    """进程的峰值内存，单位：MB"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def get_git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=APP_DIR,
+            timeout=5,
+        ).stdout.strip()
+    except Exception:
+        return ""
+
+
+class FakeNapCat:
+    """
+    模拟 NapCat 的 websocket 服务端：推送事件流，并回应框架发出的 API 请求
+
+    Args:
+        frames (list): 要推送的消息
+        groups (int): 群数量，用于生成群列表
+        members (int): 每个群的成员数量，用于生成成员列表
+        rate (float): 每秒推送的消息数，0 表示不限速
+    """
+
+    def __init__(self, frames, groups, members, rate=0):
+        self.frames = frames
+        self.groups = groups
+        self.members = members
+        self.rate = rate
+        self.api_calls = {}
+        self.started_at = None
+        self.finished_sending = asyncio.Event()
+        self.close_connection = asyncio.Event()
+        self._message_id = 0
+
+    def _respond(self, request):
+        action = request.get("action", "")
+        params = request.get("params") or {}
+        self.api_calls[action] = self.api_calls.get(action, 0) + 1
+        if action.startswith("send_"):
+            self._message_id += 1
+            data = {"message_id": 9000000 + self._message_id}
+        elif action == "get_group_list":
+            data = [
+                {
+                    "group_id": 100000 + index,
+                    "group_name": f"测试群{index}",
+                    "member_count": self.members,
+                    "max_member_count": 2000,
+                }
+                for index in range(self.groups)
+            ]
+        elif action == "get_group_member_list":
+            data = build_member_list(params.get("group_id"), self.members)
+        elif action == "nc_get_rkey":
+            data = [
+                {
+                    "rkey": "&rkey=bench",
+                    "ttl": "3600",
+                    "time": int(time.time()),
+                    "type": 20,
+                }
+            ]
+        else:
+            data = {}
+        return json.dumps(
+            {
+                "status": "ok",
+                "retcode": 0,
+                "data": data,
+                "message": "",
+                "wording": "",
+                "echo": request.get("echo"),
+            },
+            ensure_ascii=False,
+        )
+
+    async def _answer(self, websocket):
+        async for message in websocket:
+            try:
+                await websocket.send(self._respond(json.loads(message)))
+            except websockets.ConnectionClosed:
+                return
+
+    async def handle(self, websocket):
+        """处理框架的连接：推送事件流，等待处理完毕后断开"""
+        answer = asyncio.create_task(self._answer(websocket))
+        try:
+            self.started_at = time.perf_counter()
+            interval = 1 / self.rate if self.rate else 0
+            for index, frame in enumerate(self.frames):
+                await websocket.send(frame)
+                if interval:
+                    # 按开始时间计算下一条的推送时间，sleep 的误差不会累积
+                    delay = self.started_at + (index + 1) * interval
+                    delay -= time.perf_counter()
+                    await asyncio.sleep(max(delay, 0))
+            self.finished_sending.set()
+            await self.close_connection.wait()
+        finally:
+            answer.cancel()
+            await websocket.close()
+
+
+async def run_benchmark(args, frames):
+    fake = FakeNapCat(frames, args.groups, args.members, args.rate)
+    server = await websockets.serve(fake.handle, "127.0.0.1", 0, max_size=None)
+    port = server.sockets[0].getsockname()[1]
+
+    # 配置在导入框架模块前写入环境变量
+    os.environ["WS_URL"] = f"ws://127.0.0.1:{port}"
+    os.environ["TOKEN"] = ""
+    os.environ.setdefault("OWNER_ID", OWNER)
+    sys.path.insert(0, APP_DIR)
+
+    import bot
+    from logger import setup_logging
+    from handle_events import EventHandler
+    from core.inbound_pipeline import InboundPipeline
+    from core.loop_monitor import loop_monitor
+
+    setup_logging(logs_dir=os.path.join(os.getcwd(), "logs"), console_level="CRITICAL")
+
+    latencies = []
+    state = {"pipeline": None, "in_flight": 0, "dispatched": 0, "last_done": None}
+
+    class BenchEventHandler(EventHandler):
+        """记录每个处理器的耗时和事件处理进度"""
+
+        async def _safe_handle(self, handler, websocket, msg):
+            start = time.perf_counter()
+            try:
+                await super()._safe_handle(handler, websocket, msg)
+            finally:
+                latencies.append(time.perf_counter() - start)
+
+        async def dispatch(self, websocket, msg):
+            state["in_flight"] += 1
+            try:
+                await super().dispatch(websocket, msg)
+            finally:
+                state["in_flight"] -= 1
+                state["dispatched"] += 1
+                state["last_done"] = time.perf_counter()
+
+    class BenchPipeline(InboundPipeline):
+        def start(self):
+            state["pipeline"] = self
+            super().start()
+
+    bot.EventHandler = BenchEventHandler
+    bot.InboundPipeline = BenchPipeline
+
+    peak_tasks = 0
+
+    async def sample():
+        nonlocal peak_tasks
+        while True:
+            peak_tasks = max(peak_tasks, len(asyncio.all_tasks()))
+            await asyncio.sleep(SAMPLE_INTERVAL)
+
+    async def wait_drained():
+        """事件全部推送且队列为空、没有正在处理的事件时结束"""
+        await fake.finished_sending.wait()
+        deadline = time.perf_counter() + DRAIN_TIMEOUT
+        while time.perf_counter() < deadline:
+            pipeline = state["pipeline"]
+            if pipeline is not None and not pipeline.get_stats()["queued"]:
+                if not state["in_flight"]:
+                    break
+            await asyncio.sleep(0.01)
+        fake.close_connection.set()
+
+    loop_monitor.start()
+    sampler = asyncio.create_task(sample())
+    drainer = asyncio.create_task(wait_drained())
+    try:
+        await bot.connect_to_bot()
+        await bot.runtime.close()
+    finally:
+        server.close()
+        await server.wait_closed()
+    sampler.cancel()
+    drainer.cancel()
+
+    pipeline_stats = state["pipeline"].get_stats() if state["pipeline"] else {}
+    shed = sum(
+        pipeline_stats.get(key, 0)
+        for key in ("shed_heartbeats", "shed_duplicates", "shed_overflow")
+    )
+    # 推送的事件中实际处理的数量，分发给模块的 API 响应不计入
+    processed = len(frames) - shed
+    duration = (state["last_done"] or time.perf_counter()) - (
+        fake.started_at or time.perf_counter()
+    )
+    return {
+        "events": len(frames),
+        "processed": processed,
+        "dispatched": state["dispatched"],
+        "duration_s": round(duration, 3),
+        "throughput_eps": round(processed / duration, 1) if duration else 0,
+        "handler_p50_ms": round(percentile(latencies, 0.5) * 1000, 3),
+        "handler_p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "handler_max_ms": round(max(latencies, default=0) * 1000, 3),
+        "peak_tasks": peak_tasks,
+        "peak_rss_mb": get_peak_rss_mb(),
+        "max_loop_lag_ms": round(loop_monitor.get_stats()["max_lag"] * 1000, 1),
+        "shed": shed,
+        "api_calls": sum(fake.api_calls.values()),
+    }
+
+
+def load_previous(scenario):
+    """读取同一场景的上一次结果"""
+    if not os.path.exists(HISTORY_FILE):
+        return None
+    previous = None
+    with open(HISTORY_FILE, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("scenario") == scenario:
+                previous = record
+    return previous
+
+
+def print_result(result, previous):
+    compared = ("throughput_eps", "handler_p50_ms", "handler_p99_ms", "peak_rss_mb")
+    print(f"{'metric':<20}{'value':>14}{'previous':>14}{'change':>10}")
+    for key, value in result["metrics"].items():
+        old = (previous or {}).get("metrics", {}).get(key)
+        change = ""
+        if key in compared and old and value is not None:
+            change = f"{(value - old) / old * 100:+.1f}%"
+        old_text = "-" if old is None else str(old)
+        print(f"{key:<20}{str(value):>14}{old_text:>14}{change:>10}")
+    if previous:
+        print(f"上一次: {previous['timestamp']} {previous.get('commit', '')}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="事件回放基准测试")
+    parser.add_argument(
+        "--scenario",
+        default="mixed",
+        choices=[
+            "mixed",
+            "group_messages",
+            "heartbeats",
+            "member_lists",
+            "notice_burst",
+        ],
+        help="合成事件流的场景",
+    )
+    parser.add_argument("--replay", help="录制的事件流文件，指定后忽略 --scenario")
+    parser.add_argument("--events", type=int, default=10000, help="合成事件数量")
+    parser.add_argument("--groups", type=int, default=50, help="群数量")
+    parser.add_argument("--members", type=int, default=500, help="每个群的成员数量")
+    parser.add_argument(
+        "--rate", type=float, default=0, help="每秒推送的事件数，0为不限速"
+    )
+    parser.add_argument("--no-save", action="store_true", help="不写入历史记录")
+    args = parser.parse_args()
+
+    if args.replay:
+        frames = load_replay(args.replay)
+        scenario = f"replay:{os.path.basename(args.replay)}"
+    else:
+        frames = build_scenario(args.scenario, args.events, args.groups, args.members)
+        scenario = args.scenario
+
+    # 在临时目录中运行，不读写真实的数据文件，结束后切回原目录并删除
+    original_dir = os.getcwd()
+    work_dir = tempfile.mkdtemp(prefix="bench_replay_")
+    os.chdir(work_dir)
+    print(f"场景: {scenario}，事件数: {len(frames)}，工作目录: {work_dir}")
+    try:
+        metrics = asyncio.run(run_benchmark(args, frames))
+    finally:
+        os.chdir(original_dir)
+        shutil.rmtree(work_dir, ignore_errors=True)
+    result = {
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "commit": get_git_commit(),
+        "scenario": scenario,
+        "params": {
+            "groups": args.groups,
+            "members": args.members,
+            "rate": args.rate,
+        },
+        "metrics": metrics,
+    }
+    previous = load_previous(scenario)
+    print_result(result, previous)
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        with open(HISTORY_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(result, ensure_ascii=False) + "\n")
+        print(f"结果已写入 {HISTORY_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# 程序以 app 为工作目录运行，模块之间按 app 下的路径导入
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+)
@@ -0,0 +1,40 @@
+import re
+
+import pytest
+
+from core.command_router import CommandRouter
+
+
+async def handler(websocket, msg):
+    pass
+
+
+def test_regex_commands_with_same_group_name():
+    router = CommandRouter()
+    router.add("A", r"^签到(?P<n>\d+)$", "regex")
+    router.add("B", r"^抽奖(?P<n>\d+)$", "regex")
+    router.add(handler, "menu", "prefix")
+
+    result = router.match("抽奖3")
+    assert (result.owner, result.match.group("n")) == ("B", "3")
+    assert router.match("签到5").match.group("n") == "5"
+    assert router.match("menu").owner is handler
+
+
+def test_regex_commands_keep_their_own_backreferences():
+    router = CommandRouter()
+    router.add("A", r"(a)\1", "regex")
+    router.add("B", r"(b)\1x", "regex")
+
+    assert router.match("aa").owner == "A"
+    result = router.match("bbx")
+    assert (result.owner, result.match.group(1)) == ("B", "b")
+    assert router.match("bb") is None
+
+
+def test_invalid_regex_is_rejected_when_added():
+    router = CommandRouter()
+    router.add("A", "tp", "exact")
+    with pytest.raises(re.error):
+        router.add("B", r"(a", "regex")
+    assert router.match("tp").owner == "A"